@@ -1,8 +1,17 @@
-import logging
 from urlparse import urljoin
-from xml.etree import ElementTree
 
+from recurly import client, xmlbackend
+from recurly.client import Client  # noqa
+from recurly.compression import Compression
+from recurly.deadlines import deadline  # noqa
+from recurly.executor import Executor
+from recurly.exporter import export  # noqa
+from recurly.pool import ConnectionPool
+from recurly.ratelimit import RateLimiter  # noqa
+from recurly.retry import RetryPolicy  # noqa
 from recurly.resource import Resource
+from recurly.singleflight import SingleFlight  # noqa
+from recurly.transport import HTTPLibTransport
 from . import js  # noqa
 
 
@@ -28,6 +37,71 @@ for validating the server against."""
 DEFAULT_CURRENCY = 'USD'
 """The currency to use creating `Money` instances when one is not specified."""
 
+CONNECTION_POOL = ConnectionPool(max_size=10, idle_timeout=60)
+"""The `ConnectionPool` of keep-alive connections reused between API
+requests, or ``None`` to open a new connection for every request."""
+
+CONNECT_TIMEOUT = 10
+"""The seconds to allow for connecting to the API, or ``None`` for no
+limit."""
+
+READ_TIMEOUT = 60
+"""The seconds to allow for each read of a response from the API, or
+``None`` for no limit."""
+
+TRANSPORT = HTTPLibTransport()
+"""The `recurly.transport.Transport` that sends API requests over HTTP."""
+
+EXECUTOR = Executor(workers=16)
+"""The `recurly.executor.Executor` that runs the requests of methods such as
+`Resource.get_async()` in the background."""
+
+XML_BACKEND = None
+"""The XML library to parse and serialize API documents with: ``'lxml'``,
+``'cElementTree'`` or ``'ElementTree'``, or ``None`` to use the C-accelerated
+ElementTree when it is available."""
+
+XML_SERIALIZER = 'direct'
+"""How request bodies are serialized: ``'direct'`` to write their XML
+straight from the values of `Resource` instances, or ``'element'`` to build
+and serialize an element tree with `Resource.to_element()`."""
+
+RETRY_POLICY = None
+"""The `RetryPolicy` deciding which failed requests to retry, or ``None``
+to never retry requests. Retries are off unless a policy is set:
+
+    recurly.RETRY_POLICY = recurly.RetryPolicy()
+"""
+
+COMPRESSION = Compression()
+"""The `recurly.compression.Compression` that asks for compressed responses
+and decompresses them, or ``None`` to ask for uncompressed responses."""
+
+RATE_LIMITER = None
+"""A `RateLimiter` shared by all threads to limit how fast requests are
+sent, or ``None`` to send requests as fast as possible."""
+
+SINGLE_FLIGHT = None
+"""A `recurly.singleflight.SingleFlight` through which concurrent requests
+for the same document share one request, or ``None`` to make every
+request."""
+
+RESPONSE_CACHE = None
+"""A `recurly.cache.ResponseCache` in which to keep documents for
+conditional requests, or ``None`` to always download documents in full."""
+
+OBJECT_CACHE = None
+"""A `recurly.cache.ObjectCache` in which to keep rarely changing resources
+such as plans, or ``None`` to always request resources."""
+
+MAX_CONCURRENT_REQUESTS = 8
+"""The most requests that bulk methods such as `Resource.get_many()` may
+have in flight at once across all threads, or ``None`` for no limit."""
+
+OBSERVERS = list()
+"""Functions to call with a `recurly.events.Event` as each API request,
+document download and resource action finishes, for collecting metrics."""
+
 
 class Account(Resource):
 
@@ -138,16 +212,19 @@ class Account(Resource):
                     self._elem.find('billing_info').attrib['href']
             except (AttributeError, KeyError):
                 raise AttributeError(name)
-            resp, elem = BillingInfo.element_for_url(billing_info_url)
-            return BillingInfo.from_element(elem)
+            with client.using(self.__dict__.get('_client')):
+                resp, elem = BillingInfo.element_for_url(billing_info_url)
+                return BillingInfo.from_element(elem)
 
         return super(Account, self).__getattr__(name)
 
+    @client.remembered
     def charge(self, charge):
         """Charge (or credit) this account with the given `Adjustment`."""
         url = urljoin(self._url, '%s/adjustments' % self.account_code)
         return charge.post(url)
 
+    @client.remembered
     def invoice(self):
         """Create an invoice for any outstanding adjustments this account
             has."""
@@ -157,14 +234,14 @@ class Account(Resource):
         if response.status != 201:
             self.raise_http_error(response)
 
-        response_xml = response.read()
-        logging.getLogger('recurly.http.response').debug(response_xml)
-        elem = ElementTree.fromstring(response_xml)
+        response_xml = self._read_response(response)
+        elem = xmlbackend.fromstring(response_xml)
 
         invoice = Invoice.from_element(elem)
         invoice._url = response.getheader('Location')
         return invoice
 
+    @client.remembered
     def reopen(self):
         """Reopen a closed account."""
         url = urljoin(self._url, '%s/reopen' % self.account_code)
@@ -172,15 +249,16 @@ class Account(Resource):
         if response.status != 200:
             self.raise_http_error(response)
 
-        response_xml = response.read()
-        logging.getLogger('recurly.http.response').debug(response_xml)
-        self.update_from_element(ElementTree.fromstring(response_xml))
+        response_xml = self._read_response(response)
+        self.update_from_element(xmlbackend.fromstring(response_xml))
 
+    @client.remembered
     def subscribe(self, subscription):
         """Create the given `Subscription` for this existing account."""
         url = urljoin(self._url, '%s/subscriptions' % self.account_code)
         return subscription.post(url)
 
+    @client.remembered
     def update_billing_info(self, billing_info):
         """Change this account's billing information to the given
            `BillingInfo`."""
@@ -194,9 +272,8 @@ class Account(Resource):
         else:
             billing_info.raise_http_error(response)
 
-        response_xml = response.read()
-        logging.getLogger('recurly.http.response').debug(response_xml)
-        billing_info.update_from_element(ElementTree.fromstring(response_xml))
+        response_xml = self._read_response(response)
+        billing_info.update_from_element(xmlbackend.fromstring(response_xml))
 
 
 class BillingInfo(Resource):
@@ -258,6 +335,7 @@ class Coupon(Resource):
     collection_path = 'coupons'
 
     nodename = 'coupon'
+    cache_ttl = 300
 
     attributes = (
         'coupon_code',
@@ -288,10 +366,10 @@ class Coupon(Resource):
         if attrname != 'plan_codes':
             return super(Coupon, cls).element_for_value(attrname, value)
 
-        elem = ElementTree.Element(attrname)
+        elem = xmlbackend.Element(attrname)
         elem.attrib['type'] = 'array'
         for code in value:
-            code_el = ElementTree.Element('plan_code')
+            code_el = xmlbackend.Element('plan_code')
             code_el.text = code
             elem.append(code_el)
 
@@ -395,12 +473,13 @@ class Invoice(Resource):
     )
     linked_attributes = ('account',)
 
+    @client.remembered
     def as_pdf(self, **kwargs):
         """Return the resource at the given URL, as a
         (`httplib.HTTPResponse`, `xml.etree.ElementTree.Element`) tuple
         resulting from a ``GET`` request to that URL."""
         cls = self.__class__
-        url = urljoin(BASE_URI, self.member_path % (self.attributes['uuid'],))
+        url = urljoin(client.settings().base_uri, self.member_path % (self.attributes['uuid'],))
 
         response = cls.http_request(url, headers={'Accept': 'application/pdf'})
         if response.status != 200:
@@ -624,6 +703,7 @@ class Transaction(Resource):
         self._refund_transaction_url = response.getheader('Location')
         return self
 
+    @client.remembered
     def get_refund_transaction(self):
         """Retrieve the refund transaction for this transaction, immediately
         after refunding.
@@ -721,6 +801,7 @@ class Plan(Resource):
     collection_path = 'plans'
 
     nodename = 'plan'
+    cache_ttl = 300
 
     attributes = (
         'plan_code',
@@ -766,13 +847,14 @@ class Plan(Resource):
         'setup_fee_in_cents',
     )
 
+    @client.remembered
     def get_add_on(self, add_on_code):
         """Return the `AddOn` for this plan with the given add-on code."""
         url = urljoin(self._url, '%s/add_ons/%s' %
             (self.plan_code, add_on_code))
-        resp, elem = AddOn.element_for_url(url)
-        return AddOn.from_element(elem)
+        return AddOn.from_cached_url(url)
 
+    @client.remembered
     def create_add_on(self, add_on):
         """Make the given `AddOn` available to subscribers on this plan."""
         url = urljoin(self._url, '%s/add_ons' % self.plan_code)
@@ -785,6 +867,7 @@ class AddOn(Resource):
     can also subscribe to."""
 
     nodename = 'add_on'
+    cache_ttl = 300
 
     attributes = (
         'add_on_code',
@@ -832,7 +915,7 @@ def objects_for_push_notification(notification):
     their Recurly Resource counterparts. Some attributes will be trimmed in this
     process.
     """
-    notification_el = ElementTree.fromstring(notification)
+    notification_el = xmlbackend.fromstring(notification)
     objects = {'type': notification_el.tag}
     for child_el in notification_el:
         tag = child_el.tag
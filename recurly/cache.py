@@ -0,0 +1,444 @@
+"""
+Caches of API responses and resources.
+
+When ``recurly.RESPONSE_CACHE`` is set to a `ResponseCache`, documents
+requested with `Resource.element_for_url()` that carry an ``ETag`` or
+``Last-Modified`` header are stored in it. Later requests for the same URL
+are sent with ``If-None-Match`` and ``If-Modified-Since`` headers, and when
+the service answers ``304 Not Modified`` the cached document is used instead
+of downloading and parsing it again.
+
+When ``recurly.OBJECT_CACHE`` is set to an `ObjectCache`, rarely changing
+resources such as plans, add-ons and coupons are kept in process for a time
+instead of being requested again at all.
+"""
+
+from collections import OrderedDict
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from urlparse import urljoin
+
+import recurly
+import recurly.client
+from recurly import xmlbackend
+
+
+class CacheEntry(object):
+
+    """A cached API document and the validators to revalidate it with."""
+
+    element_size = 200
+    """The approximate memory taken by each parsed element of a document in
+    bytes, besides its text and attributes."""
+
+    attribute_size = 100
+    """The approximate memory taken by each attribute of a parsed element in
+    bytes, besides its name and value."""
+
+    def __init__(self, body, etag=None, last_modified=None, headers=None,
+                 elem=None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.headers = dict(headers or ())
+        self._elem = elem
+        self._tree_size = None
+
+    @property
+    def size(self):
+        """The approximate memory the entry takes up in bytes: the size of
+        its document, plus an estimate of its parsed element tree once it
+        has been parsed."""
+        return len(self.body) + self.tree_size()
+
+    def tree_size(self):
+        """Return an estimate of the memory taken by the parsed element
+        tree of the document in bytes, or 0 if it hasn't been parsed."""
+        if self._elem is None:
+            return 0
+        if self._tree_size is None:
+            size = 0
+            for elem in self._elem.iter():
+                size += self.element_size + len(elem.text or '') + len(elem.tail or '')
+                for name, value in elem.attrib.iteritems():
+                    size += self.attribute_size + len(name) + len(value)
+            self._tree_size = size
+        return self._tree_size
+
+    def element(self):
+        """Return the parsed root element of the cached document."""
+        if self._elem is None:
+            self._elem = xmlbackend.fromstring(self.body)
+        return self._elem
+
+    def validators(self):
+        """Return the conditional request headers for revalidating this
+        entry."""
+        headers = dict()
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class CachedResponse(object):
+
+    """A stand-in for the `httplib.HTTPResponse` of a document that was
+    revalidated with a ``304 Not Modified`` response.
+
+    Headers are looked up in the ``304`` response first, then in the
+    headers of the cached response.
+
+    """
+
+    def __init__(self, response, entry):
+        self.response = response
+        self.entry = entry
+        self.status = response.status
+        self.reason = response.reason
+
+    def getheader(self, name, default=None):
+        value = self.response.getheader(name)
+        if value is not None:
+            return value
+        for header, value in self.entry.headers.iteritems():
+            if header.lower() == name.lower():
+                return value
+        return default
+
+    def getheaders(self):
+        headers = dict((header.lower(), value) for header, value in self.entry.headers.iteritems())
+        headers.update(self.response.getheaders())
+        return headers.items()
+
+    def read(self, amt=None):
+        return ''
+
+
+class ResponseCache(object):
+
+    """The interface for storage of cached API responses."""
+
+    def get(self, key):
+        """Return the `CacheEntry` stored for the given key, or ``None``."""
+        raise NotImplementedError
+
+    def set(self, key, entry):
+        """Store the given `CacheEntry` for the given key."""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """Remove any entry stored for the given key."""
+        raise NotImplementedError
+
+    def clear(self):
+        """Remove all the stored entries."""
+        raise NotImplementedError
+
+
+class MemoryResponseCache(ResponseCache):
+
+    """A thread-safe, in-process cache of parsed responses.
+
+    Entries are kept with their documents parsed, and each is counted as
+    its `CacheEntry.size`: the length of its document plus an estimate of
+    the memory taken by its parsed element tree, which is several times
+    larger. When the entries total more than `max_size` bytes, the least
+    recently used entries are evicted.
+
+    """
+
+    def __init__(self, max_size=10 * 1024 * 1024):
+        self.max_size = max_size
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                entry, size = self._entries.pop(key)
+            except KeyError:
+                return None
+            self._entries[key] = (entry, size)
+            return entry
+
+    def set(self, key, entry):
+        # Parse the document now, so that the entry's size doesn't grow once
+        # it's been counted.
+        entry.element()
+        size = entry.size
+        with self._lock:
+            self._remove(key)
+            if size > self.max_size:
+                return
+            self._entries[key] = (entry, size)
+            self.size += size
+            while self.size > self.max_size:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        try:
+            entry, size = self._entries.pop(key)
+        except KeyError:
+            return
+        self.size -= size
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class DiskResponseCache(ResponseCache):
+
+    """A cache of responses stored as files in the given directory, which
+    can be shared between processes.
+
+    Each file holds a line of JSON with the entry's validators, headers and
+    a checksum, followed by the document itself. Nothing read from the
+    directory is unpickled or otherwise executed, and a file that can't be
+    read back intact is treated as a cache miss.
+
+    When the cache files total more than `max_size` bytes, the least
+    recently used files are removed until they total no more than nine
+    tenths of it. The total is kept track of as entries are written, so the
+    directory is only listed when the limit may have been passed.
+
+    """
+
+    suffix = '.recurlycache'
+
+    def __init__(self, directory, max_size=100 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        filename = hashlib.sha1(repr(key)).hexdigest() + self.suffix
+        return os.path.join(self.directory, filename)
+
+    @staticmethod
+    def _dump(entry):
+        meta = {
+            'etag': entry.etag,
+            'last_modified': entry.last_modified,
+            'headers': entry.headers,
+            'sha1': hashlib.sha1(entry.body).hexdigest(),
+        }
+        return json.dumps(meta) + '\n' + entry.body
+
+    @staticmethod
+    def _load(data):
+        meta, newline, body = data.partition('\n')
+        try:
+            meta = json.loads(meta)
+            if hashlib.sha1(body).hexdigest() != meta['sha1']:
+                return None
+            headers = dict((_str(name), _str(value)) for name, value in meta['headers'].iteritems())
+            return CacheEntry(body, etag=_str(meta['etag']),
+                last_modified=_str(meta['last_modified']), headers=headers)
+        except Exception:
+            return None
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as cache_file:
+                data = cache_file.read()
+        except IOError:
+            return None
+        entry = self._load(data)
+        if entry is None:
+            self.delete(key)
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return entry
+
+    def set(self, key, entry):
+        path = self._path(key)
+        data = self._dump(entry)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(fd, 'wb') as cache_file:
+            cache_file.write(data)
+        replaced = _file_size(path)
+        os.rename(temp_path, path)
+
+        with self._lock:
+            if self._size is not None:
+                self._size += len(data) - replaced
+            over = self._size is None or self._size > self.max_size
+        if over:
+            self._evict()
+
+    def _evict(self):
+        files = list()
+        total = 0
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(self.suffix):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total > self.max_size:
+            target = self.max_size * 9 // 10
+            files.sort()
+            for mtime, size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+
+        with self._lock:
+            self._size = total
+
+    def delete(self, key):
+        path = self._path(key)
+        size = _file_size(path)
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+    def clear(self):
+        for filename in os.listdir(self.directory):
+            if filename.endswith(self.suffix):
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    pass
+        with self._lock:
+            self._size = None
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _str(value):
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
+
+
+class ObjectCache(object):
+
+    """A thread-safe, in-process cache of the documents of rarely changing
+    resources.
+
+    Instances of a `Resource` class are kept for the number of seconds given
+    for that class in `ttls`, or else in the class's `cache_ttl` attribute;
+    classes with no TTL are not cached. Each lookup returns a new `Resource`
+    instance, so changing one doesn't change what's cached. When more than
+    `max_entries` documents are cached, the least recently used are
+    evicted.
+
+    Saving or deleting a `Resource` instance removes it from the cache. The
+    `hits` and `misses` counters record how many lookups were answered from
+    the cache.
+
+    """
+
+    def __init__(self, max_entries=1000, ttls=None):
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or ())
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ttl_for(self, resource_class):
+        """Return how many seconds instances of the given `Resource` class
+        may be cached, or ``None`` if they shouldn't be cached."""
+        return self.ttls.get(resource_class, resource_class.cache_ttl)
+
+    def key_for(self, resource_class, url):
+        """Return the cache key for the given class of resource at the
+        given URL."""
+        return (resource_class, recurly.client.settings().api_key, url)
+
+    def get(self, key):
+        """Return the element cached for the given key, or ``None`` if it
+        isn't cached or has expired."""
+        with self._lock:
+            try:
+                expires, elem = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            if expires < time.time():
+                self.misses += 1
+                return None
+            self._entries[key] = (expires, elem)
+            self.hits += 1
+            return elem
+
+    def set(self, key, elem, ttl):
+        """Cache the given element for the given key for `ttl` seconds."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + ttl, elem)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Remove any element cached for the given key."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all the cached elements."""
+        with self._lock:
+            self._entries.clear()
+
+    def warm(self):
+        """Request all the plans and their add-ons, and cache them.
+
+        Copies of their elements are cached, so that the pages of plans and
+        add-ons they came from can be freed.
+
+        """
+        plan_ttl = self.ttl_for(recurly.Plan)
+        add_on_ttl = self.ttl_for(recurly.AddOn)
+        base_uri = recurly.client.settings().base_uri
+        for plan in recurly.Plan.all():
+            plan_url = urljoin(base_uri, recurly.Plan.member_path % (plan.plan_code,))
+            if plan_ttl:
+                self.set(self.key_for(recurly.Plan, plan_url), copy.deepcopy(plan._elem),
+                         plan_ttl)
+            if not add_on_ttl:
+                continue
+            for add_on in plan.add_ons():
+                add_on_url = urljoin(plan_url, '%s/add_ons/%s' % (plan.plan_code, add_on.add_on_code))
+                self.set(self.key_for(recurly.AddOn, add_on_url),
+                         copy.deepcopy(add_on._elem), add_on_ttl)
@@ -0,0 +1,175 @@
+"""
+Clients with their own API credentials and connection state.
+
+The settings in the ``recurly`` module, such as ``recurly.API_KEY`` and
+``recurly.CONNECTION_POOL``, are shared by every thread. To use many Recurly
+sites from one process at once, make a `Client` for each site and activate
+it around the calls for that site:
+
+    client = recurly.Client('0123456789abcdef0123456789abcdef')
+    with client:
+        account = recurly.Account.get('verena')
+    account.reopen()
+
+A client is active only on the thread that activated it, so threads can use
+different clients at the same time. Resources and pages fetched or saved
+while a client is active remember it, and use it again for their own
+requests (such as saving, deleting, actions, linked resources and following
+pages) wherever they are used later.
+"""
+
+from contextlib import contextmanager
+from functools import wraps
+import threading
+
+import recurly
+from recurly.compression import Compression
+from recurly.pool import ConnectionPool
+from recurly.transport import HTTPLibTransport
+
+
+_local = threading.local()
+
+_default = object()
+
+
+class Client(object):
+
+    """A set of credentials and connection state for one Recurly site.
+
+    Each client has its own `transport`, `connection_pool`,
+    `connect_timeout`, `read_timeout`, `compression`, `rate_limiter`,
+    `retry_policy`, `single_flight`, `response_cache` and `object_cache`,
+    which take the place of the ``recurly`` module settings of the same
+    names while the client is active. By default a client has an `httplib`
+    transport, a new connection pool and compression, the default timeouts,
+    and no rate limiter, retry policy, single-flight registry or caches.
+
+    """
+
+    def __init__(self, api_key, base_uri='https://api.recurly.com/v2/',
+                 ca_certs_file=None, connection_pool=_default,
+                 rate_limiter=None, retry_policy=None,
+                 response_cache=None, object_cache=None, transport=None,
+                 compression=_default, single_flight=None, connect_timeout=10,
+                 read_timeout=60):
+        self.api_key = api_key
+        self.base_uri = base_uri
+        self.ca_certs_file = ca_certs_file
+        if connection_pool is _default:
+            connection_pool = ConnectionPool(max_size=10, idle_timeout=60)
+        self.connection_pool = connection_pool
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.response_cache = response_cache
+        self.object_cache = object_cache
+        if transport is None:
+            transport = HTTPLibTransport()
+        self.transport = transport
+        if compression is _default:
+            compression = Compression()
+        self.compression = compression
+        self.single_flight = single_flight
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    def __repr__(self):
+        return '<recurly.Client %s>' % (self.base_uri,)
+
+    def __enter__(self):
+        try:
+            stack = _local.stack
+        except AttributeError:
+            stack = _local.stack = list()
+        stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _local.stack.pop()
+
+    def close(self):
+        """Close the client's idle pooled connections."""
+        if self.connection_pool is not None:
+            self.connection_pool.clear()
+        clear = getattr(self.transport, 'clear', None)
+        if clear is not None:
+            clear()
+
+
+class _ModuleSettings(object):
+
+    """The settings of the ``recurly`` module, with the same attributes as
+    a `Client`."""
+
+    api_key = property(lambda self: recurly.API_KEY)
+    base_uri = property(lambda self: recurly.BASE_URI)
+    ca_certs_file = property(lambda self: recurly.CA_CERTS_FILE)
+    connection_pool = property(lambda self: recurly.CONNECTION_POOL)
+    rate_limiter = property(lambda self: recurly.RATE_LIMITER)
+    retry_policy = property(lambda self: recurly.RETRY_POLICY)
+    response_cache = property(lambda self: recurly.RESPONSE_CACHE)
+    object_cache = property(lambda self: recurly.OBJECT_CACHE)
+    transport = property(lambda self: recurly.TRANSPORT)
+    compression = property(lambda self: recurly.COMPRESSION)
+    single_flight = property(lambda self: recurly.SINGLE_FLIGHT)
+    connect_timeout = property(lambda self: recurly.CONNECT_TIMEOUT)
+    read_timeout = property(lambda self: recurly.READ_TIMEOUT)
+
+
+module_settings = _ModuleSettings()
+"""The ``recurly`` module's settings, used when no `Client` is active."""
+
+
+def current():
+    """Return the `Client` active on this thread, or ``None``."""
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        return stack[-1]
+
+
+def settings():
+    """Return the `Client` active on this thread, or else the ``recurly``
+    module's settings."""
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        return stack[-1]
+    return module_settings
+
+
+@contextmanager
+def using(client):
+    """Activate the given `Client` for the duration of a ``with`` block, or
+    do nothing if it is ``None``."""
+    if client is None:
+        yield
+        return
+    with client:
+        yield
+
+
+def bind(func):
+    """Return a function that calls `func` with the client active now (if
+    any) active again, for running `func` on another thread."""
+    client = current()
+    if client is None:
+        return func
+
+    @wraps(func)
+    def call(*args, **kwargs):
+        with client:
+            return func(*args, **kwargs)
+    return call
+
+
+def remembered(method):
+    """Decorate a method of a `Resource` or `Page` to run with the client
+    the instance remembers, if any, active."""
+    @wraps(method)
+    def call(self, *args, **kwargs):
+        client = self.__dict__.get('_client')
+        if client is None:
+            return method(self, *args, **kwargs)
+        with client:
+            return method(self, *args, **kwargs)
+    return call
+
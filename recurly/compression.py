@@ -0,0 +1,157 @@
+"""
+Compressed API responses.
+
+When ``recurly.COMPRESSION`` is set to a `Compression`, as it is by default,
+requests ask for gzip or deflate compressed responses with an
+``Accept-Encoding`` header. API documents are XML, which typically
+compresses to a tenth of its size or less. Decompressing costs little next
+to parsing: even over the loopback interface, where the saved bytes cost
+nothing to send, iterating over a compressed collection takes about as
+long as over an uncompressed one (see ``tests/benchmarks.py``).
+
+Compressed responses are decompressed as they are read, a chunk at a time,
+so that collections streamed with `Resource.elements_for_url()` are parsed
+incrementally as before. The `Compression` counts the bytes received and
+the bytes they decompressed to.
+"""
+
+import threading
+import zlib
+
+
+ENCODINGS = ('gzip', 'deflate')
+"""The content encodings that can be decompressed."""
+
+CHUNK_SIZE = 16384
+"""How many compressed bytes to read from a response at a time."""
+
+
+class Compression(object):
+
+    """Negotiation and decompression of compressed responses.
+
+    Requests ask for responses in the given `encodings`. The
+    `compressed_bytes` and `decompressed_bytes` counters total the bytes of
+    the compressed responses read so far and the bytes they decompressed
+    to, and `responses` counts the compressed responses.
+
+    """
+
+    def __init__(self, encodings=ENCODINGS):
+        unknown = set(encodings) - set(ENCODINGS)
+        if unknown:
+            raise ValueError("Unknown content encodings %s; expected some of %s"
+                % (', '.join(sorted(unknown)), ', '.join(ENCODINGS)))
+        self.encodings = tuple(encodings)
+        self.accept_encoding = ', '.join(self.encodings)
+        self.responses = 0
+        self.compressed_bytes = 0
+        self.decompressed_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def ratio(self):
+        """The ratio of decompressed to compressed bytes so far, or ``None``
+        if no compressed bytes have been read."""
+        with self._lock:
+            if not self.compressed_bytes:
+                return None
+            return float(self.decompressed_bytes) / self.compressed_bytes
+
+    def decode(self, response):
+        """Return the given response, or a `DecompressingResponse` of it if
+        its body is compressed."""
+        encoding = response.getheader('Content-Encoding')
+        if encoding is None:
+            return response
+        encoding = encoding.strip().lower()
+        if encoding not in ENCODINGS:
+            return response
+        with self._lock:
+            self.responses += 1
+        return DecompressingResponse(response, encoding, self)
+
+    def count(self, compressed, decompressed):
+        with self._lock:
+            self.compressed_bytes += compressed
+            self.decompressed_bytes += decompressed
+
+
+class DecompressingResponse(object):
+
+    """A view of a compressed `httplib.HTTPResponse` (or transport response)
+    whose `read()` method returns the decompressed body.
+
+    The compressed body is read from the underlying response in chunks only
+    as the decompressed body is read, so it need not fit in memory at once.
+    The ``Content-Encoding`` and ``Content-Length`` headers of the compressed
+    body are hidden.
+
+    """
+
+    hidden_headers = ('content-encoding', 'content-length')
+
+    def __init__(self, response, encoding, compression):
+        self.response = response
+        self.status = response.status
+        self.reason = response.reason
+        self.encoding = encoding
+        self.compression = compression
+        if encoding == 'gzip':
+            self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        else:
+            self._decompressor = zlib.decompressobj()
+        self._started = False
+        self._buffer = ''
+        self._offset = 0
+        self._finished = False
+
+    def getheader(self, name, default=None):
+        if name.lower() in self.hidden_headers:
+            return default
+        return self.response.getheader(name, default)
+
+    def getheaders(self):
+        return [(name, value) for name, value in self.response.getheaders()
+            if name.lower() not in self.hidden_headers]
+
+    def _decompress(self, data):
+        try:
+            return self._decompressor.decompress(data)
+        except zlib.error:
+            # Some servers send "deflate" bodies without the zlib header
+            # and checksum. That is only detectable at the start.
+            if self._started or self.encoding != 'deflate':
+                raise
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._decompressor.decompress(data)
+        finally:
+            self._started = True
+
+    def _fill(self):
+        data = self.response.read(CHUNK_SIZE)
+        if data:
+            decompressed = self._decompress(data)
+        else:
+            decompressed = self._decompressor.flush()
+            self._finished = True
+        self.compression.count(len(data), len(decompressed))
+        self._buffer = self._buffer[self._offset:] + decompressed
+        self._offset = 0
+
+    def read(self, amt=None):
+        if amt is None:
+            while not self._finished:
+                self._fill()
+            data = self._buffer[self._offset:]
+            self._buffer, self._offset = '', 0
+            return data
+
+        while len(self._buffer) - self._offset < amt and not self._finished:
+            self._fill()
+        data = self._buffer[self._offset:self._offset + amt]
+        self._offset += len(data)
+        return data
+
+    def close(self):
+        self.response.close()
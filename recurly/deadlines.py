@@ -0,0 +1,122 @@
+"""
+Time limits covering many API requests.
+
+Each request is limited by the ``recurly.CONNECT_TIMEOUT`` and
+``recurly.READ_TIMEOUT`` socket timeouts, but an operation made of many
+requests, such as iterating over every page of a collection, can take any
+amount of time. To limit the whole operation, make its requests inside a
+`deadline()` block:
+
+    with recurly.deadline(30):
+        for account in recurly.Account.all():
+            ...
+
+Every request started inside the block must finish by the deadline. This
+includes the requests for following pages and the requests that bulk
+methods such as `Resource.get_many()` make on other threads. Socket
+timeouts are shortened to the time remaining, and retries and rate limiting
+will not wait past the deadline. Once the time is up, a
+`recurly.errors.DeadlineExceededError` is raised instead of sending more
+requests.
+
+A deadline applies only on the thread that entered its block (and the
+threads working on that thread's behalf). Deadlines can be nested, in which
+case the earliest one applies.
+"""
+
+from functools import wraps
+import threading
+import time
+
+
+_local = threading.local()
+
+
+class Deadline(object):
+
+    """A time limit `seconds` long for the API requests made in a ``with``
+    block, starting when the block is entered.
+
+    While the block runs, `expires` is the time the deadline passes, which
+    may be earlier than `seconds` from the start if an enclosing deadline
+    passes first.
+
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = None
+
+    def __repr__(self):
+        return '<recurly.deadlines.Deadline %ss>' % (self.seconds,)
+
+    def __enter__(self):
+        expires = time.time() + self.seconds
+        outer = current()
+        if outer is not None:
+            expires = min(expires, outer.expires)
+        self.expires = expires
+        _stack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _stack().pop()
+
+    def remaining(self):
+        """Return the number of seconds until the deadline passes, which is
+        negative once it has passed."""
+        return self.expires - time.time()
+
+
+def deadline(seconds):
+    """Return a `Deadline` limiting the requests made in a ``with`` block to
+    `seconds` seconds."""
+    return Deadline(seconds)
+
+
+def _stack():
+    try:
+        return _local.stack
+    except AttributeError:
+        stack = _local.stack = list()
+        return stack
+
+
+def current():
+    """Return the `Deadline` active on this thread, or ``None``."""
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        return stack[-1]
+
+
+def remaining():
+    """Return the number of seconds left before the active deadline passes,
+    or ``None`` if no deadline is active."""
+    active = current()
+    if active is not None:
+        return active.remaining()
+
+
+def expired(margin=0):
+    """Return whether a deadline is active and has passed, or will pass
+    within `margin` seconds."""
+    active = current()
+    return active is not None and active.remaining() <= margin
+
+
+def bind(func):
+    """Return a function that calls `func` under the deadline active now
+    (if any), for running `func` on another thread."""
+    active = current()
+    if active is None:
+        return func
+
+    @wraps(func)
+    def call(*args, **kwargs):
+        stack = _stack()
+        stack.append(active)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stack.pop()
+    return call
@@ -1,4 +1,4 @@
-from xml.etree import ElementTree
+from recurly import xmlbackend
 
 
 class ResponseError(Exception):
@@ -15,7 +15,7 @@ class ResponseError(Exception):
         try:
             return self.__dict__['response_doc']
         except KeyError:
-            self.__dict__['response_doc'] = ElementTree.fromstring(self.response_xml)
+            self.__dict__['response_doc'] = xmlbackend.fromstring(self.response_xml)
             return self.__dict__['response_doc']
 
     @property
@@ -234,6 +234,18 @@ class UnexpectedStatusError(ResponseError):
         return unicode(self.status)
 
 
+class DeadlineExceededError(Exception):
+
+    """An error showing that the time allowed by a `recurly.deadline()`
+    ran out before an API request could be completed.
+
+    The request may not have been sent, or may have been sent without its
+    response being received in time.
+
+    """
+    pass
+
+
 error_classes = {
     400: BadRequestError,
     401: UnauthorizedError,
@@ -261,4 +273,4 @@ def error_class_for_http_status(status):
         return new_status_error
 
 
-__all__ = [x.__name__ for x in error_classes.values()]
+__all__ = [x.__name__ for x in error_classes.values()] + ['DeadlineExceededError']
@@ -0,0 +1,238 @@
+"""
+Timing events for observing API requests.
+
+Functions added to the ``recurly.OBSERVERS`` list are called with an `Event`
+as each of these operations finishes:
+
+``'request'``
+    An HTTP request, including any retries, up to the receipt of its
+    response's headers. Its timings may include ``connect`` (the time to
+    open a new connection, including any TLS handshake), ``tls`` (the TLS
+    handshake alone, when it can be measured) and ``first_byte`` (the time
+    from sending the request until its response began).
+
+``'document'``
+    A ``GET`` of an API document by `Resource.element_for_url()`, with
+    ``request``, ``read`` and ``parse`` timings. Failed requests for
+    documents are sent too, with the exception raised as their `error`.
+
+``'action'``
+    A resource action such as `Subscription.cancel()`.
+
+Events are tagged with the request's method, the template of its path (such
+as ``'accounts/%s/adjustments'``) and its response status, so that they can
+be fed to a metrics system:
+
+    def record_timing(event):
+        statsd.timing('recurly.%s.%s' % (event.name, event.method), event.duration * 1000)
+
+    recurly.OBSERVERS.append(record_timing)
+
+Observers are called on the thread that made the request. Exceptions raised
+by observers are logged to the ``recurly.events`` logger and otherwise
+ignored.
+"""
+
+from contextlib import contextmanager
+import logging
+import threading
+import time
+from urlparse import urlsplit
+
+import recurly
+import recurly.client
+
+
+log = logging.getLogger('recurly.events')
+
+_local = threading.local()
+
+
+PATH_TEMPLATES = [
+    'recurly_js/result/%s',
+]
+"""Templates of API paths that don't follow the usual alternation of names
+and identifiers, tried by `path_template()` after those of the resource
+class."""
+
+
+def path_template(url, resource_class=None):
+    """Return the path of the given API URL relative to ``recurly.BASE_URI``
+    (or the active `recurly.Client`'s base URI), with the codes, UUIDs and
+    tokens identifying resources replaced by ``%s``.
+
+    For example, both ``https://api.recurly.com/v2/accounts/1`` and
+    ``https://api.recurly.com/v2/accounts/2`` have the template
+    ``'accounts/%s'``, as in their resource class's `member_path`.
+
+    The path is matched against the given resource class's `member_path`
+    and `collection_path`, then the `PATH_TEMPLATES`. Past the matched
+    template (if any), segments are taken to alternate between the names of
+    collections or actions and the identifiers of their members.
+
+    """
+    path = urlsplit(url).path
+    base_path = urlsplit(recurly.client.settings().base_uri).path
+    if path.startswith(base_path):
+        path = path[len(base_path):]
+    segments = path.strip('/').split('/')
+
+    templates = [getattr(resource_class, 'member_path', None),
+        getattr(resource_class, 'collection_path', None)] + PATH_TEMPLATES
+    prefix = []
+    for template in templates:
+        if not template:
+            continue
+        template_segments = template.split('/')
+        if len(template_segments) <= len(segments) and all(
+                expected in ('%s', segment)
+                for expected, segment in zip(template_segments, segments)):
+            prefix = template_segments
+            break
+
+    # A member's identifier follows its collection's name.
+    identifier = 1 if not prefix or prefix[-1] == '%s' else 0
+    rest = segments[len(prefix):]
+    return '/'.join(prefix + ['%s' if index % 2 == identifier else segment
+        for index, segment in enumerate(rest)])
+
+
+class Event(object):
+
+    """A timed API operation.
+
+    The `started` time and `duration` are in seconds, as are the values of
+    the `timings` dictionary of the operation's phases. `error` is the
+    exception the operation raised, if any.
+
+    """
+
+    def __init__(self, name, method, url, resource_class=None):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.path = path_template(url, resource_class)
+        self.resource_class = resource_class
+        self.status = None
+        self.error = None
+        self.attempts = 1
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.timings = dict()
+        self.started = time.time()
+        self.duration = None
+
+    def __repr__(self):
+        return '<recurly.events.Event %s %s %s %r>' % (self.name, self.method,
+            self.path, self.status)
+
+    @property
+    def tags(self):
+        """The event's name, method, path template and status as a
+        dictionary, for labelling metrics."""
+        return {
+            'name': self.name,
+            'method': self.method,
+            'path': self.path,
+            'status': self.status,
+        }
+
+    def add_timing(self, phase, seconds):
+        """Add the given number of seconds to the timing of the given
+        phase."""
+        self.timings[phase] = self.timings.get(phase, 0) + seconds
+
+    def finish(self):
+        """Record the event's duration and send it to the observers."""
+        self.duration = time.time() - self.started
+        emit(self)
+
+
+def emit(event):
+    """Call each of the ``recurly.OBSERVERS`` with the given event."""
+    for observer in list(recurly.OBSERVERS):
+        try:
+            observer(event)
+        except Exception:
+            log.exception("Observer %r failed for event %r", observer, event)
+
+
+@contextmanager
+def timing(event):
+    """Add the time taken to connect the connections prepared with
+    `time_connection()` while in the block on this thread to the given
+    event's ``connect`` timing, or to no event for ``None``."""
+    previous = getattr(_local, 'event', None)
+    _local.event = event
+    try:
+        yield
+    finally:
+        _local.event = previous
+
+
+def time_connection(connection):
+    """Arrange for the time the given `httplib.HTTPConnection` takes to
+    connect to be added to the ``connect`` timing of the event being timed
+    with `timing()` each time it connects."""
+    connect = connection.connect
+
+    def timed_connect():
+        event = getattr(_local, 'event', None)
+        if event is None:
+            return connect()
+        connection.tls_time = None
+        started = time.time()
+        connect()
+        event.add_timing('connect', time.time() - started)
+        if connection.tls_time is not None:
+            event.add_timing('tls', connection.tls_time)
+
+    connection.connect = timed_connect
+
+
+class Summary(object):
+
+    """An observer that totals events by their tags.
+
+    For each combination of event name, method, path template and status,
+    the `stats` dictionary holds a dictionary of the ``count`` of events and
+    their total ``duration``, ``bytes_sent``, ``bytes_received`` and phase
+    timings. Use `snapshot()` to read it safely from another thread.
+
+    """
+
+    def __init__(self):
+        self.stats = dict()
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        key = (event.name, event.method, event.path, event.status)
+        with self._lock:
+            try:
+                stats = self.stats[key]
+            except KeyError:
+                stats = self.stats[key] = {
+                    'count': 0,
+                    'duration': 0.0,
+                    'bytes_sent': 0,
+                    'bytes_received': 0,
+                    'timings': dict(),
+                }
+            stats['count'] += 1
+            stats['duration'] += event.duration
+            stats['bytes_sent'] += event.bytes_sent
+            stats['bytes_received'] += event.bytes_received
+            timings = stats['timings']
+            for phase, seconds in event.timings.iteritems():
+                timings[phase] = timings.get(phase, 0) + seconds
+
+    def snapshot(self):
+        """Return a copy of the current `stats`."""
+        with self._lock:
+            return dict((key, dict(stats, timings=dict(stats['timings'])))
+                for key, stats in self.stats.iteritems())
+
+    def clear(self):
+        """Forget all the events totalled so far."""
+        with self._lock:
+            self.stats.clear()
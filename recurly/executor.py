@@ -0,0 +1,132 @@
+"""
+Running API requests in the background.
+
+An `Executor` runs submitted calls on a bounded set of worker threads and
+returns a `Future` for each call's result. Callers can wait on a `Future`, or
+register a callback to be notified when it completes; event-driven programs
+can use callbacks to hand results back to their event loop without blocking
+it on network I/O.
+"""
+
+import logging
+import Queue
+import sys
+import threading
+
+
+log = logging.getLogger('recurly.executor')
+
+
+class TimeoutError(Exception):
+    """An error raised when waiting for the result of a `Future` takes
+    longer than the given timeout."""
+    pass
+
+
+class Future(object):
+
+    """The eventual result of a call submitted to an `Executor`."""
+
+    def __init__(self):
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = list()
+        self._result = None
+        self._exc_info = None
+
+    def done(self):
+        """Return whether the call has completed."""
+        return self._finished.is_set()
+
+    def result(self, timeout=None):
+        """Return the call's result, waiting up to `timeout` seconds for
+        it to complete.
+
+        If the call raised an exception, that exception is raised again
+        here. If the call does not complete in time, `TimeoutError` is
+        raised.
+
+        """
+        if not self._finished.wait(timeout):
+            raise TimeoutError("Call did not complete within %r seconds" % timeout)
+        if self._exc_info is not None:
+            raise self._exc_info[0], self._exc_info[1], self._exc_info[2]
+        return self._result
+
+    def exception(self, timeout=None):
+        """Return the exception the call raised, or ``None`` if it
+        completed successfully, waiting as `result()` does."""
+        if not self._finished.wait(timeout):
+            raise TimeoutError("Call did not complete within %r seconds" % timeout)
+        if self._exc_info is not None:
+            return self._exc_info[1]
+
+    def add_done_callback(self, callback):
+        """Arrange for `callback` to be called with this `Future` when the
+        call completes.
+
+        Callbacks run on the worker thread that ran the call, or
+        immediately if the call has already completed. An exception raised
+        by a callback is logged and otherwise ignored.
+
+        """
+        with self._lock:
+            if not self._finished.is_set():
+                self._callbacks.append(callback)
+                return
+        self._call_back(callback)
+
+    def _call_back(self, callback):
+        try:
+            callback(self)
+        except Exception:
+            log.exception("Callback %r failed for %r", callback, self)
+
+    def _finish(self, result, exc_info):
+        self._result = result
+        self._exc_info = exc_info
+        with self._lock:
+            self._finished.set()
+            callbacks, self._callbacks = self._callbacks, list()
+        for callback in callbacks:
+            self._call_back(callback)
+
+
+class Executor(object):
+
+    """A pool of up to `workers` daemon threads that run submitted calls.
+
+    Threads are started as calls are submitted, so an `Executor` that is
+    never used costs nothing.
+
+    """
+
+    def __init__(self, workers=16):
+        self.workers = workers
+        self._calls = Queue.Queue()
+        self._threads = list()
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """Schedule ``func(*args, **kwargs)`` to be run on a worker thread,
+        returning a `Future` for its result."""
+        future = Future()
+        self._calls.put((future, func, args, kwargs))
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            if len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+        return future
+
+    def _work(self):
+        while True:
+            future, func, args, kwargs = self._calls.get()
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                future._finish(None, sys.exc_info())
+            else:
+                future._finish(result, None)
@@ -0,0 +1,265 @@
+"""
+Bulk export of API collections to newline-delimited JSON or CSV files.
+
+`export()` writes every member of a collection, page by page, parsing each
+page incrementally so that memory use stays bounded however large the
+collection is:
+
+    with open('invoices.ndjson', 'ab') as fp:
+        recurly.export(recurly.Invoice.all_collected(per_page=200), fp=fp,
+                       checkpoint='invoices.checkpoint')
+
+When given a `checkpoint` filename, the export records its progress in that
+file after each page. If the export is interrupted, calling `export()` again
+with the same checkpoint and output file resumes it from the page after the
+last one completely written.
+"""
+
+import csv
+from datetime import datetime
+import json
+import os
+import sys
+import tempfile
+
+import recurly.client
+from recurly.link_header import parse_link_value
+from recurly.resource import Money, Page, Resource
+
+
+FORMATS = ('ndjson', 'csv')
+"""The names of the supported export formats."""
+
+
+def plain_value(value):
+    """Convert the given `Resource` attribute value to plain JSON-compatible
+    data.
+
+    Resources become dictionaries of their values, with linked resources
+    represented by their URLs; `Money` becomes a dictionary of amounts by
+    currency; and datetimes become ISO 8601 strings. Linked resources are
+    not requested.
+
+    """
+    if isinstance(value, Resource):
+        value = _resource_data(value)
+    if isinstance(value, dict):
+        return dict((key, plain_value(item)) for key, item in value.iteritems())
+    if isinstance(value, Money):
+        return dict(value.currencies)
+    if isinstance(value, (list, tuple)):
+        return [plain_value(item) for item in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _resource_data(resource):
+    # Read values from the resource's document rather than with getattr(),
+    # which requests some linked resources (such as an account's billing
+    # info) instead of returning their URLs.
+    data = dict()
+    selfnode = resource.__dict__.get('_elem')
+    for attrname in set(resource.attributes + resource.linked_attributes):
+        if attrname in resource.__dict__:
+            data[attrname] = resource.__dict__[attrname]
+        elif selfnode is None:
+            continue
+        elif attrname in resource.xml_attribute_attributes:
+            if attrname in selfnode.attrib:
+                data[attrname] = selfnode.attrib[attrname]
+        else:
+            elem = selfnode.find(resource.__getpath__(attrname))
+            if elem is None:
+                continue
+            if 'href' in elem.attrib:
+                data[attrname] = elem.attrib['href']
+            else:
+                data[attrname] = resource.value_for_element(elem)
+    return data
+
+
+def flat_row(data, prefix=''):
+    """Flatten the given plain data into a single-level dictionary, joining
+    the keys of nested dictionaries with dots (as in
+    ``unit_amount_in_cents.USD``) and encoding lists as JSON."""
+    row = dict()
+    for key, value in data.iteritems():
+        key = prefix + key
+        if isinstance(value, dict):
+            row.update(flat_row(value, key + '.'))
+        elif isinstance(value, list):
+            row[key] = json.dumps(value, sort_keys=True)
+        else:
+            row[key] = value
+    return row
+
+
+class _NDJSONWriter(object):
+
+    def __init__(self, fp, fields):
+        self.fp = fp
+        self.fields = fields
+
+    def write(self, data):
+        if self.fields is not None:
+            data = flat_row(data)
+            data = dict((field, data.get(field)) for field in self.fields)
+        self.fp.write(json.dumps(data, sort_keys=True))
+        self.fp.write('\n')
+
+
+class _CSVWriter(object):
+
+    def __init__(self, fp, fields, header):
+        self.fp = fp
+        self.fields = fields
+        self.header = header
+        self.writer = None
+
+    def write(self, data):
+        row = flat_row(data)
+        if self.writer is None:
+            if self.fields is None:
+                self.fields = sorted(row)
+            self.writer = csv.writer(self.fp)
+            if self.header:
+                self.writer.writerow(self.fields)
+        self.writer.writerow([_csv_value(row.get(field)) for field in self.fields])
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
+
+
+def _read_checkpoint(checkpoint):
+    try:
+        with open(checkpoint, 'rb') as checkpoint_file:
+            return json.load(checkpoint_file)
+    except IOError:
+        return None
+
+
+def _write_checkpoint(checkpoint, state):
+    directory = os.path.dirname(os.path.abspath(checkpoint))
+    fd, temp_path = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'wb') as checkpoint_file:
+        json.dump(state, checkpoint_file)
+    os.rename(temp_path, checkpoint)
+
+
+def _next_url(response):
+    for url, data in parse_link_value(response.getheader('Link')).iteritems():
+        if data.get('rel') == 'next':
+            return url
+
+
+def _seekable(fp):
+    seekable = getattr(fp, 'seekable', None)
+    if seekable is not None:
+        return seekable()
+    # Python 2 files only fail to seek when asked to.
+    try:
+        fp.seek(0, os.SEEK_CUR)
+        fp.tell()
+    except (AttributeError, IOError, OSError):
+        return False
+    return True
+
+
+def export(source, fmt='ndjson', fp=None, fields=None, checkpoint=None):
+    """Write every member of the collection starting at `source` to the
+    file-like `fp` (standard output by default), returning how many members
+    were written.
+
+    `source` may be a `Page`, such as one returned by `Resource.all()`, or
+    the URL of a collection. With `fmt` ``'ndjson'``, each member is written
+    as a line of JSON; with ``'csv'``, each member is a row of CSV after a
+    header row. CSV columns are named by `fields`, or else by the values of
+    the first member exported, with nested values named with dots (such as
+    ``unit_amount_in_cents.USD``). Members are converted with
+    `plain_value()`.
+
+    If a `checkpoint` filename is given, the export's progress is saved to
+    it after each page is written. An export begun with an existing
+    checkpoint resumes from the page after the last one saved, truncating
+    `fp` back to where that page ended (so `fp` should be opened for
+    appending, not truncated). As its position is recorded, `fp` must be a
+    seekable file when a `checkpoint` is given; a `ValueError` is raised
+    before anything is written if it is not (as when standard output is a
+    pipe). The checkpoint file is removed when the export completes.
+
+    """
+    if fmt not in FORMATS:
+        raise ValueError("Unknown export format %r; expected one of %s"
+            % (fmt, ', '.join(FORMATS)))
+    if fp is None:
+        fp = sys.stdout
+    if checkpoint is not None and not _seekable(fp):
+        raise ValueError("Cannot checkpoint an export to %r, which is not seekable" % (fp,))
+
+    state = _read_checkpoint(checkpoint) if checkpoint is not None else None
+    if state is not None:
+        url = state['next_url']
+        count = state['count']
+        fields = state.get('fields', fields)
+        fp.seek(state['position'])
+        fp.truncate()
+        page = None
+    elif isinstance(source, Page):
+        url = getattr(source, 'next_url', None)
+        count = 0
+        page = source
+    else:
+        url = source
+        count = 0
+        page = None
+
+    if fmt == 'csv':
+        writer = _CSVWriter(fp, fields, header=state is None)
+    else:
+        writer = _NDJSONWriter(fp, fields)
+
+    def save_progress(next_url):
+        if checkpoint is None:
+            return
+        fp.flush()
+        _write_checkpoint(checkpoint, {
+            'next_url': next_url,
+            'count': count,
+            'position': fp.tell(),
+            'fields': writer.fields,
+        })
+
+    if page is not None:
+        for resource in list.__iter__(page):
+            writer.write(plain_value(resource))
+            count += 1
+        page = None
+        save_progress(url)
+
+    # Request the following pages with the client the source page was
+    # fetched with, as its own next_page() would.
+    client = source.__dict__.get('_client') if isinstance(source, Page) else None
+    with recurly.client.using(client):
+        while url is not None:
+            response, elems = Resource.elements_for_url(url)
+            url = _next_url(response)
+            for elem in elems:
+                resource = Resource._subclass_for_nodename(elem.tag).from_element(elem)
+                writer.write(plain_value(resource))
+                count += 1
+            save_progress(url)
+
+    if checkpoint is not None:
+        try:
+            os.remove(checkpoint)
+        except OSError:
+            pass
+    return count
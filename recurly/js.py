@@ -8,6 +8,7 @@ import urllib
 from urlparse import urlsplit, urljoin
 
 import recurly
+import recurly.client
 
 
 PRIVATE_KEY = None
@@ -39,7 +40,7 @@ def sign(*records):
 
 
 def fetch(token):
-    url = urljoin(recurly.BASE_URI, 'recurly_js/result/%s' % token)
+    url = urljoin(recurly.client.settings().base_uri, 'recurly_js/result/%s' % token)
     resp, elem = recurly.Resource.element_for_url(url)
     cls = recurly.Resource.value_for_element(elem)
     return cls.from_element(elem)
@@ -0,0 +1,210 @@
+import httplib
+import os
+import select
+import socket
+import threading
+import time
+
+
+_unchanged = object()
+
+
+def _write(connection, method, url, body, headers, read_timeout):
+    if read_timeout is not _unchanged and connection.sock is not None:
+        connection.sock.settimeout(read_timeout)
+    try:
+        connection.request(method, url, body, headers)
+    except Exception, exc:
+        if connection.sock is None:
+            # The connection could not be opened, so nothing was sent.
+            exc.request_sent = False
+        raise
+    if read_timeout is not _unchanged and connection.sock is not None:
+        connection.sock.settimeout(read_timeout)
+
+
+def _dropped(connection):
+    """Return whether the given idle connection can no longer be used."""
+    sock = connection.sock
+    if sock is None:
+        return True
+    # An idle keep-alive connection has nothing to read, so a readable
+    # socket was either closed by the server or sent something unexpected.
+    try:
+        if hasattr(select, 'poll'):
+            poller = select.poll()
+            poller.register(sock, select.POLLIN)
+            return bool(poller.poll(0))
+        readable, _, _ = select.select([sock], [], [], 0)
+        return bool(readable)
+    except (select.error, socket.error, TypeError, ValueError):
+        return True
+
+
+def _send(connection, method, url, body, headers, read_timeout):
+    _write(connection, method, url, body, headers, read_timeout)
+    return connection.getresponse()
+
+
+class ConnectionPool(object):
+
+    """A thread-safe pool of persistent HTTP/1.1 connections.
+
+    Idle connections are kept per ``(scheme, host, port)`` key so that
+    later requests to the same endpoint can reuse an open keep-alive socket
+    instead of paying for a new TCP connection and TLS handshake.
+
+    At most `max_size` idle connections are kept for each key, and
+    connections left idle for longer than `idle_timeout` seconds are closed
+    rather than reused, as are connections the server has closed while they
+    sat idle. The `hits` and `misses` counters record how many
+    requests were sent over a reused connection and how many needed a new
+    one.
+
+    A pool used after a ``fork()`` discards the connections it held in the
+    parent process, so the two processes never share a socket.
+
+    """
+
+    stale_errors = (socket.error, httplib.BadStatusLine,
+                    httplib.CannotSendRequest, httplib.ResponseNotReady)
+    """Errors that show a reused connection was closed by the server while
+    it sat idle in the pool."""
+
+    safe_methods = frozenset(('GET', 'HEAD'))
+    """Methods whose requests can be sent again if a reused connection
+    fails after the request was written, since they change nothing on the
+    server."""
+
+    def __init__(self, max_size=10, idle_timeout=60):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.hits = 0
+        self.misses = 0
+        self._idle = dict()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _check_pid(self):
+        # A child process must not use the sockets it inherited, which are
+        # still in use by its parent.
+        pid = os.getpid()
+        if pid != self._pid:
+            self._idle = dict()
+            self._lock = threading.Lock()
+            self._pid = pid
+
+    def acquire(self, key, create):
+        """Return a ``(connection, reused)`` tuple for the given key.
+
+        An idle connection for the key is returned if one is available and
+        still open; otherwise a new connection is made by calling `create`.
+
+        """
+        self._check_pid()
+        now = time.time()
+        expired = list()
+        connection = None
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                conn, released_at = idle.pop()
+                if ((self.idle_timeout is not None and now - released_at > self.idle_timeout)
+                        or _dropped(conn)):
+                    expired.append(conn)
+                    continue
+                connection = conn
+                break
+            if connection is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        for conn in expired:
+            conn.close()
+
+        if connection is None:
+            return create(), False
+        return connection, True
+
+    def release(self, key, connection):
+        """Return the given connection to the pool for reuse.
+
+        Connections that the server or `httplib` already closed, and
+        connections beyond the pool's `max_size`, are discarded.
+
+        """
+        if connection.sock is None:
+            return
+        self._check_pid()
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_size:
+                idle.append((connection, time.time()))
+                return
+        connection.close()
+
+    def request(self, key, create, method, url, body=None, headers=None,
+                read_timeout=_unchanged):
+        """Send a request over a pooled connection, returning the
+        `httplib.HTTPResponse`.
+
+        Idle connections the server has closed are skipped before anything
+        is sent over them. If a reused connection still turns out to have
+        gone stale, the request is sent again once over a new connection. A request that was already
+        written when the connection failed is only sent again if its method
+        is one of the `safe_methods`, since the server may have acted on it
+        before closing the connection. The connection is returned to
+        the pool once the response has been read completely, or at once for
+        a response with no body.
+
+        If a `read_timeout` is given, the connection's socket is given that
+        timeout (or none, for ``None``) once it is connected.
+
+        """
+        headers = {} if headers is None else headers
+        connection, reused = self.acquire(key, create)
+        written = False
+        try:
+            _write(connection, method, url, body, headers, read_timeout)
+            written = True
+            resp = connection.getresponse()
+        except self.stale_errors, exc:
+            connection.close()
+            # A timeout shows the server is slow, not that it closed the
+            # connection, so don't wait for it all over again.
+            if not reused or isinstance(exc, socket.timeout):
+                raise
+            if written and method not in self.safe_methods:
+                raise
+            connection = create()
+            resp = _send(connection, method, url, body, headers, read_timeout)
+
+        if not resp.isclosed() and (method == 'HEAD' or resp.status in (204, 304)
+                                    or resp.length == 0):
+            # httplib leaves even a bodiless response open until it's read,
+            # which callers such as delete() never do.
+            resp.close()
+        if resp.isclosed():
+            self.release(key, connection)
+        else:
+            self._release_on_close(key, connection, resp)
+        return resp
+
+    def _release_on_close(self, key, connection, resp):
+        response_close = resp.close
+
+        def close():
+            response_close()
+            resp.close = response_close
+            self.release(key, connection)
+        resp.close = close
+
+    def clear(self):
+        """Close and discard all the idle connections in the pool."""
+        self._check_pid()
+        with self._lock:
+            idle, self._idle = self._idle, dict()
+        for conns in idle.itervalues():
+            for conn, released_at in conns:
+                conn.close()
@@ -0,0 +1,115 @@
+import threading
+import time
+
+
+class RateLimiter(object):
+
+    """A token bucket limiting how fast API requests are sent.
+
+    One `RateLimiter` can be shared by any number of threads. Requests are
+    sent at up to `rate` requests per second on average, with bursts of up
+    to `burst` requests.
+
+    The limiter also adapts to the ``X-RateLimit-Remaining`` and
+    ``X-RateLimit-Reset`` headers of API responses. While they show fewer
+    requests remaining than `rate` would use before the limit resets, the
+    limiter slows to spread the remaining requests evenly over the time
+    left. When no requests remain, or the service responds with ``429 Too
+    Many Requests``, requests wait until the limit resets.
+
+    The `waits` and `waited` counters record how many requests had to wait
+    and for how many seconds in total.
+
+    """
+
+    min_rate = 0.1
+    """The slowest rate, in requests per second, the limiter will adapt
+    down to."""
+
+    def __init__(self, rate=10.0, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+        self.waits = 0
+        self.waited = 0.0
+        self._current_rate = self.rate
+        self._tokens = self.burst
+        self._updated = time.time()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    @property
+    def current_rate(self):
+        """The rate, in requests per second, the limiter is currently
+        allowing."""
+        return self._current_rate
+
+    def _refill(self, now):
+        elapsed = max(0, now - self._updated)
+        self._tokens = min(self.burst, self._tokens + elapsed * self._current_rate)
+        self._updated = now
+
+    def acquire(self, timeout=None):
+        """Wait until another request may be sent, returning ``True``.
+
+        If a `timeout` is given and the request could not be sent within
+        that many seconds, return ``False`` as soon as that is known.
+
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.time()
+                self._refill(now)
+                # Allow for rounding error in the refilled tokens.
+                if now >= self._paused_until and self._tokens >= 1 - 1e-6:
+                    self._tokens = max(0, self._tokens - 1)
+                    if waited:
+                        self.waits += 1
+                        self.waited += waited
+                    return True
+                delay = max(self._paused_until - now,
+                            (1 - self._tokens) / self._current_rate)
+            if timeout is not None and waited + delay > timeout:
+                return False
+            time.sleep(delay)
+            waited += delay
+
+    def update(self, response):
+        """Adapt the rate to the rate-limit headers and status of the
+        given `httplib.HTTPResponse`."""
+        now = time.time()
+        remaining = _number(response.getheader('X-RateLimit-Remaining'))
+        reset = _number(response.getheader('X-RateLimit-Reset'))
+        if reset is not None and reset < 1000000000:
+            # A number of seconds rather than a timestamp.
+            reset += now
+
+        with self._lock:
+            self._refill(now)
+            if response.status == 429:
+                retry_after = _number(response.getheader('Retry-After'))
+                if retry_after is not None:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+                elif reset is not None:
+                    self._paused_until = max(self._paused_until, reset)
+                self._tokens = 0
+
+            if remaining is None or reset is None:
+                self._current_rate = self.rate
+                return
+            if remaining <= 0:
+                self._paused_until = max(self._paused_until, reset)
+            window = reset - now
+            if window > 0:
+                self._current_rate = max(self.min_rate, min(self.rate, remaining / window))
+            else:
+                self._current_rate = self.rate
+
+
+def _number(value):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
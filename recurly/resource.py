@@ -1,21 +1,34 @@
 import base64
+import copy
 from datetime import datetime
-import httplib
+import json
 import logging
+import Queue
 import socket
-import ssl
+import sys
+import threading
+import time
 from urllib import urlencode
-from urlparse import urlsplit, urljoin
-from xml.etree import ElementTree
+from urlparse import urljoin
 
 import iso8601
-import backports.ssl_match_hostname
 
 import recurly
+import recurly.cache
+import recurly.client
+import recurly.deadlines
 import recurly.errors
+import recurly.events
+import recurly.retry
+from recurly import xmlbackend
 from recurly.link_header import parse_link_value
 
 
+request_log = logging.getLogger('recurly.http.request')
+response_log = logging.getLogger('recurly.http.response')
+resource_log = logging.getLogger('recurly.resource')
+
+
 class Money(object):
 
     """An amount of money in one or more currencies."""
@@ -44,7 +57,7 @@ class Money(object):
 
     def add_to_element(self, elem):
         for currency, amount in self.currencies.items():
-            currency_el = ElementTree.Element(currency)
+            currency_el = xmlbackend.Element(currency)
             currency_el.attrib['type'] = 'integer'
             currency_el.text = unicode(amount)
             elem.append(currency_el)
@@ -84,6 +97,14 @@ class Page(list):
     Use `Page` instances as `list` instances to access their contents.
 
     """
+    def __reduce__(self):
+        # Copy only this page's members, rather than iterating, which would
+        # request the following pages. The remembered client holds locks
+        # and open connections, so it isn't copied.
+        state = self.__dict__.copy()
+        state.pop('_client', None)
+        return (type(self), (list(list.__iter__(self)),), state)
+
     def __iter__(self):
         if not self:
             raise StopIteration
@@ -98,6 +119,69 @@ class Page(list):
                     del self.next_url
                 raise StopIteration
 
+    def iter_prefetch(self, depth=2):
+        """Iterate over the resources in this page and the pages after it,
+        fetching up to `depth` following pages on a background thread
+        while the current page is being consumed.
+
+        No more than `depth` pages are fetched ahead of the page being
+        consumed, counting the one being requested.
+
+        An error requesting one of the following pages is raised from the
+        iterator once iteration reaches that page.
+
+        """
+        # Bind now, so the pages are requested under the deadline active
+        # when the iterator is made rather than when it's first consumed.
+        return self._iter_prefetch(depth, _bind_context(Page.next_page))
+
+    def _iter_prefetch(self, depth, next_page):
+        if not list.__len__(self):
+            return
+
+        pages = Queue.Queue()
+        # A slot is taken before each page is requested and freed when the
+        # consumer moves on to that page.
+        slots = _RequestSlots(max(depth, 1))
+        stopped = threading.Event()
+
+        def prefetch():
+            page = self
+            while True:
+                while not slots.acquire(0.1):
+                    if stopped.is_set():
+                        return
+                if stopped.is_set():
+                    return
+                try:
+                    page = next_page(page)
+                except PageError:
+                    pages.put((None, None))
+                    return
+                except Exception:
+                    pages.put((None, sys.exc_info()))
+                    return
+                if not list.__len__(page):
+                    pages.put((None, None))
+                    return
+                pages.put((page, None))
+
+        prefetcher = threading.Thread(target=prefetch)
+        prefetcher.daemon = True
+        prefetcher.start()
+
+        try:
+            page = self
+            while page is not None:
+                for x in list.__iter__(page):
+                    yield x
+                page, exc_info = pages.get()
+                slots.release()
+                if exc_info is not None:
+                    raise exc_info[0], exc_info[1], exc_info[2]
+        finally:
+            stopped.set()
+
     def __len__(self):
         try:
             if not self.record_size:
@@ -107,7 +191,7 @@ class Page(list):
         except AttributeError:
             return 0
 
-
+    @recurly.client.remembered
     def next_page(self):
         """Return the next `Page` after this one in the result sequence
         it's from.
@@ -122,6 +206,13 @@ class Page(list):
             raise PageError("Page %r has no next page" % self)
         return self.page_for_url(next_url)
 
+    def next_page_async(self):
+        """Start requesting the next `Page` after this one on a
+        ``recurly.EXECUTOR`` thread, returning a `recurly.executor.Future`
+        for it."""
+        return recurly.EXECUTOR.submit(_bind_context(self.next_page))
+
+    @recurly.client.remembered
     def first_page(self):
         """Return the first `Page` in the result sequence this `Page`
         instance is from.
@@ -136,6 +227,59 @@ class Page(list):
             raise PageError("Page %r is already the first page" % self)
         return self.page_for_url(start_url)
 
+    def pages(self):
+        """Iterate over this `Page` and each `Page` after it.
+
+        Unlike iterating over the `Resource` instances of the pages, this
+        makes it possible to save each page's `cursor()` as it is
+        finished.
+
+        """
+        page = self
+        while True:
+            yield page
+            if getattr(page, 'next_url', None) is None:
+                return
+            page = page.next_page()
+
+    def cursor(self):
+        """Return a cursor from which the pages after this one can be
+        requested again with `from_cursor()`, even in another process.
+
+        The cursor is a dictionary of this page's ``next_url``,
+        ``start_url`` and ``record_size`` values, and can be serialized
+        with JSON or pickle. It does not include the API key.
+
+        """
+        cursor = dict()
+        for name in ('next_url', 'start_url', 'record_size'):
+            value = getattr(self, name, None)
+            if value is not None:
+                cursor[name] = value
+        return cursor
+
+    @classmethod
+    def from_cursor(cls, cursor):
+        """Return the `Page` after the page the given cursor was made from,
+        requesting it from the API.
+
+        The cursor may be a dictionary returned by `cursor()` or a JSON
+        serialization of one. If the cursor's page was the last page, an
+        empty `Page` is returned.
+
+        """
+        if isinstance(cursor, basestring):
+            cursor = json.loads(cursor)
+        next_url = cursor.get('next_url')
+        if next_url is not None:
+            return cls.page_for_url(next_url)
+
+        page = cls()
+        page.record_size = cursor.get('record_size')
+        if cursor.get('start_url') is not None:
+            page.start_url = cursor['start_url']
+        return page
+
     @classmethod
     def page_for_url(cls, url):
         """Return a new `Page` containing the items at the given
@@ -144,6 +288,34 @@ class Page(list):
         value = Resource.value_for_element(elem)
         return cls.page_for_value(resp, value)
 
+    @classmethod
+    def stream_for_url(cls, url):
+        """Iterate over the `Resource` instances in the collection at the
+        given endpoint URL and all the pages after it.
+
+        Unlike `page_for_url()`, each page's response is parsed
+        incrementally as the instances are consumed, so that only the
+        current member of the collection is held in memory no matter how
+        many members each page has. Response bodies are not logged.
+
+        The pages are requested with the client and deadline active when
+        this method is called, not when the iterator is consumed.
+
+        """
+        elements_for_url = _bind_context(Resource.elements_for_url)
+
+        def stream(url):
+            while url is not None:
+                resp, elems = elements_for_url(url)
+                url = None
+                for link_url, data in parse_link_value(resp.getheader('Link')).iteritems():
+                    if data.get('rel') == 'next':
+                        url = link_url
+
+                for elem in elems:
+                    yield Resource._subclass_for_nodename(elem.tag).from_element(elem)
+        return stream(url)
+
     @classmethod
     def page_for_value(cls, resp, value):
         """Return a new `Page` representing the given resource `value`
@@ -155,6 +327,7 @@ class Page(list):
 
         """
         page = cls(value)
+        _remember_client(page, recurly.client.current())
         page.record_size = resp.getheader('X-Records')
         links = parse_link_value(resp.getheader('Link'))
         for url, data in links.iteritems():
@@ -166,27 +339,350 @@ class Page(list):
         return page
 
 
-class _ValidatedHTTPSConnection(httplib.HTTPSConnection):
+class Record(object):
+
+    """A compact, read-only copy of the values of a `Resource`.
+
+    Records keep only the decoded values named in their resource class's
+    `attributes` (plus its URL and the URLs of linked resources) in slots,
+    and no XML document, so that very many of them can be held in memory at
+    once. Nested resources are kept as records too.
+
+    Record classes are generated for each `Resource` class by its
+    `record_class()` method. Use `to_resource()` to convert a record back to
+    a full `Resource` instance that can be changed and saved.
+
+    """
+
+    __slots__ = ('_url', '_links')
+
+    resource_class = None
+    """The `Resource` class this class of records represents."""
+
+    def __init__(self, url=None, links=None, **values):
+        object.__setattr__(self, '_url', url)
+        object.__setattr__(self, '_links', links or dict())
+        for attrname, value in values.iteritems():
+            object.__setattr__(self, attrname, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s instances are read-only" % type(self).__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError("%s instances are read-only" % type(self).__name__)
+
+    def __repr__(self):
+        return '<%s %s>' % (type(self).__name__, self._url or 'with no URL')
+
+    def to_element(self):
+        """Serialize all the values of this record to an XML element, as
+        its resource class would represent them."""
+        cls = self.resource_class
+        elem = xmlbackend.Element(cls.nodename)
+        if self._url is not None:
+            elem.attrib['href'] = self._url
+        for attrname, url in self._links.iteritems():
+            link_el = xmlbackend.Element(attrname)
+            link_el.attrib['href'] = url
+            elem.append(link_el)
+
+        # Put values back where the resource class will look for them.
+        getpath = cls().__getpath__
+        for attrname in cls.attributes:
+            try:
+                value = getattr(self, attrname)
+            except AttributeError:
+                continue
+
+            if attrname in cls.xml_attribute_attributes:
+                elem.attrib[attrname] = unicode(value)
+                continue
 
-    """An `httplib.HTTPSConnection` that validates the SSL connection by
-    requiring certificate validation and checking the connection's intended
-    hostname again the validated certificate's possible hosts."""
+            parent_el = elem
+            path = getpath(attrname).split('/')
+            for tag in path[:-1]:
+                child_el = parent_el.find(tag)
+                if child_el is None:
+                    child_el = xmlbackend.Element(tag)
+                    parent_el.append(child_el)
+                parent_el = child_el
+
+            if isinstance(value, Record):
+                parent_el.append(value.to_element())
+            else:
+                parent_el.append(cls.element_for_value(path[-1], value))
+        return elem
 
-    def connect(self):
-        sock = socket.create_connection((self.host, self.port),
-                                        self.timeout, self.source_address)
-        if self._tunnel_host:
-            self.sock = sock
-            self._tunnel()
+    def to_resource(self):
+        """Return a new instance of this record's `Resource` class with the
+        values of this record."""
+        return self.resource_class.from_element(self.to_element())
 
-        ssl_sock = ssl.wrap_socket(sock, self.key_file, self.cert_file,
-            ssl_version=ssl.PROTOCOL_SSLv3, cert_reqs=ssl.CERT_REQUIRED,
-            ca_certs=recurly.CA_CERTS_FILE)
 
-        # Let the CertificateError for failure be raised to the caller.
-        backports.ssl_match_hostname.match_hostname(ssl_sock.getpeercert(), self.host)
+class _RequestSlots(object):
 
-        self.sock = ssl_sock
+    """A counting semaphore whose waits can be limited, unlike
+    `threading.Semaphore`'s in Python 2."""
+
+    def __init__(self, limit):
+        self.free = limit
+        self._condition = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """Take a slot, waiting up to `timeout` seconds (or for ever, if
+        ``None``) for one to be free, and return whether one was taken."""
+        with self._condition:
+            if timeout is not None:
+                until = time.time() + timeout
+            while not self.free:
+                if timeout is None:
+                    self._condition.wait()
+                    continue
+                remaining = until - time.time()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self.free -= 1
+            return True
+
+    def release(self):
+        """Free a slot taken with `acquire()`."""
+        with self._condition:
+            self.free += 1
+            self._condition.notify()
+
+
+_request_slots_lock = threading.Lock()
+_request_slots = (None, None)
+
+
+def _request_slots_semaphore():
+    """Return the `_RequestSlots` limiting concurrent bulk requests to
+    ``recurly.MAX_CONCURRENT_REQUESTS``, or ``None`` if there is no limit."""
+    global _request_slots
+    limit = recurly.MAX_CONCURRENT_REQUESTS
+    with _request_slots_lock:
+        if _request_slots[0] != limit:
+            semaphore = _RequestSlots(limit) if limit else None
+            _request_slots = (limit, semaphore)
+        return _request_slots[1]
+
+
+# Socket timeouts are rounded to the millisecond, so one cut short to the
+# time left before a deadline can fire just before the deadline passes.
+_TIMEOUT_MARGIN = 0.01
+
+
+def _deadline_error(what, cause=None):
+    message = "Deadline passed before %s could be completed" % (what,)
+    if cause is not None:
+        message = '%s (%s)' % (message, cause)
+    return recurly.errors.DeadlineExceededError(message)
+
+
+def _bind_context(func):
+    """Return a function that calls `func` with the client and deadline
+    active now, for running `func` on another thread."""
+    return recurly.deadlines.bind(recurly.client.bind(func))
+
+
+def _remember_client(value, client):
+    """Have the given `Resource` or `Page`, and any resources in it,
+    remember the given `recurly.Client` unless they already remember
+    one."""
+    if client is None:
+        return
+    if isinstance(value, Resource):
+        value.__dict__.setdefault('_client', client)
+    elif isinstance(value, list):
+        if isinstance(value, Page):
+            value.__dict__.setdefault('_client', client)
+        for item in list.__iter__(value):
+            _remember_client(item, client)
+
+
+def _map_concurrently(func, items, workers):
+    """Call `func` with each of `items` on up to `workers` threads, yielding
+    ``(index, result)`` tuples in the order the calls complete.
+
+    An exception raised by `func` is reraised in the calling thread, and
+    stops the remaining items from being started. `func` is called with the
+    client and deadline active when `_map_concurrently()` is called, even if
+    the results are consumed later.
+
+    """
+    return _map_bound(_bind_context(func), list(items), workers)
+
+
+def _map_bound(func, items, workers):
+    todo = Queue.Queue()
+    for index_item in enumerate(items):
+        todo.put(index_item)
+    done = Queue.Queue()
+    stopped = threading.Event()
+
+    def work():
+        while not stopped.is_set():
+            try:
+                index, item = todo.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                done.put((index, func(item), None))
+            except Exception:
+                done.put((index, None, sys.exc_info()))
+
+    for i in range(min(max(workers, 1), len(items))):
+        worker = threading.Thread(target=work)
+        worker.daemon = True
+        worker.start()
+
+    try:
+        for i in range(len(items)):
+            index, result, exc_info = done.get()
+            if exc_info is not None:
+                raise exc_info[0], exc_info[1], exc_info[2]
+            yield index, result
+    finally:
+        stopped.set()
+
+
+def _decode_money(resource_class, elem):
+    if elem.attrib.get('nil') is not None:
+        return None
+    return Money.from_element(elem)
+
+
+def _decode_integer(resource_class, elem):
+    return int(elem.text.strip())
+
+
+def _decode_boolean(resource_class, elem):
+    return elem.text.strip() == 'true'
+
+
+def _decode_datetime(resource_class, elem):
+    return iso8601.parse_date(elem.text.strip())
+
+
+def _decode_array(resource_class, elem):
+    return [resource_class._subclass_for_nodename(sub_elem.tag).from_element(sub_elem)
+        for sub_elem in elem]
+
+
+_decoders_for_type = {
+    'integer': _decode_integer,
+    'boolean': _decode_boolean,
+    'datetime': _decode_datetime,
+    'array': _decode_array,
+}
+
+
+def _decode_typed(resource_class, elem):
+    attrib = elem.attrib
+    if attrib.get('nil') is not None:
+        return None
+    attr_type = attrib.get('type')
+    if attr_type is None:
+        if len(elem):
+            value_class = resource_class._classes_for_nodename.get(elem.tag)
+            if value_class is not None:
+                return value_class.from_element(elem)
+            return resource_class._value_for_element_generic(elem)
+        value = elem.text or ''
+        return value.strip()
+    type_decoder = _decoders_for_type.get(attr_type)
+    if type_decoder is not None:
+        return type_decoder(resource_class, elem)
+    return resource_class._value_for_element_generic(elem)
+
+
+def _escape_cdata(text):
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    return text.encode('UTF-8', 'xmlcharrefreplace')
+
+
+def _escape_attrib(text):
+    if '&' in text:
+        text = text.replace('&', '&amp;')
+    if '<' in text:
+        text = text.replace('<', '&lt;')
+    if '>' in text:
+        text = text.replace('>', '&gt;')
+    if '"' in text:
+        text = text.replace('"', '&quot;')
+    if '\n' in text:
+        text = text.replace('\n', '&#10;')
+    return text.encode('UTF-8', 'xmlcharrefreplace')
+
+
+def _write_element(write, elem):
+    """Write the given XML element the way the standard library's
+    ElementTree serializes it."""
+    tag = elem.tag
+    write('<' + tag)
+    for key, value in sorted(elem.items()):
+        write(' %s="%s"' % (key, _escape_attrib(value)))
+    text = elem.text
+    if text or len(elem):
+        write('>')
+        if text:
+            write(_escape_cdata(text))
+        for sub_elem in elem:
+            _write_element(write, sub_elem)
+        write('</' + tag + '>')
+    else:
+        write(' />')
+    if elem.tail:
+        write(_escape_cdata(elem.tail))
+
+
+def _write_value(write, attrname, value):
+    if isinstance(value, Resource):
+        value._write_xml(write)
+    elif value is None:
+        write('<%s nil="nil" />' % attrname)
+    elif isinstance(value, bool):
+        write('<%s type="boolean">%s</%s>' % (attrname, 'true' if value else 'false', attrname))
+    elif isinstance(value, int):
+        write('<%s type="integer">%d</%s>' % (attrname, value, attrname))
+    elif isinstance(value, datetime):
+        write('<%s type="datetime">%s</%s>' % (attrname, value.strftime('%Y-%m-%dT%H:%M:%SZ'), attrname))
+    elif isinstance(value, list) or isinstance(value, tuple):
+        if not value:
+            write('<%s type="array" />' % attrname)
+            return
+        write('<%s type="array">' % attrname)
+        for sub_resource in value:
+            if isinstance(sub_resource, Resource):
+                sub_resource._write_xml(write)
+                continue
+            try:
+                elementize = sub_resource.to_element
+            except AttributeError:
+                raise ValueError("Could not serialize member %r of list %r as a Resource instance"
+                    % (sub_resource, attrname))
+            _write_element(write, elementize())
+        write('</%s>' % attrname)
+    elif isinstance(value, Money):
+        if not value.currencies:
+            write('<%s />' % attrname)
+            return
+        write('<%s>' % attrname)
+        for currency, amount in value.currencies.items():
+            write('<%s type="integer">%s</%s>' % (currency, _escape_cdata(unicode(amount)), currency))
+        write('</%s>' % attrname)
+    else:
+        text = unicode(value)
+        if text:
+            write('<%s>%s</%s>' % (attrname, _escape_cdata(text), attrname))
+        else:
+            write('<%s />' % attrname)
 
 
 class Resource(object):
@@ -197,7 +693,8 @@ class Resource(object):
     specific Recurly API resources.
 
     All method parameters and return values that are XML elements are
-    `xml.etree.ElementTree.Element` instances.
+    elements of the XML library selected by ``recurly.XML_BACKEND``
+    (see `recurly.xmlbackend`).
 
     """
 
@@ -219,6 +716,9 @@ class Resource(object):
     parent `Resource`, and therefore should not use `Money` instances
     even though this `Resource` class has no ``currency`` attribute of
     its own."""
+    cache_ttl = None
+    """How many seconds a `Resource` of this class may be kept in the
+    ``recurly.OBJECT_CACHE`` cache, or ``None`` if it shouldn't be."""
 
     def __init__(self, **kwargs):
         try:
@@ -235,25 +735,48 @@ class Resource(object):
     @classmethod
     def http_request(cls, url, method='GET', body=None, headers=None):
         """Make an HTTP request with the given method to the given URL,
-        returning the resulting `httplib.HTTPResponse` instance.
+        returning the resulting `httplib.HTTPResponse` instance (or the
+        equivalent response of the transport used).
 
         If the `body` argument is a `Resource` instance, it is serialized
         to XML by calling its `to_element()` method before submitting it.
         Requests are authenticated per the Recurly API specification
         using the ``recurly.API_KEY`` value for the API key.
 
+        Requests are sent with the ``recurly.TRANSPORT``
+        `recurly.transport.Transport`, by default over persistent
+        connections from the ``recurly.CONNECTION_POOL`` pool; a connection
+        is returned to the pool once its response has been read completely.
+
+        When ``recurly.RATE_LIMITER`` is set, each request waits for that
+        `recurly.ratelimit.RateLimiter` to allow it before it is sent.
+        Requests that fail for transient reasons are retried as allowed by
+        the ``recurly.RETRY_POLICY`` `recurly.retry.RetryPolicy`, if set.
+        When ``recurly.COMPRESSION`` is set, compressed responses are asked
+        for, and the `recurly.compression.Compression` decompresses their
+        bodies as they are read.
+
+        Connecting and each read from the connection are limited to
+        ``recurly.CONNECT_TIMEOUT`` and ``recurly.READ_TIMEOUT`` seconds.
+        Inside a `recurly.deadline()` block, these are shortened to the time
+        remaining, and a `recurly.errors.DeadlineExceededError` is raised if
+        the request cannot be completed (including any retries) in time.
+
+        While a `recurly.Client` is active, its settings are used in place
+        of these ``recurly`` module settings.
+
         Requests and responses are logged at the ``DEBUG`` level to the
         ``recurly.http.request`` and ``recurly.http.response`` loggers
-        respectively.
+        respectively. A ``'request'`` `recurly.events.Event` is sent to the
+        ``recurly.OBSERVERS`` for each request.
 
         """
-        urlparts = urlsplit(url)
-        if urlparts.scheme != 'https':
-            connection = httplib.HTTPConnection(urlparts.netloc)
-        elif recurly.CA_CERTS_FILE is None:
-            connection = httplib.HTTPSConnection(urlparts.netloc)
-        else:
-            connection = _ValidatedHTTPSConnection(urlparts.netloc)
+        config = recurly.client.settings()
+        transport = config.transport
+
+        event = None
+        if recurly.OBSERVERS:
+            event = recurly.events.Event('request', method, url, cls)
 
         headers = {} if headers is None else dict(headers)
         headers.update({
@@ -261,38 +784,118 @@ class Resource(object):
         })
         if 'Accept' not in headers:
             headers['Accept'] = 'application/xml'
-        if recurly.API_KEY is not None:
-            headers['Authorization'] = 'Basic %s' % base64.b64encode('%s:' % recurly.API_KEY)
-
-        log = logging.getLogger('recurly.http.request')
-        if log.isEnabledFor(logging.DEBUG):
-            log.debug("%s %s HTTP/1.1", method, url)
+        compression = config.compression
+        if compression is not None and 'Accept-Encoding' not in headers:
+            headers['Accept-Encoding'] = compression.accept_encoding
+        api_key = config.api_key
+        if api_key is not None:
+            headers['Authorization'] = 'Basic %s' % base64.b64encode('%s:' % api_key)
+
+        if request_log.isEnabledFor(logging.DEBUG):
+            request_log.debug("%s %s HTTP/1.1", method, url)
             for header, value in headers.iteritems():
                 if header == 'Authorization':
                     value = '<redacted>'
-                log.debug("%s: %s", header, value)
-            log.debug('')
+                request_log.debug("%s: %s", header, value)
+            request_log.debug('')
             if method in ('POST', 'PUT') and body is not None:
                 if isinstance(body, Resource):
-                    log.debug(body.as_log_output())
+                    request_log.debug(body.as_log_output())
                 else:
-                    log.debug(body)
+                    request_log.debug(body)
 
         if isinstance(body, Resource):
-            body = ElementTree.tostring(body.to_element(), encoding='UTF-8')
+            body = body.to_xml()
             headers['Content-Type'] = 'application/xml; charset=utf-8'
         if method in ('POST', 'PUT') and body is None:
             headers['Content-Length'] = '0'
-        connection.request(method, url, body, headers)
-        resp = connection.getresponse()
-
-        log = logging.getLogger('recurly.http.response')
-        if log.isEnabledFor(logging.DEBUG):
-            log.debug("HTTP/1.1 %d %s", resp.status, resp.reason)
-            for header in resp.msg.headers:
-                log.debug(header.rstrip('\n'))
-            log.debug('')
+        if event is not None and body is not None:
+            event.bytes_sent = len(body)
+
+        request_line = '%s %s' % (method, url)
+
+        def send():
+            remaining = recurly.deadlines.remaining()
+            if remaining is not None and remaining <= 0:
+                raise _deadline_error(request_line)
+            limiter = config.rate_limiter
+            if limiter is not None and not limiter.acquire(remaining):
+                raise _deadline_error(request_line)
+
+            timeout = (config.connect_timeout, config.read_timeout)
+            if remaining is not None:
+                remaining = recurly.deadlines.remaining()
+                if remaining <= 0:
+                    raise _deadline_error(request_line)
+                timeout = tuple(remaining if seconds is None else min(seconds, remaining)
+                    for seconds in timeout)
+
+            if event is not None:
+                sent = time.time()
+                connect_time = event.timings.get('connect', 0)
+
+            resp = transport.request(method, url, body, headers, event, timeout)
+
+            if event is not None:
+                connect_time = event.timings.get('connect', 0) - connect_time
+                event.add_timing('first_byte', time.time() - sent - connect_time)
+            if limiter is not None:
+                limiter.update(resp)
+            return resp
+
+        def fail(exc_info):
+            if event is not None:
+                event.attempts = attempt
+                event.error = exc_info[1]
+                event.finish()
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+        policy = config.retry_policy
+        attempt = 1
+        while True:
+            try:
+                resp = send()
+            except Exception, exc:
+                exc_info = sys.exc_info()
+                deadline_error = isinstance(exc, recurly.errors.DeadlineExceededError)
+                if not deadline_error and recurly.deadlines.expired(_TIMEOUT_MARGIN):
+                    # The socket timeout was most likely cut short to the deadline.
+                    exc = _deadline_error(request_line, exc)
+                    exc_info = (type(exc), exc, exc_info[2])
+                if policy is None or not policy.should_retry(method, attempt, error=exc):
+                    fail(exc_info)
+                request_log.debug("Retrying %s %s after error: %s", method, url, exc)
+                if not policy.wait(attempt, recurly.retry.error_reason(exc),
+                                   limit=recurly.deadlines.remaining()):
+                    exc = _deadline_error(request_line, exc)
+                    fail((type(exc), exc, None))
+                attempt += 1
+                continue
 
+            if policy is None or not policy.should_retry(method, attempt, status=resp.status):
+                break
+            # Finish with the response so its connection can be reused.
+            resp.read()
+            request_log.debug("Retrying %s %s after HTTP status %d", method, url, resp.status)
+            if not policy.wait(attempt, resp.status, resp.getheader('Retry-After'),
+                               limit=recurly.deadlines.remaining()):
+                exc = _deadline_error(request_line, 'HTTP status %d' % resp.status)
+                fail((type(exc), exc, None))
+            attempt += 1
+
+        if event is not None:
+            event.attempts = attempt
+            event.status = resp.status
+            event.finish()
+
+        if response_log.isEnabledFor(logging.DEBUG):
+            response_log.debug("HTTP/1.1 %d %s", resp.status, resp.reason)
+            for header, value in resp.getheaders():
+                response_log.debug("%s: %s", header, value)
+            response_log.debug('')
+
+        if compression is not None:
+            resp = compression.decode(resp)
         return resp
 
     def as_log_output(self, full=False):
@@ -307,7 +910,7 @@ class Resource(object):
         for attrname in self.sensitive_attributes:
             for sensitive_el in elem.getiterator(attrname):
                 sensitive_el.text = 'XXXXXXXXXXXXXXXX'
-        return ElementTree.tostring(elem, encoding='UTF-8')
+        return xmlbackend.tostring(elem)
 
     @classmethod
     def _learn_nodenames(cls, classes):
@@ -333,27 +936,269 @@ class Resource(object):
         can be directly requested with this method.
 
         """
-        url = urljoin(recurly.BASE_URI, cls.member_path % (uuid,))
-        resp, elem = cls.element_for_url(url)
+        url = urljoin(recurly.client.settings().base_uri, cls.member_path % (uuid,))
+        return cls.from_cached_url(url)
+
+    @classmethod
+    def from_cached_url(cls, url):
+        """Return a new instance of this `Resource` class representing
+        the resource at the given URL.
+
+        If ``recurly.OBJECT_CACHE`` is set and caches this class, the
+        resource is requested only if it is not already cached.
+
+        """
+        cache = recurly.client.settings().object_cache
+        ttl = cache.ttl_for(cls) if cache is not None else None
+        if not ttl:
+            resp, elem = cls.element_for_url(url)
+            return cls.from_element(elem)
+
+        key = cache.key_for(cls, url)
+        elem = cache.get(key)
+        if elem is None:
+            resp, elem = cls.element_for_url(url)
+            cache.set(key, elem, ttl)
         return cls.from_element(elem)
 
+    def _forget_cached(self):
+        cache = recurly.client.settings().object_cache
+        url = self.__dict__.get('_url')
+        if cache is not None and url is not None:
+            cache.delete(cache.key_for(type(self), url))
+
+    @classmethod
+    def get_async(cls, uuid):
+        """Start requesting the `Resource` instance of this class
+        identified by the given code or UUID on a ``recurly.EXECUTOR``
+        thread, returning a `recurly.executor.Future` for it."""
+        return recurly.EXECUTOR.submit(_bind_context(cls.get), uuid)
+
+    @classmethod
+    def get_many(cls, uuids, workers=4, ordered=True):
+        """Return `Resource` instances of this class identified by each
+        of the given codes or UUIDs, fetching them concurrently on up to
+        `workers` threads.
+
+        A request that fails with a `recurly.errors.ResponseError` (such as
+        a `NotFoundError` for a code that doesn't exist) does not stop the
+        others; the error instance is returned in place of that resource.
+        Across all threads, no more than ``recurly.MAX_CONCURRENT_REQUESTS``
+        of these requests are in flight at once.
+
+        If `ordered` is true, the results are returned as a list in the same
+        order as `uuids`. Otherwise, an iterator is returned that yields a
+        ``(uuid, result)`` tuple as soon as each request completes.
+
+        """
+        uuids = list(uuids)
+
+        def get_or_error(uuid):
+            slots = _request_slots_semaphore()
+            if slots is not None and not slots.acquire(recurly.deadlines.remaining()):
+                raise _deadline_error('the request for %s %r' % (cls.__name__, uuid))
+            try:
+                return cls.get(uuid)
+            except recurly.errors.ResponseError, exc:
+                return exc
+            finally:
+                if slots is not None:
+                    slots.release()
+
+        results = _map_concurrently(get_or_error, uuids, workers)
+        if not ordered:
+            return ((uuids[index], result) for index, result in results)
+
+        ordered_results = [None] * len(uuids)
+        for index, result in results:
+            ordered_results[index] = result
+        return ordered_results
+
+    @classmethod
+    def record_class(cls):
+        """Return the compact `Record` class for instances of this
+        `Resource` class, generating it the first time it's needed."""
+        try:
+            return cls.__dict__['_record_class']
+        except KeyError:
+            pass
+
+        slots = tuple(attrname for i, attrname in enumerate(cls.attributes)
+            if attrname not in cls.attributes[:i])
+        record_class = type('%sRecord' % cls.__name__, (Record,),
+            {'__slots__': slots, 'resource_class': cls})
+        cls._record_class = record_class
+        return record_class
+
+    def to_record(self):
+        """Return a compact, read-only `Record` of this instance's values.
+
+        Linked resources are not requested; only their URLs are kept.
+
+        """
+        values = dict()
+        links = dict()
+        selfnode = self.__dict__.get('_elem')
+        for attrname in set(self.attributes + self.linked_attributes):
+            if attrname in self.__dict__:
+                value = self.__dict__[attrname]
+            elif selfnode is None:
+                continue
+            elif attrname in self.xml_attribute_attributes:
+                if attrname not in selfnode.attrib:
+                    continue
+                value = selfnode.attrib[attrname]
+            else:
+                elem = selfnode.find(self.__getpath__(attrname))
+                if elem is None:
+                    continue
+                if 'href' in elem.attrib:
+                    links[attrname] = elem.attrib['href']
+                    continue
+                value = self.value_for_element(elem)
+
+            if attrname not in self.attributes:
+                continue
+            if isinstance(value, Resource):
+                value = value.to_record()
+            elif isinstance(value, list):
+                value = tuple(v.to_record() if isinstance(v, Resource) else v
+                    for v in value)
+            values[attrname] = value
+
+        return self.record_class()(url=self.__dict__.get('_url'),
+            links=links, **values)
+
+    @classmethod
+    def all_records(cls, **kwargs):
+        """Iterate over compact `Record` copies of all the instances of
+        this `Resource` class in its general collection endpoint.
+
+        Collection pages are parsed incrementally as with `stream_all()`,
+        and the XML for each instance is discarded once its record is made.
+
+        """
+        for resource in cls.stream_all(**kwargs):
+            yield resource.to_record()
+
     @classmethod
     def element_for_url(cls, url):
         """Return the resource at the given URL, as a
         (`httplib.HTTPResponse`, `xml.etree.ElementTree.Element`) tuple
-        resulting from a ``GET`` request to that URL."""
-        response = cls.http_request(url)
+        resulting from a ``GET`` request to that URL.
+
+        If ``recurly.RESPONSE_CACHE`` is set, the request is made
+        conditional on any cached copy of the document having changed, and
+        the cached element is returned if it has not (along with a
+        `recurly.cache.CachedResponse` in place of the response).
+
+        A ``'document'`` `recurly.events.Event` is sent to the
+        ``recurly.OBSERVERS`` for each document requested, including those
+        that fail with an error status or exception.
+
+        If ``recurly.SINGLE_FLIGHT`` is set, a request for a URL already
+        being requested on another thread (with the same API key) shares
+        that request's result instead; see `recurly.singleflight`.
+
+        """
+        config = recurly.client.settings()
+        single_flight = config.single_flight
+        if single_flight is None:
+            return cls._element_for_url(url)
+        return single_flight.do((config.api_key, url), lambda: cls._element_for_url(url))
+
+    @classmethod
+    def _element_for_url(cls, url):
+        if not recurly.OBSERVERS:
+            return cls._fetch_element(url, None)
+
+        event = recurly.events.Event('document', 'GET', url, cls)
+        try:
+            return cls._fetch_element(url, event)
+        except Exception, exc:
+            event.error = exc
+            raise
+        finally:
+            event.finish()
+
+    @classmethod
+    def _fetch_element(cls, url, event):
+        config = recurly.client.settings()
+        cache = config.response_cache
+        entry = None
+        if cache is not None:
+            cache_key = (config.api_key, url)
+            entry = cache.get(cache_key)
+
+        response = cls.http_request(url, headers=entry and entry.validators())
+        if event is not None:
+            event.status = response.status
+            event.add_timing('request', time.time() - event.started)
+        if response.status == 304 and entry is not None:
+            response.read()
+            return recurly.cache.CachedResponse(response, entry), entry.element()
         if response.status != 200:
             cls.raise_http_error(response)
 
         assert response.getheader('Content-Type').startswith('application/xml')
 
-        response_xml = response.read()
-        logging.getLogger('recurly.http.response').debug(response_xml)
-        response_doc = ElementTree.fromstring(response_xml)
+        if event is not None:
+            read_started = time.time()
+        response_xml = cls._read_response(response)
+        if event is not None:
+            parse_started = time.time()
+            event.add_timing('read', parse_started - read_started)
+        response_doc = xmlbackend.fromstring(response_xml)
+        if event is not None:
+            event.add_timing('parse', time.time() - parse_started)
+            event.bytes_received = len(response_xml)
+
+        if cache is not None:
+            etag = response.getheader('ETag')
+            last_modified = response.getheader('Last-Modified')
+            if etag is not None or last_modified is not None:
+                entry = recurly.cache.CacheEntry(response_xml, etag,
+                    last_modified, response.getheaders(), response_doc)
+                cache.set(cache_key, entry)
 
         return response, response_doc
 
+    @classmethod
+    def elements_for_url(cls, url):
+        """Return the collection at the given URL, as a
+        (`httplib.HTTPResponse`, iterator) tuple resulting from a ``GET``
+        request to that URL.
+
+        The iterator yields the XML element for each member of the
+        collection as it is parsed from the response. Members already
+        yielded are detached from the document, so the full document is
+        never held in memory at once.
+
+        """
+        response = cls.http_request(url)
+        if response.status != 200:
+            cls.raise_http_error(response)
+
+        assert response.getheader('Content-Type').startswith('application/xml')
+
+        return response, cls._iter_member_elements(response)
+
+    @staticmethod
+    def _iter_member_elements(source):
+        depth = 0
+        for event, elem in xmlbackend.iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                if depth == 0:
+                    root = elem
+                depth += 1
+                continue
+
+            depth -= 1
+            if depth == 1:
+                yield elem
+                # Drop the finished member from the document.
+                root.clear()
+
     @classmethod
     def _subclass_for_nodename(cls, nodename):
         try:
@@ -374,21 +1219,60 @@ class Resource(object):
         * a `Money` instance
         * ``None``
 
+        Elements named in the class's `attributes` are converted through
+        the class's table of decoders, which knows which of them are
+        `Money` amounts and dispatches the rest on their ``type`` attribute
+        without the generic conversion's checks; other elements are
+        converted by inspecting them generically.
+
         """
-        log = logging.getLogger('recurly.resource')
+        if elem is not None:
+            decoder = cls._decoders().get(elem.tag)
+            if decoder is not None:
+                return decoder(cls, elem)
+        return cls._value_for_element_generic(elem)
+
+    @classmethod
+    def _decoders(cls):
+        """Return this class's table of decoders for the elements of its
+        `attributes` by tag, building it on first use."""
+        try:
+            return cls.__dict__['_decoders_for_tag']
+        except KeyError:
+            pass
+
+        attributes = getattr(cls, 'attributes', ())
+        money_tags = 'currency' not in attributes and not cls.inherits_currency
+        decoders = dict()
+        for attrname in attributes:
+            tag = attrname.split('/')[-1]
+            if money_tags and tag.endswith('_in_cents'):
+                decoders[tag] = _decode_money
+            else:
+                decoders[tag] = _decode_typed
+        cls._decoders_for_tag = decoders
+        return decoders
+
+    @classmethod
+    def _value_for_element_generic(cls, elem):
+        debug = resource_log.isEnabledFor(logging.DEBUG)
         if elem is None:
-            log.debug("Converting %r element into None value", elem)
+            if debug:
+                resource_log.debug("Converting %r element into None value", elem)
             return
         if elem.attrib.get('nil') is not None:
-            log.debug("Converting %r element with nil attribute into None value", elem.tag)
+            if debug:
+                resource_log.debug("Converting %r element with nil attribute into None value", elem.tag)
             return
 
         if elem.tag.endswith('_in_cents') and 'currency' not in cls.attributes and not cls.inherits_currency:
-            log.debug("Converting %r element in class with no matching 'currency' into a Money value", elem.tag)
+            if debug:
+                resource_log.debug("Converting %r element in class with no matching 'currency' into a Money value", elem.tag)
             return Money.from_element(elem)
 
         attr_type = elem.attrib.get('type')
-        log.debug("Converting %r element with type %r", elem.tag, attr_type)
+        if debug:
+            resource_log.debug("Converting %r element with type %r", elem.tag, attr_type)
         if attr_type == 'integer':
             return int(elem.text.strip())
         if attr_type == 'boolean':
@@ -403,15 +1287,17 @@ class Resource(object):
             try:
                 value_class = cls._subclass_for_nodename(attr_type)
             except ValueError:
-                log.debug("Not converting %r element with type %r to a resource as that matches no known nodename",
-                    elem.tag, attr_type)
+                if debug:
+                    resource_log.debug("Not converting %r element with type %r to a resource as that matches "
+                        "no known nodename", elem.tag, attr_type)
             else:
                 return value_class.from_element(elem)
 
         # Untyped complex elements should still be resource instances. Guess from the nodename.
         if len(elem):  # has children
             value_class = cls._subclass_for_nodename(elem.tag)
-            log.debug("Converting %r tag into a %s", elem.tag, value_class.__name__)
+            if debug:
+                resource_log.debug("Converting %r tag into a %s", elem.tag, value_class.__name__)
             return value_class.from_element(elem)
 
         value = elem.text or ''
@@ -434,7 +1320,7 @@ class Resource(object):
         if isinstance(value, Resource):
             return value.to_element()
 
-        el = ElementTree.Element(attrname)
+        el = xmlbackend.Element(attrname)
 
         if value is None:
             el.attrib['nil'] = 'nil'
@@ -468,13 +1354,14 @@ class Resource(object):
         """Return a new instance of this `Resource` class representing
         the given XML element."""
 
-        el = ElementTree.fromstring(elem) if isinstance(elem, basestring) else elem
+        el = xmlbackend.fromstring(elem) if isinstance(elem, basestring) else elem
         return cls().update_from_element(el)
 
     def update_from_element(self, elem):
         """Reset this `Resource` instance to represent the values in
         the given XML element."""
         self._elem = elem
+        self._values = dict()
 
         for attrname in self.attributes:
             try:
@@ -486,26 +1373,21 @@ class Resource(object):
         if document_url is not None:
             self._url = document_url
 
+        _remember_client(self, recurly.client.current())
         return self
 
     def _make_actionator(self, url, method, extra_handler=None):
-        def actionator(*args, **kwargs):
-            if kwargs:
-                full_url = '%s?%s' % (url, urlencode(kwargs))
-            else:
-                full_url = url
-
-            body = args[0] if args else None
+        def act(full_url, body, event):
             response = self.http_request(full_url, method, body)
+            if event is not None:
+                event.status = response.status
 
             if response.status == 200:
-                response_xml = response.read()
-                logging.getLogger('recurly.http.response').debug(response_xml)
-                return self.update_from_element(ElementTree.fromstring(response_xml))
+                response_xml = self._read_response(response)
+                return self.update_from_element(xmlbackend.fromstring(response_xml))
             elif response.status == 201:
-                response_xml = response.read()
-                logging.getLogger('recurly.http.response').debug(response_xml)
-                elem = ElementTree.fromstring(response_xml)
+                response_xml = self._read_response(response)
+                elem = xmlbackend.fromstring(response_xml)
                 return self.value_for_element(elem)
             elif response.status == 204:
                 pass
@@ -513,16 +1395,64 @@ class Resource(object):
                 return extra_handler(response)
             else:
                 self.raise_http_error(response)
+
+        def actionator(*args, **kwargs):
+            if kwargs:
+                full_url = '%s?%s' % (url, urlencode(kwargs))
+            else:
+                full_url = url
+
+            body = args[0] if args else None
+            with recurly.client.using(self.__dict__.get('_client')):
+                if not recurly.OBSERVERS:
+                    return act(full_url, body, None)
+
+                event = recurly.events.Event('action', method, full_url, type(self))
+                try:
+                    return act(full_url, body, event)
+                except Exception, exc:
+                    event.error = exc
+                    raise
+                finally:
+                    event.finish()
         return actionator
 
     #usually the path is the same as the element name
     def __getpath__(self, name):
         return name
 
+    def __getstate__(self):
+        # The remembered client holds locks and open connections, and not
+        # every XML backend's elements can be pickled, so the document is
+        # kept as XML.
+        state = self.__dict__.copy()
+        state.pop('_client', None)
+        if state.get('_elem') is not None:
+            state['_elem'] = xmlbackend.tostring(state['_elem'])
+        return state
+
+    def __setstate__(self, state):
+        if state.get('_elem') is not None:
+            state = dict(state, _elem=xmlbackend.fromstring(state['_elem']))
+        self.__dict__.update(state)
+
+    def __setattr__(self, name, value):
+        try:
+            del self._values[name]
+        except (AttributeError, KeyError):
+            pass
+        super(Resource, self).__setattr__(name, value)
+
     def __getattr__(self, name):
         if name.startswith('_'):
             raise AttributeError(name)
 
+        # Values decoded from the XML are kept until the element changes.
+        try:
+            return self._values[name]
+        except (AttributeError, KeyError):
+            pass
+
         try:
             selfnode = self._elem
         except AttributeError:
@@ -555,16 +1485,20 @@ class Resource(object):
                     else:
                         full_url = url
 
-                    resp, elem = Resource.element_for_url(full_url)
-                    value = Resource.value_for_element(elem)
+                    with recurly.client.using(self.__dict__.get('_client')):
+                        resp, elem = Resource.element_for_url(full_url)
+                        value = Resource.value_for_element(elem)
 
-                    if isinstance(value, list):
-                        return Page.page_for_value(resp, value)
-                    return value
+                        if isinstance(value, list):
+                            return Page.page_for_value(resp, value)
+                        return value
                 return relatitator
             return make_relatitator(elem.attrib['href'])
 
-        return self.value_for_element(elem)
+        value = self.value_for_element(elem)
+        _remember_client(value, self.__dict__.get('_client'))
+        self.__dict__.setdefault('_values', dict())[name] = value
+        return value
 
     def link(self, name):
         if name not in self.linked_attributes:
@@ -589,12 +1523,13 @@ class Resource(object):
                     else:
                         full_url = url
 
-                    resp, elem = Resource.element_for_url(full_url)
-                    value = Resource.value_for_element(elem)
+                    with recurly.client.using(self.__dict__.get('_client')):
+                        resp, elem = Resource.element_for_url(full_url)
+                        value = Resource.value_for_element(elem)
 
-                    if isinstance(value, list):
-                        return Page.page_for_value(resp, value)
-                    return value
+                        if isinstance(value, list):
+                            return Page.page_for_value(resp, value)
+                        return value
                 return relatitator
             self.name = make_relatitator(elem.attrib['href'])
 
@@ -611,11 +1546,33 @@ class Resource(object):
         parameters.
 
         """
-        url = urljoin(recurly.BASE_URI, cls.collection_path)
+        url = urljoin(recurly.client.settings().base_uri, cls.collection_path)
         if kwargs:
             url = '%s?%s' % (url, urlencode(kwargs))
         return Page.page_for_url(url)
 
+    @classmethod
+    def all_async(cls, **kwargs):
+        """Start requesting the first `Page` of instances of this
+        `Resource` class, as `all()` does, on a ``recurly.EXECUTOR``
+        thread, returning a `recurly.executor.Future` for it."""
+        return recurly.EXECUTOR.submit(_bind_context(cls.all), **kwargs)
+
+    @classmethod
+    def stream_all(cls, **kwargs):
+        """Iterate over all the instances of this `Resource` class in
+        its general collection endpoint, across all its pages.
+
+        This is a streaming counterpart of `all()`: see
+        `Page.stream_for_url()` for how responses are parsed.
+
+        """
+        url = urljoin(recurly.client.settings().base_uri, cls.collection_path)
+        if kwargs:
+            url = '%s?%s' % (url, urlencode(kwargs))
+        return Page.stream_for_url(url)
+
+    @recurly.client.remembered
     def save(self):
         """Save this `Resource` instance to the service.
 
@@ -625,9 +1582,12 @@ class Resource(object):
         to its own URL.
 
         """
-        if hasattr(self, '_url'):
-            return self._update()
-        return self._create()
+        try:
+            if hasattr(self, '_url'):
+                return self._update()
+            return self._create()
+        finally:
+            self._forget_cached()
 
     def _update(self):
         url = self._url
@@ -635,17 +1595,17 @@ class Resource(object):
         if response.status != 200:
             self.raise_http_error(response)
 
-        response_xml = response.read()
-        logging.getLogger('recurly.http.response').debug(response_xml)
-        self.update_from_element(ElementTree.fromstring(response_xml))
+        response_xml = self._read_response(response)
+        self.update_from_element(xmlbackend.fromstring(response_xml))
 
     def _create(self):
-        url = urljoin(recurly.BASE_URI, self.collection_path)
+        url = urljoin(recurly.client.settings().base_uri, self.collection_path)
         return self.post(url)
 
     def post(self, url):
         """Sends this `Resource` instance to the service with a
         ``POST`` request to the given URL."""
+        _remember_client(self, recurly.client.current())
         response = self.http_request(url, 'POST', self, {'Content-Type': 'application/xml; charset=utf-8'})
         if response.status not in (201, 204):
             self.raise_http_error(response)
@@ -653,35 +1613,70 @@ class Resource(object):
         self._url = response.getheader('Location')
 
         if response.status == 201:
-            response_xml = response.read()
-            logging.getLogger('recurly.http.response').debug(response_xml)
-            self.update_from_element(ElementTree.fromstring(response_xml))
+            response_xml = self._read_response(response)
+            self.update_from_element(xmlbackend.fromstring(response_xml))
             self.response_xml = response_xml
 
+    @recurly.client.remembered
     def delete(self):
         """Submits a deletion request for this `Resource` instance as
         a ``DELETE`` request to its URL."""
         url = self._url
 
-        response = self.http_request(url, 'DELETE')
+        try:
+            response = self.http_request(url, 'DELETE')
+        finally:
+            self._forget_cached()
         if response.status != 204:
             self.raise_http_error(response)
 
+    def save_async(self):
+        """Start saving this `Resource` instance, as `save()` does, on a
+        ``recurly.EXECUTOR`` thread, returning a `recurly.executor.Future`
+        that completes when it's saved."""
+        return recurly.EXECUTOR.submit(_bind_context(self.save))
+
+    def delete_async(self):
+        """Start deleting this `Resource` instance, as `delete()` does, on
+        a ``recurly.EXECUTOR`` thread, returning a `recurly.executor.Future`
+        that completes when it's deleted."""
+        return recurly.EXECUTOR.submit(_bind_context(self.delete))
+
+    @classmethod
+    def _read_response(cls, response):
+        """Read and return the body of the given `httplib.HTTPResponse`,
+        logging it to the ``recurly.http.response`` logger."""
+        try:
+            response_xml = response.read()
+        except socket.error, exc:
+            if not recurly.deadlines.expired(_TIMEOUT_MARGIN):
+                raise
+            raise _deadline_error('reading the response', exc)
+        if response_log.isEnabledFor(logging.DEBUG):
+            response_log.debug(response_xml)
+        return response_xml
+
     @classmethod
     def raise_http_error(cls, response):
         """Raise a `ResponseError` of the appropriate subclass in
         reaction to the given `httplib.HTTPResponse`."""
-        response_xml = response.read()
-        logging.getLogger('recurly.http.response').debug(response_xml)
+        response_xml = cls._read_response(response)
         exc_class = recurly.errors.error_class_for_http_status(response.status)
         raise exc_class(response_xml)
 
     def to_element(self, full=False):
-        """Serialize this `Resource` instance to an XML element."""
+        """Serialize this `Resource` instance to an XML element.
+
+        With `full`, the element is a copy of the whole document the
+        instance was made from, which may be shared with other instances
+        (such as those made from cached documents), so it can be changed
+        safely.
+
+        """
         if full:
-            return self._elem
+            return copy.deepcopy(self._elem)
 
-        elem = ElementTree.Element(self.nodename)
+        elem = xmlbackend.Element(self.nodename)
         for attrname in self.attributes:
             # Only use values that have been loaded into the internal
             # __dict__. For retrieved objects we look into the XML response at
@@ -699,6 +1694,84 @@ class Resource(object):
                 elem.append(sub_elem)
         return elem
 
+    @classmethod
+    def _encoders(cls):
+        """Return this class's plan for writing its values directly as
+        XML, compiling it on first use.
+
+        The plan is ``None`` when the class customizes `to_element()`, so
+        its instances must be serialized through their elements.
+
+        """
+        try:
+            return cls.__dict__['_encoder_plan']
+        except KeyError:
+            pass
+
+        if cls.to_element.im_func is not Resource.to_element.im_func:
+            plan = None
+        else:
+            by_element = cls.element_for_value.im_func is not Resource.element_for_value.im_func
+            plan = tuple((attrname, attrname in cls.xml_attribute_attributes, by_element)
+                for attrname in cls.attributes)
+        cls._encoder_plan = plan
+        return plan
+
+    def _write_xml(self, write):
+        plan = self._encoders()
+        if plan is None:
+            _write_element(write, self.to_element())
+            return
+
+        values = self.__dict__
+        xml_attributes = list()
+        children = list()
+        for attrname, is_xml_attribute, by_element in plan:
+            # As in to_element(), only use values set on the client side.
+            try:
+                value = values[attrname]
+            except KeyError:
+                continue
+            if is_xml_attribute:
+                xml_attributes.append((attrname, unicode(value)))
+            else:
+                children.append((attrname, value, by_element))
+
+        nodename = self.nodename
+        write('<' + nodename)
+        for attrname, value in sorted(xml_attributes):
+            write(' %s="%s"' % (attrname, _escape_attrib(value)))
+        if not children:
+            write(' />')
+            return
+        write('>')
+        for attrname, value, by_element in children:
+            if by_element:
+                _write_element(write, self.element_for_value(attrname, value))
+            else:
+                _write_value(write, attrname, value)
+        write('</' + nodename + '>')
+
+    def to_xml(self):
+        """Serialize this `Resource` instance to a UTF-8 encoded XML
+        document, as sent in request bodies.
+
+        The document is written directly from the instance's values when
+        ``recurly.XML_SERIALIZER`` is ``'direct'``, or by serializing its
+        `to_element()` element when it is ``'element'``. Both produce the
+        same document.
+
+        """
+        if recurly.XML_SERIALIZER == 'element' or xmlbackend.backend_name() == 'lxml':
+            return xmlbackend.tostring(self.to_element())
+        if recurly.XML_SERIALIZER != 'direct':
+            raise ValueError("Unknown XML serializer %r; expected 'direct' or 'element'"
+                % (recurly.XML_SERIALIZER,))
+
+        chunks = ["<?xml version='1.0' encoding='UTF-8'?>\n"]
+        self._write_xml(chunks.append)
+        return ''.join(chunks)
+
     def to_dict(self, js=False):
         """Serialize this `Resource` instance to an python dictionary."""
         d = {}
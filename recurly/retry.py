@@ -0,0 +1,119 @@
+import errno
+import httplib
+import random
+import socket
+import threading
+import time
+
+
+def _request_sent(error):
+    """Return whether the request that raised the given error may have
+    reached the server."""
+    # Transports mark the errors raised before anything was sent.
+    return getattr(error, 'request_sent', True)
+
+
+def error_reason(error):
+    """Return the reason a retry after the given error is counted under: the
+    error's module-qualified class name, followed by the symbolic name of its
+    ``errno`` if it has one (such as ``'socket.error ECONNRESET'``)."""
+    cls = type(error)
+    if cls.__module__ in ('__builtin__', 'exceptions'):
+        reason = cls.__name__
+    else:
+        reason = '%s.%s' % (cls.__module__, cls.__name__)
+    code = getattr(error, 'errno', None)
+    if code is not None:
+        reason = '%s %s' % (reason, errno.errorcode.get(code, code))
+    return reason
+
+
+class RetryPolicy(object):
+
+    """A policy for automatically retrying API requests that fail for
+    transient reasons.
+
+    A request is retried when its response has one of the given `statuses`
+    or sending it raises one of the given `errors`, up to a total of
+    `max_attempts` attempts. Only requests with one of the given safe
+    `methods` are retried, since the server may already have acted on any
+    other request it received; include ``'PUT'``, ``'DELETE'`` or
+    ``'POST'`` in `methods` to opt in to retrying those. A request with any
+    other method is still retried when its connection could not be opened,
+    as nothing was sent.
+
+    Before each retry, the policy waits for an exponentially growing delay of
+    ``backoff_factor * 2 ** (attempt - 1)`` seconds, capped at `max_backoff`.
+    With `jitter`, a random delay between zero and that amount is used
+    instead, so that many clients retrying at once spread out their
+    requests. A ``Retry-After`` delay given by the server is honored when it
+    is longer.
+
+    The `retries` counter records how many retries the policy has made, and
+    `retries_by_reason` breaks that down by response status or by the
+    `error_reason()` of the error. The `exhausted` counter records how many requests still failed
+    after all their attempts.
+
+    """
+
+    def __init__(self, max_attempts=3, backoff_factor=0.5, max_backoff=30,
+                 jitter=True, statuses=(429, 502, 503, 504),
+                 errors=(socket.error, httplib.HTTPException),
+                 methods=('GET', 'HEAD')):
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self.errors = tuple(errors)
+        self.methods = frozenset(methods)
+        self.retries = 0
+        self.retries_by_reason = dict()
+        self.exhausted = 0
+        self._lock = threading.Lock()
+
+    def should_retry(self, method, attempt, status=None, error=None):
+        """Return whether a request with the given method should be tried
+        again after its `attempt`-th attempt got a response with the given
+        status or raised the given error."""
+        if status is not None and status not in self.statuses:
+            return False
+        if error is not None and not isinstance(error, self.errors):
+            return False
+        if method not in self.methods and (error is None or _request_sent(error)):
+            return False
+        if attempt >= self.max_attempts:
+            with self._lock:
+                self.exhausted += 1
+            return False
+        return True
+
+    def backoff(self, attempt, retry_after=None):
+        """Return the number of seconds to wait before retrying a request
+        after its `attempt`-th attempt."""
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        if retry_after is not None:
+            try:
+                delay = max(delay, min(self.max_backoff, float(retry_after)))
+            except ValueError:
+                pass
+        return delay
+
+    def wait(self, attempt, reason, retry_after=None, limit=None):
+        """Count a retry for the given reason, and sleep for the backoff
+        delay before it, returning ``True``.
+
+        If a `limit` is given and the backoff delay is longer than that many
+        seconds, return ``False`` at once without counting the retry.
+
+        """
+        delay = self.backoff(attempt, retry_after)
+        if limit is not None and delay > limit:
+            return False
+        with self._lock:
+            self.retries += 1
+            self.retries_by_reason[reason] = self.retries_by_reason.get(reason, 0) + 1
+        time.sleep(delay)
+        return True
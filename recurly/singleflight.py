@@ -0,0 +1,98 @@
+"""
+Coalescing of identical concurrent requests.
+
+When ``recurly.SINGLE_FLIGHT`` is set to a `SingleFlight`, a ``GET`` of a
+document by `Resource.element_for_url()` while the same document is already
+being requested on another thread waits for that request to finish instead
+of making its own. Many threads asking for the same popular resource at
+once, such as a plan shown on every page of a site, then make only one
+request between them:
+
+    recurly.SINGLE_FLIGHT = recurly.singleflight.SingleFlight()
+
+Every waiting caller receives the same response and parsed element, or the
+same exception, as the thread that made the request, except for timeouts:
+the request may have timed out only because of the requesting thread's own
+deadline, so the waiting callers make the request again. A caller waiting
+under a `recurly.deadline()` stops waiting when its deadline passes. Each caller still
+makes its own `Resource` instance from that element, so the instances can
+be changed independently; as with the elements kept by `recurly.cache`, the
+shared element itself should not be changed.
+"""
+
+import socket
+import sys
+import threading
+
+import recurly.deadlines
+from recurly.errors import DeadlineExceededError
+
+
+_UNSHARED_ERRORS = (DeadlineExceededError, socket.timeout)
+"""Errors that may come from the deadline or timeouts of the caller that
+made the call, rather than from the call itself."""
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.exc_info = None
+
+
+class SingleFlight(object):
+
+    """A thread-safe registry of the calls in flight, by key.
+
+    The `calls` counter records how many calls were made, and `coalesced`
+    how many callers shared the result of another's call instead.
+
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._in_flight = dict()
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Return the result of calling `func`, or of the call of a `func`
+        already in flight for the same key on another thread.
+
+        An exception raised by the call is raised to every caller sharing
+        it, except that a call that timed out (with a
+        `recurly.errors.DeadlineExceededError` or `socket.timeout`) is made
+        again by the callers that were waiting for it, under their own
+        deadlines. A caller waiting for another's call raises
+        `recurly.errors.DeadlineExceededError` if the active deadline passes
+        first.
+
+        """
+        while True:
+            with self._lock:
+                call = self._in_flight.get(key)
+                if call is None:
+                    call = self._in_flight[key] = _Call()
+                    self.calls += 1
+                    break
+                self.coalesced += 1
+
+            if not call.done.wait(recurly.deadlines.remaining()):
+                raise DeadlineExceededError(
+                    "Deadline passed before the request in flight could be completed")
+            if call.exc_info is None:
+                return call.result
+            if not isinstance(call.exc_info[1], _UNSHARED_ERRORS):
+                raise call.exc_info[0], call.exc_info[1], call.exc_info[2]
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException:
+            call.exc_info = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            call.done.set()
@@ -0,0 +1,230 @@
+"""
+Transports that send API requests over HTTP.
+
+`Resource.http_request()` builds each request's headers and body, and
+handles retries, rate limiting and logging, but hands the request itself to
+the transport in the ``recurly.TRANSPORT`` setting (or the active
+`recurly.Client`'s `transport`). Any object with a `request()` method like
+`Transport.request()` can be used, so the HTTP library can be chosen to suit
+the application, or replaced with an in-memory stand-in for tests and
+benchmarks.
+
+`HTTPLibTransport`, the default, uses the standard library's `httplib` and
+the ``recurly.CONNECTION_POOL``. `Urllib3Transport` uses the pooled
+connections of the optional `urllib3` package:
+
+    recurly.TRANSPORT = recurly.transport.Urllib3Transport(maxsize=20)
+"""
+
+from contextlib import contextmanager
+import httplib
+import socket
+import ssl
+import time
+from urlparse import urlsplit
+
+import backports.ssl_match_hostname
+
+import recurly
+import recurly.client
+import recurly.events
+from recurly.pool import _send, _unchanged
+
+
+class Transport(object):
+
+    """The interface of the objects that send API requests."""
+
+    def request(self, method, url, body=None, headers=None, event=None, timeout=None):
+        """Send an HTTP request with the given method, absolute URL, body
+        string and dictionary of headers, returning its response.
+
+        If a `timeout` is given, it is a ``(connect, read)`` tuple of the
+        seconds to allow for connecting and for each read from the
+        connection, either of which may be ``None`` for no limit. A
+        `socket.timeout` (or other `socket.error`) should be raised when one
+        runs out. An error raised before any of the request was sent, such
+        as a failure to connect, may be given a false ``request_sent``
+        attribute so that a `recurly.retry.RetryPolicy` can retry it
+        whatever the request's method.
+
+        The response should offer these parts of the interface of
+        `httplib.HTTPResponse`:
+
+        * ``status`` and ``reason``, the response's status code and message
+        * ``getheader(name, default=None)``, the value of the named header
+        * ``getheaders()``, a list of ``(name, value)`` header tuples
+        * ``read(amt=None)``, the rest of the body, or up to `amt` bytes of it
+        * ``close()``
+
+        The transport may reuse the connection once the body has been read
+        completely. If a `recurly.events.Event` is given, the time spent
+        opening connections may be added to its ``connect`` and ``tls``
+        timings.
+
+        """
+        raise NotImplementedError
+
+    def clear(self):
+        """Close any idle connections the transport keeps for reuse."""
+        pass
+
+
+class _ValidatedHTTPSConnection(httplib.HTTPSConnection):
+
+    """An `httplib.HTTPSConnection` that validates the SSL connection by
+    requiring certificate validation and checking the connection's intended
+    hostname again the validated certificate's possible hosts."""
+
+    ca_certs = None
+
+    def connect(self):
+        sock = socket.create_connection((self.host, self.port),
+                                        self.timeout, self.source_address)
+        if self._tunnel_host:
+            self.sock = sock
+            self._tunnel()
+
+        handshake_started = time.time()
+        ssl_sock = ssl.wrap_socket(sock, self.key_file, self.cert_file,
+            ssl_version=ssl.PROTOCOL_SSLv3, cert_reqs=ssl.CERT_REQUIRED,
+            ca_certs=self.ca_certs)
+
+        # Let the CertificateError for failure be raised to the caller.
+        backports.ssl_match_hostname.match_hostname(ssl_sock.getpeercert(), self.host)
+        self.tls_time = time.time() - handshake_started
+
+        self.sock = ssl_sock
+
+
+class HTTPLibTransport(Transport):
+
+    """A transport using the standard library's `httplib`.
+
+    Requests are sent over persistent connections from the
+    ``recurly.CONNECTION_POOL`` pool when one is set. HTTPS connections
+    validate the server's certificate when ``recurly.CA_CERTS_FILE`` is set.
+    While a `recurly.Client` is active, its `connection_pool` and
+    `ca_certs_file` are used instead.
+
+    """
+
+    def request(self, method, url, body=None, headers=None, event=None, timeout=None):
+        config = recurly.client.settings()
+        ca_certs_file = config.ca_certs_file
+        urlparts = urlsplit(url)
+        if urlparts.scheme != 'https':
+            connection_class = httplib.HTTPConnection
+        elif ca_certs_file is None:
+            connection_class = httplib.HTTPSConnection
+        else:
+            connection_class = _ValidatedHTTPSConnection
+
+        connection_kwargs = dict()
+        read_timeout = _unchanged
+        if timeout is not None:
+            connect_timeout, read_timeout = timeout
+            if connect_timeout is not None:
+                connection_kwargs['timeout'] = connect_timeout
+
+        def create_connection():
+            connection = connection_class(urlparts.netloc, **connection_kwargs)
+            if ca_certs_file is not None:
+                connection.ca_certs = ca_certs_file
+            recurly.events.time_connection(connection)
+            return connection
+
+        headers = {} if headers is None else headers
+        pool = config.connection_pool
+        with recurly.events.timing(event):
+            if pool is None:
+                return _send(create_connection(), method, url, body, headers, read_timeout)
+
+            key = (urlparts.scheme, urlparts.hostname, urlparts.port, ca_certs_file)
+            return pool.request(key, create_connection, method, url, body, headers,
+                read_timeout)
+
+
+@contextmanager
+def _urllib3_errors():
+    """Raise the `urllib3` errors raised in the block as the `socket`
+    errors `httplib` would raise, so they are retried and timed out alike."""
+    import urllib3.exceptions
+
+    try:
+        yield
+    except urllib3.exceptions.ConnectTimeoutError, exc:
+        # Also raised when the connection is refused; nothing was sent.
+        error = socket.timeout(str(exc))
+        error.request_sent = False
+        raise error
+    except urllib3.exceptions.TimeoutError, exc:
+        raise socket.timeout(str(exc))
+    except urllib3.exceptions.HTTPError, exc:
+        raise socket.error(str(exc))
+
+
+class _Urllib3Response(object):
+
+    """An `httplib.HTTPResponse`-like view of a `urllib3` response."""
+
+    def __init__(self, response):
+        self.response = response
+        self.status = response.status
+        self.reason = response.reason
+
+    def getheader(self, name, default=None):
+        return self.response.headers.get(name, default)
+
+    def getheaders(self):
+        return self.response.headers.items()
+
+    def read(self, amt=None):
+        with _urllib3_errors():
+            return self.response.read(amt)
+
+    def close(self):
+        self.response.close()
+
+
+class Urllib3Transport(Transport):
+
+    """A transport using a `urllib3.PoolManager`, which keeps up to
+    `maxsize` persistent connections for each host.
+
+    HTTPS connections validate the server's certificate against the
+    certificate authorities in `ca_certs_file`, if given. Any other keyword
+    arguments are passed on to the `urllib3.PoolManager`. The
+    ``recurly.CONNECTION_POOL`` and ``recurly.CA_CERTS_FILE`` settings are
+    not used.
+
+    This transport requires the `urllib3` package, which is not installed
+    with this library.
+
+    """
+
+    def __init__(self, ca_certs_file=None, maxsize=10, **pool_kwargs):
+        import urllib3
+
+        if ca_certs_file is not None:
+            pool_kwargs.setdefault('cert_reqs', 'CERT_REQUIRED')
+            pool_kwargs['ca_certs'] = ca_certs_file
+        self.pool_manager = urllib3.PoolManager(maxsize=maxsize, **pool_kwargs)
+
+    def request(self, method, url, body=None, headers=None, event=None, timeout=None):
+        import urllib3
+
+        kwargs = dict()
+        if timeout is not None:
+            kwargs['timeout'] = urllib3.Timeout(connect=timeout[0], read=timeout[1])
+        # Retries, redirects and decompression are left to
+        # `Resource.http_request()`. The connection returns to the pool once
+        # the body has been read.
+        with _urllib3_errors():
+            response = self.pool_manager.urlopen(method, url, body=body, headers=headers,
+                retries=False, redirect=False, preload_content=False, release_conn=False,
+                decode_content=False, **kwargs)
+        return _Urllib3Response(response)
+
+    def clear(self):
+        self.pool_manager.clear()
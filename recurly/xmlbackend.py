@@ -0,0 +1,99 @@
+"""
+Selection of the XML library used to parse and serialize API documents.
+
+The library is chosen by the ``recurly.XML_BACKEND`` setting: one of
+``'lxml'``, ``'cElementTree'`` or ``'ElementTree'``, or ``None`` to use
+``cElementTree`` when it is available and ``ElementTree`` otherwise.
+
+lxml parses fastest but is only used when selected explicitly, as its
+serializations differ cosmetically from the standard library's (such as
+writing ``<a/>`` rather than ``<a />``).
+
+All the functions here use the library selected at the time they are
+called, so the setting can be changed at runtime. Elements made by one
+library should not be mixed with elements made by another.
+"""
+
+import recurly
+
+
+BACKENDS = ('lxml', 'cElementTree', 'ElementTree')
+"""The names of the supported XML libraries."""
+
+AUTOMATIC_BACKENDS = ('cElementTree', 'ElementTree')
+"""The XML libraries to try, in order, when ``recurly.XML_BACKEND`` is
+``None``."""
+
+_modules = dict()
+
+
+def _load(name):
+    if name == 'lxml':
+        from lxml import etree
+        return etree
+    if name == 'cElementTree':
+        from xml.etree import cElementTree
+        return cElementTree
+    if name == 'ElementTree':
+        from xml.etree import ElementTree
+        return ElementTree
+    raise ValueError("Unknown XML backend %r; expected one of %s"
+        % (name, ', '.join(BACKENDS)))
+
+
+def _selected():
+    name = recurly.XML_BACKEND
+    try:
+        return _modules[name]
+    except KeyError:
+        pass
+
+    if name is None:
+        for candidate in AUTOMATIC_BACKENDS:
+            try:
+                selected = (candidate, _load(candidate))
+            except ImportError:
+                continue
+            break
+    else:
+        selected = (name, _load(name))
+
+    _modules[name] = selected
+    return selected
+
+
+def backend():
+    """Return the ElementTree-compatible module selected by the
+    ``recurly.XML_BACKEND`` setting."""
+    return _selected()[1]
+
+
+def backend_name():
+    """Return the name of the XML library selected by the
+    ``recurly.XML_BACKEND`` setting."""
+    return _selected()[0]
+
+
+def Element(tag):
+    """Return a new, empty XML element with the given tag name."""
+    return backend().Element(tag)
+
+
+def fromstring(text):
+    """Parse the given XML document, returning its root element."""
+    return backend().fromstring(text)
+
+
+def iterparse(source, events=('end',)):
+    """Incrementally parse the XML document read from the file-like
+    `source`, yielding ``(event, element)`` tuples."""
+    return backend().iterparse(source, events=events)
+
+
+def tostring(elem):
+    """Serialize the given element to a UTF-8 encoded XML document,
+    including its XML declaration."""
+    name, module = _selected()
+    if name == 'lxml':
+        return module.tostring(elem, encoding='UTF-8', xml_declaration=True)
+    return module.tostring(elem, encoding='UTF-8')
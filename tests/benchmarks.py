@@ -0,0 +1,343 @@
+"""
+Offline benchmarks of the client's parsing, serialization and pagination.
+
+Run the benchmarks from the repository root:
+
+    $ python tests/benchmarks.py
+    $ python tests/benchmarks.py --json > results.json
+    $ python tests/benchmarks.py --repeat 10 value_for_element page_iteration
+
+No Recurly account or network access is needed: documents are generated or
+read from `tests/fixtures`, and pages are served by a local
+`stubserver.StubServer`, over a socket or in memory. With ``--json``, the
+results are written as a JSON document so that runs can be compared to
+track regressions.
+"""
+
+import argparse
+from datetime import datetime
+import json
+import logging
+from os.path import dirname, abspath
+import platform
+import sys
+import time
+
+sys.path.insert(0, dirname(dirname(abspath(__file__))))
+
+import recurly
+from recurly import js, xmlbackend
+from recurly.link_header import parse_link_value
+from recurly.resource import Money, Page, Resource
+
+from stubserver import FIXTURE_BASE_URI, Fixture, StubServer, StubTransport, account_xml
+
+
+def accounts_xml(start, count):
+    members = ''.join(account_xml(FIXTURE_BASE_URI, index) for index in range(start, start + count))
+    return '<?xml version="1.0" encoding="UTF-8"?>\n<accounts type="array">%s</accounts>' % members
+
+
+def bench_value_for_element():
+    elem = xmlbackend.fromstring(accounts_xml(0, 500))
+    return 'accounts', 500, lambda: Resource.value_for_element(elem)
+
+
+def bench_attribute_access():
+    elem = xmlbackend.fromstring(accounts_xml(0, 500))
+    attributes = ('account_code', 'state', 'username', 'email', 'first_name',
+        'last_name', 'company_name', 'created_at')
+
+    def access():
+        for account in Resource.value_for_element(elem):
+            for attrname in attributes:
+                getattr(account, attrname)
+    return 'accounts', 500, access
+
+
+def bench_attribute_access_cached():
+    accounts = Resource.value_for_element(xmlbackend.fromstring(accounts_xml(0, 500)))
+    attributes = ('account_code', 'state', 'username', 'email', 'first_name',
+        'last_name', 'company_name', 'created_at')
+
+    def access():
+        for account in accounts:
+            for attrname in attributes:
+                getattr(account, attrname)
+    return 'accounts', 500, access
+
+
+class PageResponse(object):
+
+    """A stand-in for the `httplib.HTTPResponse` of a page of accounts."""
+
+    def __init__(self, count):
+        self.body = accounts_xml(0, count)
+        self.headers = {'X-Records': str(count)}
+
+    def read(self):
+        return self.body
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+
+def parse_page(response):
+    response_xml = Resource._read_response(response)
+    value = Resource.value_for_element(xmlbackend.fromstring(response_xml))
+    for account in Page.page_for_value(response, value):
+        account.account_code
+        account.created_at
+        account.hosted_login_token
+
+
+def bench_page_parse():
+    response = PageResponse(200)
+    return 'accounts', 200, lambda: parse_page(response)
+
+
+def bench_page_parse_debug_logging():
+    """Parse the same page as `page_parse` with debug logging enabled (to a
+    handler that discards it), to show what logging costs."""
+    response = PageResponse(200)
+    logger = logging.getLogger('recurly')
+    handler = logging.NullHandler()
+    settings = (logger.level, logger.propagate)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    def restore():
+        logger.removeHandler(handler)
+        logger.level, logger.propagate = settings
+    return 'accounts', 200, lambda: parse_page(response), restore
+
+
+def bench_fixture_parse():
+    body = Fixture('subscription/subscribed.xml').body
+    return 'documents', 1, lambda: recurly.Subscription.from_element(body).to_dict()
+
+
+def sample_subscription():
+    account = recurly.Account(account_code='account1', email='verena@example.com',
+        first_name='Verena', last_name='Example',
+        billing_info=recurly.BillingInfo(first_name='Verena', last_name='Example',
+            number='4111111111111111', month=12, year=2020))
+    return recurly.Subscription(plan_code='basicplan', currency='USD', quantity=1,
+        account=account, starts_at=datetime(2011, 10, 25, 12, 0, 0),
+        subscription_add_ons=[recurly.SubscriptionAddOn(add_on_code='extra%d' % index, quantity=index)
+            for index in range(5)])
+
+
+def bench_to_element_tostring():
+    subscription = sample_subscription()
+    return 'documents', 1, lambda: xmlbackend.tostring(subscription.to_element())
+
+
+def bench_to_xml():
+    subscription = sample_subscription()
+    return 'documents', 1, lambda: subscription.to_xml()
+
+
+def bench_parse_link_value():
+    header = ('<https://api.recurly.com/v2/accounts?cursor=1304958672%3A1304958672&per_page=50>; rel="next", '
+        '<https://api.recurly.com/v2/accounts?per_page=50>; rel="start"')
+    return 'headers', 1, lambda: parse_link_value(header)
+
+
+def bench_js_sign():
+    subscription = recurly.Subscription(plan_code='basicplan', currency='USD',
+        unit_amount_in_cents=Money(USD=1000))
+    data = {'timestamp': 1329942896, 'nonce': 'unique', 'account': {'account_code': 'account1'}}
+
+    def sign():
+        js.PRIVATE_KEY = '0123456789abcdef0123456789abcdef'
+        try:
+            js.sign(subscription, dict(data))
+        finally:
+            js.PRIVATE_KEY = None
+    return 'signatures', 1, sign
+
+
+def bench_js_to_query():
+    data = {
+        'account': {'account_code': 'account1', 'first_name': 'Verena', 'last_name': 'Example'},
+        'subscription': {'plan_code': 'basicplan', 'add_ons': ['extra1', 'extra2', 'extra3']},
+        'timestamp': 1329942896,
+        'nonce': 'unique',
+    }
+    return 'queries', 1, lambda: js.to_query(data)
+
+
+def bench_page_iteration():
+    server = StubServer(fixtures=False).start()
+    server.add_collection('accounts', 1000)
+    url = server.base_uri + 'accounts?per_page=200'
+
+    def iterate():
+        for account in Page.page_for_url(url):
+            account.account_code
+
+    def stop():
+        if recurly.CONNECTION_POOL is not None:
+            recurly.CONNECTION_POOL.clear()
+        server.stop()
+    return 'accounts', 1000, iterate, stop
+
+
+def bench_page_iteration_compressed():
+    """Iterate over the same pages as `page_iteration`, served gzip
+    compressed, to show what decompression costs (or saves, over a slower
+    network than the loopback interface)."""
+    server = StubServer(fixtures=False, compress=True).start()
+    server.add_collection('accounts', 1000)
+    url = server.base_uri + 'accounts?per_page=200'
+
+    def iterate():
+        for account in Page.page_for_url(url):
+            account.account_code
+
+    def stop():
+        if recurly.CONNECTION_POOL is not None:
+            recurly.CONNECTION_POOL.clear()
+        server.stop()
+    return 'accounts', 1000, iterate, stop
+
+
+def bench_page_iteration_in_memory():
+    """Iterate over the same pages as `page_iteration`, served in memory by
+    a `StubTransport` instead of over a socket, to separate the library's
+    own costs from the network's."""
+    server = StubServer(fixtures=False)
+    server.add_collection('accounts', 1000)
+    url = server.base_uri + 'accounts?per_page=200'
+    transport, recurly.TRANSPORT = recurly.TRANSPORT, StubTransport(server)
+
+    def iterate():
+        for account in Page.page_for_url(url):
+            account.account_code
+
+    def stop():
+        recurly.TRANSPORT = transport
+        server.server_close()
+    return 'accounts', 1000, iterate, stop
+
+
+BENCHMARKS = (
+    ('value_for_element', bench_value_for_element),
+    ('attribute_access', bench_attribute_access),
+    ('attribute_access_cached', bench_attribute_access_cached),
+    ('page_parse', bench_page_parse),
+    ('page_parse_debug_logging', bench_page_parse_debug_logging),
+    ('fixture_parse', bench_fixture_parse),
+    ('to_element_tostring', bench_to_element_tostring),
+    ('to_xml', bench_to_xml),
+    ('parse_link_value', bench_parse_link_value),
+    ('js_sign', bench_js_sign),
+    ('js_to_query', bench_js_to_query),
+    ('page_iteration', bench_page_iteration),
+    ('page_iteration_compressed', bench_page_iteration_compressed),
+    ('page_iteration_in_memory', bench_page_iteration_in_memory),
+)
+
+
+def measure(func, repeat, min_time):
+    """Time `func`, returning the seconds per call of each of `repeat` runs
+    of enough calls to take at least `min_time` seconds."""
+    number = 1
+    while True:
+        started = time.time()
+        for i in xrange(number):
+            func()
+        elapsed = time.time() - started
+        if elapsed >= min_time or number >= 1000000:
+            break
+        number *= 10
+
+    timings = [elapsed / number]
+    for i in range(repeat - 1):
+        started = time.time()
+        for i in xrange(number):
+            func()
+        timings.append((time.time() - started) / number)
+    return number, timings
+
+
+def run(names=None, repeat=5, min_time=0.2):
+    """Run the named benchmarks, or all of them, returning their results
+    as a dictionary."""
+    results = list()
+    for name, setup in BENCHMARKS:
+        if names and name not in names:
+            continue
+        prepared = setup()
+        unit, items, func = prepared[:3]
+        try:
+            number, timings = measure(func, repeat, min_time)
+        finally:
+            for teardown in prepared[3:]:
+                teardown()
+
+        timings.sort()
+        best = timings[0]
+        results.append({
+            'name': name,
+            'calls': number,
+            'repeat': repeat,
+            'best': best,
+            'median': timings[len(timings) // 2],
+            'unit': unit,
+            'items': items,
+            'items_per_second': items / best if best else None,
+        })
+
+    return {
+        'recurly_version': recurly.__version__,
+        'python_version': platform.python_version(),
+        'python_implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'xml_backend': xmlbackend.backend_name(),
+        'xml_serializer': recurly.XML_SERIALIZER,
+        'timestamp': int(time.time()),
+        'benchmarks': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Recurly client library offline.")
+    parser.add_argument('names', nargs='*', metavar='NAME',
+        help="benchmarks to run (default: all of %s)" % ', '.join(name for name, setup in BENCHMARKS))
+    parser.add_argument('--repeat', type=int, default=5,
+        help="how many timed runs of each benchmark to make (default: 5)")
+    parser.add_argument('--min-time', type=float, default=0.2,
+        help="the least number of seconds each timed run should take (default: 0.2)")
+    parser.add_argument('--xml-backend', choices=xmlbackend.BACKENDS,
+        help="the XML library to use (default: automatic)")
+    parser.add_argument('--json', action='store_true',
+        help="write the results as a JSON document")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.names) - set(name for name, setup in BENCHMARKS)
+    if unknown:
+        parser.error("unknown benchmarks: %s" % ', '.join(sorted(unknown)))
+
+    recurly.BASE_URI = 'http://127.0.0.1:1/v2/'
+    recurly.API_KEY = 'benchmark'
+    recurly.RETRY_POLICY = None
+    recurly.XML_BACKEND = args.xml_backend
+
+    results = run(args.names, args.repeat, args.min_time)
+    if args.json:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+        return
+
+    print "recurly %s, Python %s, %s XML" % (results['recurly_version'],
+        results['python_version'], results['xml_backend'])
+    for result in results['benchmarks']:
+        print "%-26s %12.1f usec/call %14.1f %s/sec" % (result['name'],
+            result['best'] * 1e6, result['items_per_second'], result['unit'])
+
+
+if __name__ == '__main__':
+    main()
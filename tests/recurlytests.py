@@ -138,3 +138,46 @@ class RecurlyTest(unittest.TestCase):
 
         logging.basicConfig(level=logging.INFO)
         logging.getLogger('recurly').setLevel(logging.DEBUG)
+
+
+class StubServerTest(unittest.TestCase):
+
+    """A test case that makes requests of a local `stubserver.StubServer`.
+
+    Before each test, a server is made with the class's `server_options`
+    and started (unless `start_server` is false), and the library is
+    pointed at it with a fresh connection pool and no retry policy. The
+    module settings changed, and any others named in `settings`, are
+    restored after each test.
+
+    """
+
+    server_options = {}
+    start_server = True
+    settings = ()
+
+    def setUp(self):
+        import recurly
+        from recurly.pool import ConnectionPool
+        from stubserver import StubServer
+
+        names = ('BASE_URI', 'API_KEY', 'CONNECTION_POOL', 'RETRY_POLICY') + tuple(self.settings)
+        self.saved_settings = dict((name, getattr(recurly, name)) for name in names)
+        self.server = StubServer(**self.server_options)
+        if self.start_server:
+            self.server.start()
+        recurly.BASE_URI = self.server.base_uri
+        recurly.API_KEY = 'apikey'
+        recurly.CONNECTION_POOL = ConnectionPool()
+        recurly.RETRY_POLICY = None
+
+    def tearDown(self):
+        import recurly
+
+        recurly.CONNECTION_POOL.clear()
+        if self.server._thread is not None:
+            self.server.stop()
+        else:
+            self.server.server_close()
+        for name, value in self.saved_settings.iteritems():
+            setattr(recurly, name, value)
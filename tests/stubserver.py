@@ -0,0 +1,431 @@
+"""
+An in-process stand-in for the Recurly API, for load and concurrency tests.
+
+A `StubServer` listens on a local port and serves:
+
+* the responses in the `tests/fixtures` corpus, to requests with the same
+  method and path as the fixtures' requests
+* collections of any number of generated resources, in pages with ``Link``
+  and ``X-Records`` headers as the real API sends
+
+The same responses can be served in memory, without the network, through a
+`StubTransport`.
+
+Every response can be delayed by a fixed or random latency, and a share of
+requests can be answered with ``500``, ``503`` or ``429`` errors instead, to
+exercise retries and rate limiting:
+
+    with StubServer(latency=0.01, unavailable_rate=0.1) as server:
+        server.add_collection('accounts', 10000)
+        recurly.BASE_URI = server.base_uri
+        for account in recurly.Account.all(per_page=200):
+            ...
+
+"""
+
+import BaseHTTPServer
+from collections import deque
+import os
+from os.path import join, dirname
+import random
+import socket
+import SocketServer
+from StringIO import StringIO
+import sys
+import threading
+import time
+from urllib import urlencode
+import zlib
+from urlparse import urlsplit, parse_qs
+
+from recurly.transport import Transport
+
+
+FIXTURES_DIR = join(dirname(__file__), 'fixtures')
+
+FIXTURE_BASE_URI = 'https://api.recurly.com/v2/'
+"""The base URI of the requests and links in the fixtures, which the server
+replaces with its own."""
+
+
+def account_xml(base_uri, index):
+    """Return the XML for a generated account with the given index."""
+    return (
+        '<account href="%(base)saccounts/account%(index)d">'
+        '<adjustments href="%(base)saccounts/account%(index)d/adjustments"/>'
+        '<billing_info href="%(base)saccounts/account%(index)d/billing_info"/>'
+        '<account_code>account%(index)d</account_code>'
+        '<state>active</state>'
+        '<username>user%(index)d</username>'
+        '<email>user%(index)d@example.com</email>'
+        '<first_name>Verena</first_name>'
+        '<last_name>Example</last_name>'
+        '<company_name nil="nil"></company_name>'
+        '<accept_language>en-US</accept_language>'
+        '<hosted_login_token>%(index)032x</hosted_login_token>'
+        '<created_at type="datetime">2011-10-25T12:00:00Z</created_at>'
+        '</account>'
+    ) % {'base': base_uri, 'index': index}
+
+
+class Fixture(object):
+
+    """A request and canned response read from a file in `tests/fixtures`."""
+
+    def __init__(self, name):
+        self.name = name
+        with open(join(FIXTURES_DIR, name), 'rb') as fixture_file:
+            text = fixture_file.read()
+
+        request, response = text.split('\nHTTP/', 1)
+        preamble = request.split('\n', 1)[0]
+        self.method, url, http_version = preamble.split(None, 2)
+        urlparts = urlsplit(url)
+        self.path = urlparts.path + ('?' + urlparts.query if urlparts.query else '')
+
+        head, self.body = (response.split('\n\n', 1) + [''])[:2]
+        lines = head.split('\n')
+        self.status = int(lines[0].split()[1])
+        self.headers = list()
+        for line in lines[1:]:
+            # Bodiless responses end with an empty line instead of a body.
+            if not line.strip():
+                continue
+            name, value = line.split(':', 1)
+            if name.lower() in ('content-length', 'transfer-encoding', 'connection'):
+                continue
+            self.headers.append((name, value.strip()))
+
+
+class Collection(object):
+
+    """A collection of `records` generated resources, served in pages."""
+
+    def __init__(self, path, records, member_xml, nodename):
+        self.path = path
+        self.records = records
+        self.member_xml = member_xml
+        self.nodename = nodename
+
+
+class StubHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # Send each response as soon as it's written, instead of letting Nagle's
+    # algorithm hold back its body until the client acknowledges the
+    # headers, which the client's delayed ACK holds back ~40ms in turn.
+    disable_nagle_algorithm = True
+    # Buffer the status line and headers so that they go out with the body.
+    wbufsize = -1
+
+    def do_request(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else ''
+        server.record_request(self.command, self.path, dict(self.headers), body)
+
+        latency = server.latency
+        if isinstance(latency, tuple):
+            latency = server.random.uniform(*latency)
+        if latency:
+            time.sleep(latency)
+
+        status, headers, body = server.respond(self.command, self.path, self.headers)
+        if status in (204, 304):
+            # These responses never have a body, whatever is injected.
+            body = ''
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    do_GET = do_HEAD = do_POST = do_PUT = do_DELETE = do_request
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    """A local HTTP server imitating the Recurly API.
+
+    Requests are answered after `latency` seconds, or a random number of
+    seconds between the two values of a ``(min, max)`` tuple. Each request
+    has an `error_rate` chance of a ``500`` response, an `unavailable_rate`
+    chance of a ``503`` response, and a `throttle_rate` chance of a ``429``
+    response with a ``Retry-After`` header of `retry_after` seconds. The
+    random choices are made with a generator seeded with `seed`, so runs can
+    be repeated. With `compress`, responses are gzip or deflate compressed
+    for requests that accept it.
+
+    The `requests` list records a ``(method, path, headers, body)`` tuple
+    for each request received, and `connections` counts the connections
+    accepted.
+
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency=0, error_rate=0, unavailable_rate=0,
+                 throttle_rate=0, retry_after=1, seed=0, fixtures=True, compress=False):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), StubHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.unavailable_rate = unavailable_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.compress = compress
+        self.requests = list()
+        self.connections = 0
+        self.base_uri = 'http://%s:%d/v2/' % self.server_address
+        self._fixtures = dict()
+        self._collections = dict()
+        self._failures = deque()
+        self._lock = threading.Lock()
+        self._thread = None
+        if fixtures:
+            self.load_fixtures()
+
+    def load_fixtures(self):
+        """Serve the responses of all the fixtures in `tests/fixtures`.
+
+        Where several fixtures have the same request, the first one found is
+        served; use `use_fixture()` to choose another.
+
+        """
+        for dirpath, dirnames, filenames in os.walk(FIXTURES_DIR):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if not filename.endswith('.xml'):
+                    continue
+                fixture = Fixture(os.path.relpath(join(dirpath, filename), FIXTURES_DIR))
+                self._fixtures.setdefault((fixture.method, fixture.path), fixture)
+
+    def use_fixture(self, name):
+        """Serve the named fixture's response to requests like its
+        request."""
+        fixture = Fixture(name)
+        with self._lock:
+            self._fixtures[(fixture.method, fixture.path)] = fixture
+
+    def add_collection(self, path, records, member_xml=account_xml, nodename=None):
+        """Serve a collection of `records` generated resources at the given
+        path under the base URI.
+
+        Pages of the collection are requested with the ``cursor`` and
+        ``per_page`` parameters, and members by their index at
+        ``<path>/<index>``. The XML of each member is made by calling
+        ``member_xml(base_uri, index)``.
+
+        """
+        nodename = nodename or path.rstrip('/').rsplit('/', 1)[-1]
+        collection = Collection('/v2/' + path.strip('/'), records, member_xml, nodename)
+        with self._lock:
+            self._collections[collection.path] = collection
+        return collection
+
+    def fail_next(self, status, count=1, headers=()):
+        """Answer the next `count` requests with the given error status and
+        headers, whatever their rates."""
+        with self._lock:
+            for i in range(count):
+                self._failures.append((status, list(headers)))
+
+    def record_request(self, method, path, headers, body):
+        with self._lock:
+            self.requests.append((method, path, headers, body))
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.connections += 1
+        SocketServer.ThreadingMixIn.process_request(self, request, client_address)
+
+    def handle_error(self, request, client_address):
+        # Clients that gave up waiting, such as after a read timeout, close
+        # their connection before the response is written.
+        if isinstance(sys.exc_info()[1], socket.error):
+            return
+        BaseHTTPServer.HTTPServer.handle_error(self, request, client_address)
+
+    def _injected_failure(self):
+        with self._lock:
+            if self._failures:
+                return self._failures.popleft()
+            roll = self.random.random()
+        if roll < self.throttle_rate:
+            return 429, [('Retry-After', str(self.retry_after))]
+        roll -= self.throttle_rate
+        if roll < self.unavailable_rate:
+            return 503, []
+        roll -= self.unavailable_rate
+        if roll < self.error_rate:
+            return 500, []
+        return None
+
+    def respond(self, method, path, headers=None):
+        """Return the ``(status, headers, body)`` of the response to a
+        request with the given method, path and headers."""
+        status, response_headers, body = self._respond(method, path)
+        if not self.compress or not body or headers is None:
+            return status, response_headers, body
+
+        accepted = [encoding.split(';')[0].strip()
+            for encoding in (headers.get('accept-encoding') or '').split(',')]
+        if 'gzip' in accepted:
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            encoding = 'gzip'
+        elif 'deflate' in accepted:
+            compressor = zlib.compressobj()
+            encoding = 'deflate'
+        else:
+            return status, response_headers, body
+        body = compressor.compress(body) + compressor.flush()
+        return status, response_headers + [('Content-Encoding', encoding)], body
+
+    def _respond(self, method, path):
+        # Requests may give the absolute URL rather than only the path.
+        urlparts = urlsplit(path)
+        path = urlparts.path + ('?' + urlparts.query if urlparts.query else '')
+
+        failure = self._injected_failure()
+        if failure is not None:
+            status, headers = failure
+            body = ('<?xml version="1.0" encoding="UTF-8"?>\n<error><symbol>stub_error</symbol>'
+                '<description>Injected %d error</description></error>' % status)
+            return status, [('Content-Type', 'application/xml; charset=utf-8')] + headers, body
+
+        with self._lock:
+            collection = self._collections.get(urlparts.path.rstrip('/'))
+            member_collection = self._collections.get(urlparts.path.rsplit('/', 1)[0])
+            fixture = self._fixtures.get((method, path))
+        if method == 'GET' and collection is not None:
+            return self._page(collection, parse_qs(urlparts.query))
+        if method == 'GET' and member_collection is not None:
+            return self._member(member_collection, urlparts.path.rsplit('/', 1)[1])
+        if fixture is not None:
+            headers = [(name, value.replace(FIXTURE_BASE_URI, self.base_uri))
+                for name, value in fixture.headers]
+            return fixture.status, headers, fixture.body.replace(FIXTURE_BASE_URI, self.base_uri)
+
+        body = ('<?xml version="1.0" encoding="UTF-8"?>\n<error><symbol>not_found</symbol>'
+            '<description>No stub for %s %s</description></error>' % (method, path))
+        return 404, [('Content-Type', 'application/xml; charset=utf-8')], body
+
+    def _page(self, collection, query):
+        cursor = int(query.get('cursor', ['0'])[0])
+        per_page = int(query.get('per_page', ['50'])[0])
+        end = min(collection.records, cursor + per_page)
+        members = ''.join(collection.member_xml(self.base_uri, index)
+            for index in range(cursor, end))
+        body = '<?xml version="1.0" encoding="UTF-8"?>\n<%s type="array">%s</%s>' % (
+            collection.nodename, members, collection.nodename)
+
+        url = 'http://%s:%d%s' % (self.server_address + (collection.path,))
+        links = ['<%s?%s>; rel="start"' % (url, urlencode({'per_page': per_page}))]
+        if end < collection.records:
+            links.append('<%s?%s>; rel="next"' % (url, urlencode({'cursor': end, 'per_page': per_page})))
+        headers = [
+            ('Content-Type', 'application/xml; charset=utf-8'),
+            ('X-Records', str(collection.records)),
+            ('Link', ', '.join(links)),
+        ]
+        return 200, headers, body
+
+    def _member(self, collection, key):
+        digits = key.lstrip('abcdefghijklmnopqrstuvwxyz_')
+        if not digits.isdigit() or int(digits) >= collection.records:
+            body = ('<?xml version="1.0" encoding="UTF-8"?>\n<error><symbol>not_found</symbol>'
+                '<description>Couldn\'t find %s</description></error>' % key)
+            return 404, [('Content-Type', 'application/xml; charset=utf-8')], body
+        body = '<?xml version="1.0" encoding="UTF-8"?>\n' + collection.member_xml(self.base_uri, int(digits))
+        return 200, [('Content-Type', 'application/xml; charset=utf-8')], body
+
+    def start(self):
+        """Start serving requests on a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving requests and close the listening socket."""
+        self.shutdown()
+        self.server_close()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+class StubResponse(object):
+
+    """An `httplib.HTTPResponse`-like response from a `StubTransport`."""
+
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.reason = BaseHTTPServer.BaseHTTPRequestHandler.responses[status][0]
+        self.headers = headers
+        self.body = StringIO(body)
+
+    def getheader(self, name, default=None):
+        for header, value in self.headers:
+            if header.lower() == name.lower():
+                return value
+        return default
+
+    def getheaders(self):
+        return list(self.headers)
+
+    def read(self, amt=None):
+        if amt is None:
+            return self.body.read()
+        return self.body.read(amt)
+
+    def close(self):
+        pass
+
+
+class StubTransport(Transport):
+
+    """A `recurly.transport.Transport` answering requests in memory with
+    the responses of the given `StubServer`, without any sockets.
+
+    The server's latency and error rates apply as when it is requested over
+    HTTP, but it need not be started. A latency longer than the request's
+    read timeout raises a `socket.timeout` once the timeout has passed. Use
+    it to measure the library's own costs without those of the network:
+
+        server = StubServer(fixtures=False)
+        server.add_collection('accounts', 10000)
+        recurly.BASE_URI = server.base_uri
+        recurly.TRANSPORT = StubTransport(server)
+
+    """
+
+    def __init__(self, server):
+        self.server = server
+
+    def request(self, method, url, body=None, headers=None, event=None, timeout=None):
+        headers = dict((name.lower(), value) for name, value in (headers or {}).iteritems())
+        self.server.record_request(method, url, headers, body or '')
+
+        latency = self.server.latency
+        if isinstance(latency, tuple):
+            latency = self.server.random.uniform(*latency)
+        read_timeout = timeout[1] if timeout is not None else None
+        if latency and read_timeout is not None and latency > read_timeout:
+            time.sleep(read_timeout)
+            raise socket.timeout('timed out')
+        if latency:
+            time.sleep(latency)
+
+        status, response_headers, response_body = self.server.respond(method, url, headers)
+        return StubResponse(status, response_headers, response_body)
@@ -0,0 +1,220 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+import recurly
+from recurly.cache import CacheEntry, CachedResponse, DiskResponseCache, MemoryResponseCache, ObjectCache
+from recurly import xmlbackend
+
+
+PLAN_XML = '<?xml version="1.0" encoding="UTF-8"?><plan><plan_code>gold</plan_code></plan>'
+
+
+def response(status, body='', **headers):
+    resp = mock.Mock()
+    resp.status = status
+    resp.read.return_value = body
+    headers = dict((k.replace('_', '-'), v) for k, v in headers.items())
+    headers.setdefault('Content-Type', 'application/xml; charset=utf-8')
+    resp.getheader.side_effect = headers.get
+    resp.getheaders.return_value = headers.items()
+    return resp
+
+
+class TestMemoryResponseCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        # Each entry is counted with its parsed single-element tree.
+        size = len('<a/>') + CacheEntry.element_size
+        cache = MemoryResponseCache(max_size=size * 2 + 2)
+        cache.set('a', CacheEntry('<a/>'))
+        cache.set('b', CacheEntry('<b/>'))
+        self.assertEqual(cache.get('a').body, '<a/>')
+        cache.set('c', CacheEntry('<c/>'))
+        self.assertTrue(cache.get('b') is None)
+        self.assertEqual(cache.get('a').body, '<a/>')
+        self.assertEqual(cache.get('c').body, '<c/>')
+        self.assertEqual(cache.size, size * 2)
+
+        cache.set('big', CacheEntry('<big>%s</big>' % ('x' * size)))
+        self.assertTrue(cache.get('big') is None)
+        cache.delete('a')
+        self.assertEqual(cache.size, size)
+
+    def test_size(self):
+        entry = CacheEntry(PLAN_XML)
+        self.assertEqual(entry.size, len(PLAN_XML))
+        cache = MemoryResponseCache()
+        cache.set('plan', entry)
+        tree_size = CacheEntry.element_size * 2 + len('gold')
+        self.assertEqual(entry.size, len(PLAN_XML) + tree_size)
+        self.assertEqual(cache.size, entry.size)
+
+        entry = CacheEntry('<plan href="x"/>', elem=xmlbackend.fromstring('<plan href="x"/>'))
+        self.assertEqual(entry.tree_size(),
+            CacheEntry.element_size + CacheEntry.attribute_size + len('href') + len('x'))
+
+
+class TestDiskResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        cache = DiskResponseCache(self.directory)
+        cache.set(('key', 'url'), CacheEntry(PLAN_XML, etag='"abc"', headers={'X-Records': '1'}))
+        entry = DiskResponseCache(self.directory).get(('key', 'url'))
+        self.assertEqual(entry.etag, '"abc"')
+        self.assertEqual(entry.headers, {'X-Records': '1'})
+        self.assertEqual(entry.element().find('plan_code').text, 'gold')
+        self.assertTrue(cache.get(('key', 'other')) is None)
+
+    def test_corrupt_entries(self):
+        cache = DiskResponseCache(self.directory)
+        cache.set('a', CacheEntry(PLAN_XML, etag='"abc"'))
+        path = cache._path('a')
+        with open(path, 'rb') as cache_file:
+            data = cache_file.read()
+
+        for corrupt in (data[:-5], data.replace('gold', 'lead'), 'garbage',
+                        "cos\nsystem\n(S'true'\ntR.", '[]\n' + PLAN_XML):
+            with open(path, 'wb') as cache_file:
+                cache_file.write(corrupt)
+            self.assertTrue(cache.get('a') is None)
+            self.assertFalse(os.path.exists(path))
+
+    def test_eviction(self):
+        cache = DiskResponseCache(self.directory, max_size=0)
+        cache.set('a', CacheEntry(PLAN_XML))
+        self.assertTrue(cache.get('a') is None)
+
+        size = len(DiskResponseCache._dump(CacheEntry(PLAN_XML)))
+        cache = DiskResponseCache(self.directory, max_size=size * 10)
+        with mock.patch('os.listdir', wraps=os.listdir) as listdir:
+            for key in range(10):
+                cache.set(key, CacheEntry(PLAN_XML))
+            # The directory is only listed for the first write, to learn
+            # its size, and once the limit is passed.
+            self.assertEqual(listdir.call_count, 1)
+            cache.set(10, CacheEntry(PLAN_XML))
+            self.assertEqual(listdir.call_count, 2)
+        self.assertEqual(len([key for key in range(11) if cache.get(key) is not None]), 9)
+
+
+class TestConditionalRequests(unittest.TestCase):
+
+    def setUp(self):
+        self.response_cache = recurly.RESPONSE_CACHE
+        recurly.RESPONSE_CACHE = MemoryResponseCache()
+
+    def tearDown(self):
+        recurly.RESPONSE_CACHE = self.response_cache
+
+    def test_not_modified(self):
+        responses = [
+            response(200, PLAN_XML, ETag='"v1"', X_Records='1'),
+            response(304),
+        ]
+        with mock.patch.object(recurly.Resource, 'http_request', side_effect=responses) as http_request:
+            first = recurly.Plan.get('gold')
+            second = recurly.Plan.get('gold')
+        self.assertEqual(second.plan_code, 'gold')
+        self.assertTrue(first._elem is second._elem)
+        self.assertEqual(http_request.call_args_list[0][1]['headers'], None)
+        self.assertEqual(http_request.call_args_list[1][1]['headers'], {'If-None-Match': '"v1"'})
+
+    def test_cached_response_headers(self):
+        entry = CacheEntry(PLAN_XML, headers=[('x-records', '1'), ('link', '<next>; rel="next"')])
+        cached = CachedResponse(response(304, Link=None), entry)
+        self.assertEqual(cached.getheader('X-Records'), '1')
+        self.assertEqual(cached.getheader('Link'), '<next>; rel="next"')
+        self.assertEqual(cached.status, 304)
+
+
+class TestObjectCache(unittest.TestCase):
+
+    def setUp(self):
+        self.object_cache = recurly.OBJECT_CACHE
+        recurly.OBJECT_CACHE = ObjectCache()
+
+    def tearDown(self):
+        recurly.OBJECT_CACHE = self.object_cache
+
+    def element(self):
+        return xmlbackend.fromstring(
+            '<plan href="https://api.recurly.com/v2/plans/gold"><plan_code>gold</plan_code></plan>')
+
+    def test_ttl_and_lru(self):
+        cache = ObjectCache(max_entries=2, ttls={recurly.Plan: 60})
+        self.assertEqual(cache.ttl_for(recurly.Plan), 60)
+        self.assertEqual(cache.ttl_for(recurly.Coupon), recurly.Coupon.cache_ttl)
+        self.assertTrue(cache.ttl_for(recurly.Account) is None)
+
+        with mock.patch('time.time', return_value=1000):
+            cache.set('a', 'A', 10)
+            cache.set('b', 'B', 10)
+            self.assertEqual(cache.get('a'), 'A')
+            cache.set('c', 'C', 10)
+            self.assertTrue(cache.get('b') is None)
+        with mock.patch('time.time', return_value=1011):
+            self.assertTrue(cache.get('a') is None)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_get_cached(self):
+        with mock.patch.object(recurly.Resource, 'element_for_url',
+                return_value=(None, self.element())) as element_for_url:
+            plan = recurly.Plan.get('gold')
+            same_plan = recurly.Plan.get('gold')
+            self.assertEqual(element_for_url.call_count, 1)
+            self.assertTrue(plan is not same_plan)
+            self.assertEqual(same_plan.plan_code, 'gold')
+
+            # Accounts aren't cached.
+            recurly.Account.get('verena')
+            recurly.Account.get('verena')
+            self.assertEqual(element_for_url.call_count, 3)
+
+            deleted = mock.Mock(status=204)
+            with mock.patch.object(recurly.Resource, 'http_request', return_value=deleted):
+                plan.delete()
+            recurly.Plan.get('gold')
+            self.assertEqual(element_for_url.call_count, 4)
+
+    def test_cached_element_unchanged(self):
+        with mock.patch.object(recurly.Resource, 'element_for_url',
+                return_value=(None, self.element())):
+            plan = recurly.Plan.get('gold')
+            with mock.patch.object(recurly.Plan, 'sensitive_attributes', ('plan_code',)):
+                self.assertTrue('XXXX' in plan.as_log_output(full=True))
+            plan.to_element(full=True).find('plan_code').text = 'lead'
+            self.assertEqual(recurly.Plan.get('gold').plan_code, 'gold')
+
+    def test_warm(self):
+        plan = recurly.Plan.from_element(
+            '<plan href="https://api.recurly.com/v2/plans/gold">'
+            '<add_ons href="https://api.recurly.com/v2/plans/gold/add_ons"/>'
+            '<plan_code>gold</plan_code></plan>')
+        add_ons = xmlbackend.fromstring(
+            '<add_ons type="array"><add_on href="https://api.recurly.com/v2/plans/gold/add_ons/extra">'
+            '<add_on_code>extra</add_on_code></add_on></add_ons>')
+        resp = mock.Mock()
+        resp.getheader.side_effect = {'X-Records': '1'}.get
+        with mock.patch.object(recurly.Plan, 'all', return_value=[plan]):
+            with mock.patch.object(recurly.Resource, 'element_for_url', return_value=(resp, add_ons)):
+                recurly.OBJECT_CACHE.warm()
+
+        # The cached add-on is detached from the page it came from.
+        add_ons.find('add_on/add_on_code').text = 'changed'
+        with mock.patch.object(recurly.Resource, 'element_for_url') as element_for_url:
+            self.assertEqual(recurly.Plan.get('gold').plan_code, 'gold')
+            self.assertEqual(recurly.Plan.get('gold').get_add_on('extra').add_on_code, 'extra')
+        self.assertFalse(element_for_url.called)
+
+if __name__ == '__main__':
+    unittest.main()
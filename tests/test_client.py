@@ -0,0 +1,115 @@
+import base64
+import copy
+import cPickle as pickle
+from StringIO import StringIO
+import threading
+import unittest
+
+import recurly
+from recurly.errors import NotFoundError
+from recurly.resource import Page
+
+from stubserver import StubServer
+
+
+def authorization(api_key):
+    return 'Basic %s' % base64.b64encode('%s:' % api_key)
+
+
+class TestClient(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = (recurly.BASE_URI, recurly.API_KEY)
+        recurly.BASE_URI = 'http://127.0.0.1:1/v2/'
+        recurly.API_KEY = None
+        self.servers = [StubServer(fixtures=False).start() for i in range(2)]
+        self.clients = list()
+        for index, server in enumerate(self.servers):
+            server.add_collection('accounts', 12)
+            self.clients.append(recurly.Client('apikey%d' % index, base_uri=server.base_uri,
+                retry_policy=None))
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        for server in self.servers:
+            server.stop()
+        recurly.BASE_URI, recurly.API_KEY = self.settings
+
+    def test_concurrent_clients(self):
+        results = dict()
+
+        def fetch(client):
+            with client:
+                results[client] = [account.account_code for account in recurly.Account.all(per_page=5)]
+                results[client].extend(account.account_code for account in
+                    recurly.Account.get_many(['account1', 'account2']))
+
+        threads = [threading.Thread(target=fetch, args=(client,)) for client in self.clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        expected = ['account%d' % index for index in range(12)] + ['account1', 'account2']
+        for index, (client, server) in enumerate(zip(self.clients, self.servers)):
+            self.assertEqual(results[client], expected)
+            self.assertEqual(len(server.requests), 5)
+            for method, path, headers, body in server.requests:
+                self.assertEqual(headers['authorization'], authorization('apikey%d' % index))
+        self.assertTrue(recurly.client.current() is None)
+
+    def test_pickle(self):
+        with self.clients[0]:
+            page = recurly.Account.all(per_page=5)
+        copied_page = pickle.loads(pickle.dumps(page, pickle.HIGHEST_PROTOCOL))
+        self.assertFalse('_client' in copied_page.__dict__)
+        self.assertEqual(copied_page.next_url, page.next_url)
+        self.assertEqual([account.account_code for account in list.__iter__(copied_page)],
+            ['account%d' % index for index in range(5)])
+        # Pickling a page doesn't request the pages after it.
+        self.assertEqual(len(self.servers[0].requests), 1)
+
+        for account in (pickle.loads(pickle.dumps(page[1])), copy.deepcopy(page[1])):
+            self.assertFalse('_client' in account.__dict__)
+            self.assertEqual(account.email, 'user1@example.com')
+        self.assertTrue(page[1]._client is self.clients[0])
+
+    def test_consumed_outside_block(self):
+        one = self.clients[0]
+        with one:
+            page = recurly.Account.all(per_page=5)
+            stream = Page.stream_for_url(one.base_uri + 'accounts?per_page=5')
+            results = recurly.Account.get_many(['account1', 'account2'], ordered=False)
+
+        # Iterators made inside the block keep using its client.
+        fp = StringIO()
+        self.assertEqual(recurly.export(page, fp=fp), 12)
+        self.assertEqual(len(list(stream)), 12)
+        self.assertEqual(sorted(uuid for uuid, account in results), ['account1', 'account2'])
+        self.assertEqual(len(self.servers[0].requests), 8)
+        for method, path, headers, body in self.servers[0].requests:
+            self.assertEqual(headers['authorization'], authorization('apikey0'))
+
+    def test_remembered_client(self):
+        one, two = self.clients
+        with one:
+            page = recurly.Account.all(per_page=5)
+            account = page[0]
+        self.assertTrue(account._client is one)
+
+        # Outside the block, the page and account still use their client,
+        # even while another client is active.
+        with two:
+            self.assertEqual(len(list(page)), 12)
+            self.assertRaises(NotFoundError, account.delete)
+        method, path, headers, body = self.servers[0].requests[-1]
+        self.assertEqual((method, headers['authorization']), ('DELETE', authorization('apikey0')))
+        self.assertEqual(len(self.servers[1].requests), 0)
+
+        # Resources saved while a client is active remember it too.
+        new_account = recurly.Account(account_code='new')
+        with two:
+            self.assertRaises(NotFoundError, new_account.save)
+        self.assertTrue(new_account._client is two)
+        self.assertEqual(self.servers[1].requests[-1][0], 'POST')
@@ -0,0 +1,67 @@
+import zlib
+
+import recurly
+from recurly.compression import Compression, DecompressingResponse
+
+from recurlytests import StubServerTest
+from stubserver import StubResponse
+
+
+def compress(data, wbits):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, wbits)
+    return compressor.compress(data) + compressor.flush()
+
+
+class TestCompression(StubServerTest):
+
+    server_options = {'fixtures': False, 'compress': True}
+    settings = ('COMPRESSION',)
+
+    def setUp(self):
+        super(TestCompression, self).setUp()
+        self.server.add_collection('accounts', 120)
+        recurly.COMPRESSION = Compression()
+
+    def test_decompressing_response(self):
+        body = '<accounts type="array">%s</accounts>' % ('<account/>' * 5000)
+        compression = Compression()
+        for encoding, wbits in (('gzip', 16 + zlib.MAX_WBITS), ('deflate', zlib.MAX_WBITS),
+                                ('deflate', -zlib.MAX_WBITS)):
+            response = StubResponse(200, [('Content-Encoding', encoding),
+                ('Content-Length', '100'), ('X-Records', '5000')], compress(body, wbits))
+            decoded = compression.decode(response)
+            self.assertTrue(isinstance(decoded, DecompressingResponse))
+            self.assertEqual(decoded.getheader('Content-Encoding'), None)
+            self.assertEqual(decoded.getheaders(), [('X-Records', '5000')])
+
+            chunks = list(iter(lambda: decoded.read(1000), ''))
+            self.assertEqual(''.join(chunks), body)
+            self.assertEqual(max(len(chunk) for chunk in chunks), 1000)
+
+        self.assertEqual(compression.responses, 3)
+        self.assertEqual(compression.decompressed_bytes, 3 * len(body))
+        self.assertTrue(compression.ratio > 10)
+
+        response = StubResponse(200, [], body)
+        self.assertTrue(compression.decode(response) is response)
+        self.assertRaises(ValueError, Compression, ('br',))
+
+    def test_requests(self):
+        accounts = recurly.Account.all(per_page=50)
+        self.assertEqual([account.account_code for account in accounts],
+            ['account%d' % index for index in range(120)])
+        streamed = [account.account_code for account in recurly.Account.stream_all(per_page=50)]
+        self.assertEqual(streamed, ['account%d' % index for index in range(120)])
+
+        for method, path, headers, body in self.server.requests:
+            self.assertEqual(headers['accept-encoding'], 'gzip, deflate')
+        self.assertEqual(recurly.COMPRESSION.responses, 6)
+        self.assertTrue(recurly.COMPRESSION.decompressed_bytes > 5 * recurly.COMPRESSION.compressed_bytes)
+        # Each connection went back to the pool once its body was read.
+        self.assertEqual(recurly.CONNECTION_POOL.misses, 1)
+
+    def test_uncompressed(self):
+        recurly.COMPRESSION = None
+        self.assertEqual(recurly.Account.get('account3').account_code, 'account3')
+        method, path, headers, body = self.server.requests[-1]
+        self.assertEqual(headers.get('accept-encoding', 'identity'), 'identity')
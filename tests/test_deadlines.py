@@ -0,0 +1,76 @@
+import socket
+import time
+
+import recurly
+from recurly.deadlines import remaining
+from recurly.errors import DeadlineExceededError
+from recurly.resource import _request_slots_semaphore
+from recurly.retry import RetryPolicy
+
+from recurlytests import StubServerTest
+
+
+class TestDeadlines(StubServerTest):
+
+    server_options = {'fixtures': False, 'latency': 0.2}
+    settings = ('READ_TIMEOUT', 'MAX_CONCURRENT_REQUESTS')
+
+    def setUp(self):
+        super(TestDeadlines, self).setUp()
+        self.server.add_collection('accounts', 50)
+
+    def test_nesting(self):
+        self.assertEqual(remaining(), None)
+        with recurly.deadline(10) as outer:
+            with recurly.deadline(100) as inner:
+                self.assertEqual(inner.expires, outer.expires)
+                self.assertTrue(9 < remaining() <= 10)
+            with recurly.deadline(1):
+                self.assertTrue(remaining() <= 1)
+        self.assertEqual(remaining(), None)
+
+    def test_pagination(self):
+        started = time.time()
+        accounts = list()
+        with recurly.deadline(0.5):
+            self.assertRaises(DeadlineExceededError, accounts.extend,
+                recurly.Account.all(per_page=5))
+        self.assertTrue(time.time() - started < 1)
+        self.assertTrue(0 < len(accounts) < 50)
+
+        # Without a deadline, the whole collection is fetched.
+        self.assertEqual(len(list(recurly.Account.all(per_page=25))), 50)
+
+    def test_get_many(self):
+        started = time.time()
+        with recurly.deadline(0.5):
+            self.assertRaises(DeadlineExceededError, recurly.Account.get_many,
+                ['account%d' % index for index in range(10)], workers=2)
+        self.assertTrue(time.time() - started < 1)
+
+    def test_request_slots(self):
+        recurly.MAX_CONCURRENT_REQUESTS = 1
+        slots = _request_slots_semaphore()
+        self.assertTrue(slots.acquire())
+        try:
+            started = time.time()
+            with recurly.deadline(0.3):
+                self.assertRaises(DeadlineExceededError, recurly.Account.get_many, ['account1'])
+            self.assertTrue(time.time() - started < 0.6)
+        finally:
+            slots.release()
+        self.assertEqual(self.server.requests, [])
+        self.assertEqual(recurly.Account.get_many(['account1'])[0].account_code, 'account1')
+
+    def test_retry_wait(self):
+        recurly.RETRY_POLICY = RetryPolicy(backoff_factor=10, jitter=False)
+        self.server.fail_next(503, count=3)
+        started = time.time()
+        with recurly.deadline(2):
+            self.assertRaises(DeadlineExceededError, recurly.Account.get, 'account1')
+        self.assertTrue(time.time() - started < 1)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_read_timeout(self):
+        recurly.READ_TIMEOUT = 0.05
+        self.assertRaises(socket.timeout, recurly.Account.get, 'account1')
@@ -0,0 +1,120 @@
+import mock
+
+import recurly
+import recurly.events
+from recurly.errors import NotFoundError
+from recurly.events import Summary, path_template
+
+from recurlytests import StubServerTest
+from stubserver import StubServer
+
+
+class TestEvents(StubServerTest):
+
+    settings = ('OBSERVERS',)
+
+    def setUp(self):
+        super(TestEvents, self).setUp()
+        self.events = list()
+        self.summary = Summary()
+        recurly.OBSERVERS = [self.events.append, self.summary]
+
+    def test_path_template(self):
+        self.assertEqual(path_template(recurly.BASE_URI + 'accounts'), 'accounts')
+        self.assertEqual(path_template(recurly.BASE_URI + 'accounts/abc?per_page=5'), 'accounts/%s')
+        self.assertEqual(path_template(recurly.BASE_URI + 'plans/basic/add_ons/extra'),
+            'plans/%s/add_ons/%s')
+        self.assertEqual(path_template(recurly.BASE_URI + 'subscriptions/123/cancel'),
+            'subscriptions/%s/cancel')
+        self.assertEqual(path_template(recurly.BASE_URI + 'recurly_js/result/abcdef0123'),
+            'recurly_js/result/%s')
+
+    def test_path_template_for_class(self):
+        self.assertEqual(path_template(recurly.BASE_URI + 'accounts/abc/adjustments', recurly.Account),
+            'accounts/%s/adjustments')
+        self.assertEqual(path_template(recurly.BASE_URI + 'plans', recurly.Plan), 'plans')
+        self.assertEqual(path_template(recurly.BASE_URI + 'recurly_js/result/abc', recurly.Resource),
+            'recurly_js/result/%s')
+
+    def test_document(self):
+        self.server.add_collection('accounts', 10)
+        recurly.Account.get('account1')
+
+        request, document = self.events
+        self.assertEqual((request.name, request.method, request.path, request.status),
+            ('request', 'GET', 'accounts/%s', 200))
+        self.assertTrue('connect' in request.timings)
+        self.assertTrue('first_byte' in request.timings)
+        self.assertEqual(request.attempts, 1)
+        self.assertEqual(document.tags,
+            {'name': 'document', 'method': 'GET', 'path': 'accounts/%s', 'status': 200})
+        self.assertEqual(sorted(document.timings), ['parse', 'read', 'request'])
+        self.assertTrue(document.bytes_received > 0)
+        self.assertTrue(document.resource_class is recurly.Account)
+
+        # The second request reuses the connection.
+        recurly.Account.get('account2')
+        self.assertFalse('connect' in self.events[2].timings)
+        stats = self.summary.snapshot()
+        self.assertEqual(stats[('document', 'GET', 'accounts/%s', 200)]['count'], 2)
+
+    def test_time_connection(self):
+        connection = mock.Mock(tls_time=None)
+        connect = connection.connect
+        recurly.events.time_connection(connection)
+        first = recurly.events.Event('request', 'GET', self.server.base_uri + 'accounts')
+        second = recurly.events.Event('request', 'GET', self.server.base_uri + 'accounts')
+        with recurly.events.timing(first):
+            connection.connect()
+        first_timings = dict(first.timings)
+        # A pooled connection reconnecting later is timed for the new event.
+        with recurly.events.timing(second):
+            connection.connect()
+        connection.connect()
+        self.assertEqual(first.timings, first_timings)
+        self.assertTrue('connect' in first.timings)
+        self.assertTrue('connect' in second.timings)
+        self.assertEqual(connect.call_count, 3)
+
+    def test_error(self):
+        self.server.add_collection('accounts', 10)
+        self.assertRaises(NotFoundError, recurly.Account.get, 'account20')
+        self.assertEqual([(event.name, event.status) for event in self.events],
+            [('request', 404), ('document', 404)])
+        self.assertTrue(isinstance(self.events[-1].error, NotFoundError))
+        stats = self.summary.snapshot()
+        self.assertEqual(stats[('document', 'GET', 'accounts/%s', 404)]['count'], 1)
+
+        recurly.CONNECTION_POOL.clear()
+        self.server.stop()
+        try:
+            self.assertRaises(Exception, recurly.Account.get, 'account1')
+        finally:
+            self.server = StubServer().start()
+        request, document = self.events[-2:]
+        self.assertEqual((request.name, document.name), ('request', 'document'))
+        self.assertTrue(request.error is not None)
+        self.assertTrue(document.error is request.error)
+        self.assertEqual(document.status, None)
+
+    def test_action(self):
+        subscription = recurly.Subscription.from_element(
+            '<subscription href="%(base)ssubscriptions/123456789012345678901234567890ab">'
+            '<a name="cancel" href="%(base)ssubscriptions/123456789012345678901234567890ab/cancel" method="put"/>'
+            '</subscription>' % {'base': self.server.base_uri})
+        subscription.cancel()
+
+        action = self.events[-1]
+        self.assertEqual(action.tags,
+            {'name': 'action', 'method': 'PUT', 'path': 'subscriptions/%s/cancel', 'status': 200})
+        self.assertTrue(action.duration >= self.events[0].duration)
+
+    def test_failing_observer(self):
+        def fail(event):
+            raise ValueError(event)
+        recurly.OBSERVERS.insert(0, fail)
+        self.server.add_collection('accounts', 10)
+        with mock.patch.object(recurly.events.log, 'exception') as log_exception:
+            self.assertEqual(recurly.Account.get('account1').account_code, 'account1')
+        self.assertEqual(len(self.events), 2)
+        self.assertEqual(log_exception.call_count, 2)
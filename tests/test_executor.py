@@ -0,0 +1,74 @@
+import threading
+import unittest
+
+import mock
+
+import recurly
+from recurly.executor import Executor, TimeoutError
+
+
+class TestExecutor(unittest.TestCase):
+
+    def test_result(self):
+        executor = Executor(workers=2)
+        futures = [executor.submit(pow, i, 2) for i in range(10)]
+        self.assertEqual([f.result(timeout=5) for f in futures], [i * i for i in range(10)])
+        self.assertTrue(all(f.done() for f in futures))
+        self.assertTrue(futures[0].exception() is None)
+
+    def test_exception(self):
+        future = Executor().submit(int, 'nope')
+        self.assertRaises(ValueError, future.result, 5)
+        self.assertTrue(isinstance(future.exception(), ValueError))
+
+    def test_timeout(self):
+        release = threading.Event()
+        future = Executor().submit(release.wait)
+        self.assertRaises(TimeoutError, future.result, 0.01)
+        release.set()
+        self.assertTrue(future.result(5))
+
+    def test_callback(self):
+        release = threading.Event()
+        future = Executor().submit(lambda: release.wait() and 'done')
+        called = list()
+        finished = threading.Event()
+
+        def callback(f):
+            called.append(f.result())
+            finished.set()
+        future.add_done_callback(callback)
+        release.set()
+        finished.wait(5)
+        self.assertEqual(called, ['done'])
+
+        # Callbacks added after completion run immediately.
+        future.add_done_callback(lambda f: called.append(f.result()))
+        self.assertEqual(called, ['done', 'done'])
+
+    def test_failing_callback(self):
+        executor = Executor(workers=1)
+        release = threading.Event()
+        future = executor.submit(release.wait)
+
+        def fail(f):
+            raise ValueError('callback failed')
+        future.add_done_callback(fail)
+        with mock.patch('recurly.executor.log') as log:
+            release.set()
+            self.assertTrue(future.result(5))
+            # The worker survives to run later calls.
+            self.assertEqual(executor.submit(pow, 3, 2).result(timeout=5), 9)
+            future.add_done_callback(fail)
+        self.assertEqual(log.exception.call_count, 2)
+
+    def test_get_async(self):
+        with mock.patch.object(recurly.Account, 'get',
+                side_effect=lambda code: recurly.Account(account_code=code)):
+            futures = [recurly.Account.get_async('a%d' % i) for i in range(5)]
+            accounts = [f.result(timeout=5) for f in futures]
+        self.assertEqual([a.account_code for a in accounts], ['a%d' % i for i in range(5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import csv
+import json
+import os
+import shutil
+from StringIO import StringIO
+import tempfile
+from urlparse import urlsplit
+
+import mock
+
+import recurly
+from recurly.exporter import flat_row, plain_value
+from recurly.resource import Money, Resource
+
+from recurlytests import StubServerTest
+
+
+class TestExporter(StubServerTest):
+
+    server_options = {'fixtures': False}
+
+    def setUp(self):
+        super(TestExporter, self).setUp()
+        self.server.add_collection('accounts', 25)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super(TestExporter, self).tearDown()
+
+    def test_plain_value(self):
+        plan = recurly.Plan(plan_code='basicplan', unit_amount_in_cents=Money(USD=1000, EUR=800),
+            add_ons=[recurly.AddOn(add_on_code='extra')])
+        data = plain_value(plan)
+        self.assertEqual(data['unit_amount_in_cents'], {'USD': 1000, 'EUR': 800})
+        self.assertEqual(data['add_ons'], [{'add_on_code': 'extra'}])
+        row = flat_row(data)
+        self.assertEqual(row['unit_amount_in_cents.USD'], 1000)
+        self.assertEqual(row['add_ons'], '[{"add_on_code": "extra"}]')
+
+    def test_ndjson(self):
+        fp = StringIO()
+        count = recurly.export(recurly.Account.all(per_page=10), fp=fp)
+        self.assertEqual(count, 25)
+        rows = [json.loads(line) for line in fp.getvalue().splitlines()]
+        self.assertEqual([row['account_code'] for row in rows], ['account%d' % index for index in range(25)])
+        self.assertEqual(rows[3]['created_at'], '2011-10-25T12:00:00+00:00')
+        self.assertEqual(rows[3]['adjustments'], self.server.base_uri + 'accounts/account3/adjustments')
+
+    def test_no_linked_requests(self):
+        fp = StringIO()
+        recurly.export(recurly.Account.all(per_page=10), fp=fp)
+        # Only the three pages were requested, not each account's billing info.
+        self.assertEqual([urlsplit(path).path for method, path, headers, body in self.server.requests],
+            ['/v2/accounts'] * 3)
+        row = json.loads(fp.getvalue().splitlines()[0])
+        self.assertEqual(row['billing_info'], self.server.base_uri + 'accounts/account0/billing_info')
+
+    def test_csv(self):
+        fp = StringIO()
+        recurly.export(self.server.base_uri + 'accounts?per_page=10', fmt='csv', fp=fp,
+            fields=('account_code', 'email', 'company_name'))
+        rows = list(csv.reader(StringIO(fp.getvalue())))
+        self.assertEqual(rows[0], ['account_code', 'email', 'company_name'])
+        self.assertEqual(rows[1], ['account0', 'user0@example.com', ''])
+        self.assertEqual(len(rows), 26)
+
+        self.assertRaises(ValueError, recurly.export, recurly.Account.all(), fmt='xml', fp=fp)
+
+    def test_checkpoint(self):
+        path = os.path.join(self.directory, 'accounts.csv')
+        checkpoint = os.path.join(self.directory, 'accounts.checkpoint')
+        elements_for_url = Resource.elements_for_url
+        calls = list()
+
+        def interrupted(url):
+            calls.append(url)
+            if len(calls) == 2:
+                response, elems = elements_for_url(url)
+
+                def fail_partway():
+                    yield next(elems)
+                    raise IOError("Connection lost")
+                return response, fail_partway()
+            return elements_for_url(url)
+
+        with open(path, 'ab') as fp:
+            with mock.patch.object(Resource, 'elements_for_url', side_effect=interrupted):
+                self.assertRaises(IOError, recurly.export, recurly.Account.all(per_page=5),
+                    fmt='csv', fp=fp, checkpoint=checkpoint)
+        with open(checkpoint, 'rb') as checkpoint_file:
+            self.assertEqual(json.load(checkpoint_file)['count'], 10)
+
+        with open(path, 'ab') as fp:
+            count = recurly.export(recurly.Account.all(per_page=5), fmt='csv', fp=fp,
+                checkpoint=checkpoint)
+        self.assertEqual(count, 25)
+        self.assertFalse(os.path.exists(checkpoint))
+
+        with open(path, 'rb') as fp:
+            rows = list(csv.DictReader(fp))
+        self.assertEqual([row['account_code'] for row in rows], ['account%d' % index for index in range(25)])
+
+    def test_checkpoint_unseekable(self):
+        checkpoint = os.path.join(self.directory, 'accounts.checkpoint')
+        read_fd, write_fd = os.pipe()
+        with os.fdopen(read_fd, 'rb') as reader:
+            with os.fdopen(write_fd, 'wb') as fp:
+                self.assertRaises(ValueError, recurly.export, recurly.Account.all(per_page=5),
+                    fp=fp, checkpoint=checkpoint)
+            self.assertEqual(reader.read(), '')
+        self.assertFalse(os.path.exists(checkpoint))
@@ -0,0 +1,219 @@
+import BaseHTTPServer
+import httplib
+import Queue
+import socket
+import SocketServer
+import threading
+import unittest
+
+import mock
+
+from recurly.pool import ConnectionPool
+
+
+class MockConnection(object):
+
+    def __init__(self, fail_with=None, fail_response_with=None):
+        # The peer stands in for the server's end of the connection.
+        self.sock, self.peer = socket.socketpair()
+        self.fail_with = fail_with
+        self.fail_response_with = fail_response_with
+        self.requests = list()
+        self.closed = False
+        self.status = 200
+
+    def request(self, method, url, body, headers):
+        if self.fail_with is not None:
+            raise self.fail_with
+        self.requests.append((method, url))
+
+    def getresponse(self):
+        if self.fail_response_with is not None:
+            raise self.fail_response_with
+        response = mock.Mock(status=self.status, length=None if self.status == 200 else 0)
+        response.isclosed.return_value = False
+
+        def close():
+            response.isclosed.return_value = True
+        response.close.side_effect = close
+        return response
+
+    def close(self):
+        self.closed = True
+        if self.sock is not None:
+            self.sock.close()
+        self.sock = None
+
+
+class ClosingHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    """Answers each request as if keeping the connection alive, then closes
+    it."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_request(self):
+        self.rfile.read(int(self.headers.getheader('Content-Length') or 0))
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+        self.close_connection = 1
+
+    do_GET = do_POST = do_DELETE = do_request
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ClosingServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), ClosingHandler)
+        self.closed = Queue.Queue()
+
+    def shutdown_request(self, request):
+        BaseHTTPServer.HTTPServer.shutdown_request(self, request)
+        self.closed.put(request)
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    key = ('https', 'api.recurly.com', None, None)
+
+    def test_reuse(self):
+        pool = ConnectionPool()
+        conns = list()
+
+        def create():
+            conns.append(MockConnection())
+            return conns[-1]
+
+        resp = pool.request(self.key, create, 'GET', '/v2/accounts')
+        # Not released until the response has been read.
+        pool.request(self.key, create, 'GET', '/v2/accounts')
+        self.assertEqual(len(conns), 2)
+
+        resp.close()
+        pool.request(self.key, create, 'GET', '/v2/plans')
+        self.assertEqual(len(conns), 2)
+        self.assertEqual(conns[0].requests, [('GET', '/v2/accounts'), ('GET', '/v2/plans')])
+        self.assertEqual(pool.hits, 1)
+        self.assertEqual(pool.misses, 2)
+
+    def test_bodiless_response(self):
+        pool = ConnectionPool()
+        conn = MockConnection()
+        for method, status in (('DELETE', 204), ('GET', 304), ('HEAD', 200)):
+            conn.status = status
+            pool.request(self.key, lambda: conn, method, '/v2/accounts/1')
+            # Nothing reads these responses' empty bodies, so the connection
+            # is released at once.
+            self.assertEqual(pool.acquire(self.key, MockConnection), (conn, True))
+            pool.release(self.key, conn)
+
+    def test_max_size(self):
+        pool = ConnectionPool(max_size=1)
+        first, second = MockConnection(), MockConnection()
+        pool.release(self.key, first)
+        pool.release(self.key, second)
+        self.assertFalse(first.closed)
+        self.assertTrue(second.closed)
+
+    def test_idle_timeout(self):
+        pool = ConnectionPool(idle_timeout=0)
+        conn = MockConnection()
+        with mock.patch('time.time', return_value=100):
+            pool.release(self.key, conn)
+        with mock.patch('time.time', return_value=101):
+            fresh, reused = pool.acquire(self.key, MockConnection)
+        self.assertTrue(conn.closed)
+        self.assertFalse(reused)
+        self.assertTrue(fresh is not conn)
+
+    def test_stale_reconnect(self):
+        pool = ConnectionPool()
+        stale = MockConnection(fail_with=httplib.BadStatusLine(''))
+        pool.release(self.key, stale)
+
+        fresh = MockConnection()
+        pool.request(self.key, lambda: fresh, 'GET', '/v2/accounts')
+        self.assertTrue(stale.closed)
+        self.assertEqual(fresh.requests, [('GET', '/v2/accounts')])
+
+    def test_stale_after_written(self):
+        pool = ConnectionPool()
+        for method in ('GET', 'DELETE', 'POST'):
+            stale = MockConnection(fail_response_with=httplib.BadStatusLine(''))
+            pool.release(self.key, stale)
+            fresh = MockConnection()
+            if method == 'GET':
+                pool.request(self.key, lambda: fresh, method, '/v2/accounts')
+                self.assertEqual(fresh.requests, [('GET', '/v2/accounts')])
+            else:
+                # The server may have acted on the request already.
+                self.assertRaises(httplib.BadStatusLine,
+                    pool.request, self.key, lambda: fresh, method, '/v2/accounts')
+                self.assertEqual(fresh.requests, [])
+            self.assertTrue(stale.closed)
+
+        # A POST that could not be written is safe to send again.
+        stale = MockConnection(fail_with=httplib.CannotSendRequest())
+        pool.release(self.key, stale)
+        fresh = MockConnection()
+        pool.request(self.key, lambda: fresh, 'POST', '/v2/accounts')
+        self.assertEqual(fresh.requests, [('POST', '/v2/accounts')])
+
+    def test_closed_while_idle(self):
+        pool = ConnectionPool()
+        closed = MockConnection(fail_response_with=httplib.BadStatusLine(''))
+        pool.release(self.key, closed)
+        closed.peer.close()
+
+        fresh = MockConnection()
+        pool.request(self.key, lambda: fresh, 'POST', '/v2/accounts')
+        self.assertTrue(closed.closed)
+        self.assertEqual(closed.requests, [])
+        self.assertEqual(fresh.requests, [('POST', '/v2/accounts')])
+        self.assertEqual((pool.hits, pool.misses), (0, 1))
+
+    def test_server_closed_connection(self):
+        server = ClosingServer()
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        try:
+            host, port = server.server_address
+            create = lambda: httplib.HTTPConnection(host, port)
+            pool = ConnectionPool()
+            for method in ('GET', 'POST', 'DELETE'):
+                resp = pool.request(self.key, create, method, '/v2/accounts', body='')
+                self.assertEqual(resp.status, 200)
+                resp.read()
+                server.closed.get(timeout=5)
+            # Each write went over a new connection instead of failing.
+            self.assertEqual(pool.misses, 3)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_fork(self):
+        pool = ConnectionPool()
+        conn = MockConnection()
+        pool.release(self.key, conn)
+        with mock.patch('os.getpid', return_value=-1):
+            fresh, reused = pool.acquire(self.key, MockConnection)
+        self.assertFalse(reused)
+        self.assertTrue(fresh is not conn)
+        self.assertFalse(conn.closed)
+
+    def test_new_connection_errors_raise(self):
+        pool = ConnectionPool()
+        broken = MockConnection(fail_with=httplib.BadStatusLine(''))
+        self.assertRaises(httplib.BadStatusLine,
+            pool.request, self.key, lambda: broken, 'GET', '/v2/accounts')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+import mock
+
+from recurly.ratelimit import RateLimiter
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1500000000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, secs):
+        self.now += secs
+
+
+def response(status=200, **headers):
+    resp = mock.Mock()
+    resp.status = status
+    headers = dict((k.replace('_', '-'), str(v)) for k, v in headers.items())
+    resp.getheader.side_effect = headers.get
+    return resp
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.patches = [mock.patch('time.time', self.clock.time),
+                        mock.patch('time.sleep', self.clock.sleep)]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+    def test_rate(self):
+        limiter = RateLimiter(rate=10, burst=5)
+        start = self.clock.now
+        for i in range(25):
+            limiter.acquire()
+        # The burst goes immediately; the rest go at 10 per second.
+        self.assertAlmostEqual(self.clock.now - start, 2.0, places=5)
+        self.assertEqual(limiter.waits, 20)
+
+    def test_adapts_to_headers(self):
+        limiter = RateLimiter(rate=10)
+        limiter.update(response(X_RateLimit_Remaining=20, X_RateLimit_Reset=int(self.clock.now) + 10))
+        self.assertAlmostEqual(limiter.current_rate, 2.0)
+
+        limiter.update(response(X_RateLimit_Remaining=2000, X_RateLimit_Reset=int(self.clock.now) + 10))
+        self.assertEqual(limiter.current_rate, 10)
+
+        limiter.update(response())
+        self.assertEqual(limiter.current_rate, 10)
+
+    def test_pauses_until_reset(self):
+        limiter = RateLimiter(rate=10)
+        reset = self.clock.now + 30
+        limiter.update(response(X_RateLimit_Remaining=0, X_RateLimit_Reset=int(reset)))
+        limiter.acquire()
+        self.assertTrue(self.clock.now >= reset)
+
+    def test_too_many_requests(self):
+        limiter = RateLimiter(rate=10)
+        start = self.clock.now
+        limiter.update(response(429, Retry_After=5))
+        limiter.acquire()
+        self.assertTrue(self.clock.now >= start + 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -16,6 +16,127 @@ class TestRecurly(unittest.TestCase):
         account_xml = ElementTree.tostring(account.to_element(), encoding='UTF-8')
         self.assertEqual(account_xml, xml('<account><username>importantbreakfast</username></account>'))
 
+    def test_decoded_value_cache(self):
+        import recurly
+
+        account = recurly.Account.from_element(
+            '<account><username>verena</username>'
+            '<created_at type="datetime">2011-10-25T12:00:00Z</created_at></account>')
+        self.assertTrue(account.created_at is account.created_at)
+        self.assertEqual(account.username, 'verena')
+
+        account.username = 'importantbreakfast'
+        self.assertEqual(account.username, 'importantbreakfast')
+        del account.username
+        self.assertEqual(account.username, 'verena')
+
+        account.update_from_element(ElementTree.fromstring(
+            '<account><username>larry</username></account>'))
+        self.assertEqual(account.username, 'larry')
+        self.assertRaises(AttributeError, lambda: account.created_at)
+
+    def test_decoders(self):
+        import recurly
+
+        plan = recurly.Plan.from_element(
+            '<plan><plan_code>basicplan</plan_code>'
+            '<trial_interval_length type="integer">0</trial_interval_length>'
+            '<display_quantity type="boolean">true</display_quantity>'
+            '<created_at type="datetime">2011-10-25T12:00:00Z</created_at>'
+            '<description nil="nil"></description>'
+            '<unit_amount_in_cents><USD type="integer">1000</USD></unit_amount_in_cents>'
+            '<add_ons type="array"><add_on><add_on_code>mock_add_on</add_on_code></add_on></add_ons>'
+            '<unknown_tag type="integer">7</unknown_tag>'
+            '</plan>')
+        for tag in ('plan_code', 'trial_interval_length', 'display_quantity',
+                    'created_at', 'description', 'unknown_tag'):
+            elem = plan._elem.find(tag)
+            self.assertEqual(recurly.Plan.value_for_element(elem),
+                recurly.Plan._value_for_element_generic(elem))
+        self.assertTrue('unknown_tag' not in recurly.Plan._decoders())
+        self.assertEqual(plan.trial_interval_length, 0)
+        self.assertEqual(plan.display_quantity, True)
+        self.assertEqual(plan.description, None)
+        self.assertEqual(plan.unit_amount_in_cents['USD'], 1000)
+        self.assertEqual(plan.add_ons[0].add_on_code, 'mock_add_on')
+
+        subscription = recurly.Subscription.from_element(
+            '<subscription><plan><plan_code>basicplan</plan_code></plan>'
+            '<unit_amount_in_cents type="integer">1000</unit_amount_in_cents></subscription>')
+        self.assertEqual(subscription.plan.plan_code, 'basicplan')
+        self.assertEqual(subscription.unit_amount_in_cents, 1000)
+
+    def test_to_xml(self):
+        from datetime import datetime
+        import recurly
+        from recurly import Account, BillingInfo, Coupon, Plan, Subscription, SubscriptionAddOn
+        from recurly.resource import Money
+
+        account = Account(account_code='<&"\u00e9>', username=u'ver\u00e9na', email='',
+            company_name=None, billing_info=BillingInfo(first_name='Verena', month=12))
+        subscription = Subscription(plan_code='basicplan', quantity=2, account=account,
+            starts_at=datetime(2011, 10, 25, 12, 0, 0),
+            subscription_add_ons=[SubscriptionAddOn(add_on_code='extra', quantity=1)])
+        plan = Plan(plan_code='basicplan', display_quantity=True, add_ons=[],
+            unit_amount_in_cents=Money(USD=1000, EUR=800), setup_fee_in_cents=Money())
+        coupon = Coupon(coupon_code='fifteen', discount_type='percent',
+            applies_to_all_plans=False, plan_codes=('basicplan', 'otherplan'))
+
+        for resource in (account, subscription, plan, coupon, BillingInfo()):
+            recurly.XML_SERIALIZER = 'element'
+            try:
+                expected = resource.to_xml()
+            finally:
+                recurly.XML_SERIALIZER = 'direct'
+            self.assertEqual(resource.to_xml(), expected)
+
+    def test_record(self):
+        import recurly
+
+        sub = recurly.Subscription.from_element("""
+            <subscription href="https://api.recurly.com/v2/subscriptions/123456">
+              <account href="https://api.recurly.com/v2/accounts/verena"/>
+              <plan href="https://api.recurly.com/v2/plans/bronze">
+                <plan_code>bronze</plan_code>
+                <name>Bronze Plan</name>
+              </plan>
+              <uuid>123456</uuid>
+              <state>active</state>
+              <quantity type="integer">2</quantity>
+              <unit_amount_in_cents type="integer">2000</unit_amount_in_cents>
+              <currency>USD</currency>
+              <activated_at type="datetime">2009-11-22T13:10:38Z</activated_at>
+              <canceled_at nil="nil"></canceled_at>
+              <subscription_add_ons type="array">
+                <subscription_add_on>
+                  <add_on_code>extra</add_on_code>
+                  <quantity type="integer">1</quantity>
+                </subscription_add_on>
+              </subscription_add_ons>
+            </subscription>""")
+        record = sub.to_record()
+        self.assertTrue(isinstance(record, recurly.Subscription.record_class()))
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertEqual(record.plan_code, 'bronze')
+        self.assertEqual(record.quantity, 2)
+        self.assertEqual(record.activated_at, sub.activated_at)
+        self.assertTrue(record.canceled_at is None)
+        self.assertEqual(record.subscription_add_ons[0].add_on_code, 'extra')
+        self.assertRaises(AttributeError, lambda: record.expires_at)
+
+        def change():
+            record.quantity = 3
+        self.assertRaises(AttributeError, change)
+
+        resource = record.to_resource()
+        self.assertTrue(isinstance(resource, recurly.Subscription))
+        self.assertEqual(resource._url, 'https://api.recurly.com/v2/subscriptions/123456')
+        self.assertEqual(resource.quantity, 2)
+        self.assertEqual(resource.activated_at, sub.activated_at)
+        self.assertEqual(resource.subscription_add_ons[0].quantity, 1)
+        self.assertEqual(resource.plan_code, 'bronze')
+        self.assertTrue(callable(resource.account))
+
     def test_objects_for_push_notification(self):
         import recurly
 
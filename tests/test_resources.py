@@ -1,13 +1,16 @@
 from cStringIO import StringIO
 import collections
+import json
 import logging
 import time
 from urlparse import urljoin
 from xml.etree import ElementTree
 
+import mock
+
 import recurly
 from recurly import Account, AddOn, Adjustment, BillingInfo, Coupon, Plan, Redemption, Subscription, SubscriptionAddOn, Transaction
-from recurly.resource import Money, PageError
+from recurly.resource import Money, Page, PageError
 from recurly.errors import NotFoundError, ValidationError, BadRequestError, UnauthorizedError
 from recurlytests import RecurlyTest, xml
 
@@ -113,6 +116,27 @@ class TestResources(RecurlyTest):
             with self.mock_request('account/numeric-deleted.xml'):
                 account.delete()
 
+    def test_get_many(self):
+        def get(code):
+            if code == 'missing':
+                raise NotFoundError('<error><symbol>not_found</symbol></error>')
+            return Account(account_code=code)
+
+        codes = ['a%d' % i for i in range(20)] + ['missing']
+        with mock.patch.object(Account, 'get', side_effect=get):
+            accounts = Account.get_many(codes, workers=5)
+        self.assertEqual(len(accounts), 21)
+        self.assertEqual([a.account_code for a in accounts[:-1]], codes[:-1])
+        self.assertTrue(isinstance(accounts[-1], NotFoundError))
+
+        with mock.patch.object(Account, 'get', side_effect=get):
+            completed = dict(Account.get_many(codes, workers=5, ordered=False))
+        self.assertEqual(set(completed), set(codes))
+        self.assertEqual(completed['a3'].account_code, 'a3')
+
+        with mock.patch.object(Account, 'get', side_effect=KeyError('boom')):
+            self.assertRaises(KeyError, Account.get_many, codes)
+
     def test_add_on(self):
         plan_code = 'plan%s' % self.test_id
         add_on_code = 'addon%s' % self.test_id
@@ -508,6 +532,89 @@ class TestResources(RecurlyTest):
                 with self.mock_request('pages/account-%d-deleted.xml' % i):
                     account.delete()
 
+    def test_page_cursor(self):
+        account_code = 'pages-%s-%%d' % self.test_id
+        with self.mock_request('pages/list.xml'):
+            accounts = Account.all(per_page=4)
+        cursor = json.dumps(accounts.cursor())
+
+        # Another process can carry on from the cursor.
+        with self.mock_request('pages/next-list.xml'):
+            pages = Page.from_cursor(cursor).pages()
+            next_accounts = next(pages)
+        self.assertEqual([account.account_code for account in next_accounts],
+            [account_code % index for index in (3, 2, 1)])
+        self.assertRaises(StopIteration, next, pages)
+        cursor = next_accounts.cursor()
+        self.assertFalse('next_url' in cursor)
+        self.assertEqual(cursor['record_size'], '7')
+
+        last_page = Page.from_cursor(cursor)
+        self.assertEqual(list(last_page), [])
+        self.assertEqual(last_page.start_url, cursor['start_url'])
+
+    def test_page_prefetch(self):
+        def page(codes, next_url=None):
+            page = Page(Account(account_code=code) for code in codes)
+            if next_url is not None:
+                page.next_url = next_url
+            return page
+
+        pages = {
+            'page-2': page(['c', 'd'], 'page-3'),
+            'page-3': page(['e']),
+        }
+        with mock.patch.object(Page, 'page_for_url', side_effect=pages.__getitem__):
+            codes = [a.account_code for a in page(['a', 'b'], 'page-2').iter_prefetch()]
+        self.assertEqual(codes, ['a', 'b', 'c', 'd', 'e'])
+
+        pages['page-3'] = NotFoundError('<error><symbol>not_found</symbol></error>')
+
+        def page_or_error(url):
+            result = pages[url]
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with mock.patch.object(Page, 'page_for_url', side_effect=page_or_error):
+            accounts = page(['a', 'b'], 'page-2').iter_prefetch(depth=1)
+            self.assertEqual([accounts.next().account_code for i in range(4)], ['a', 'b', 'c', 'd'])
+            self.assertRaises(NotFoundError, accounts.next)
+
+    def test_page_prefetch_depth(self):
+        requested = list()
+
+        def page_for_url(url):
+            requested.append(url)
+            page = Page([Account(account_code=url)])
+            page.next_url = 'page-%d' % (len(requested) + 2)
+            return page
+
+        first = Page([Account(account_code='page-1')])
+        first.next_url = 'page-2'
+        for depth in (1, 2, 3):
+            del requested[:]
+            with mock.patch.object(Page, 'page_for_url', side_effect=page_for_url):
+                accounts = first.iter_prefetch(depth=depth)
+                self.assertEqual(accounts.next().account_code, 'page-1')
+                time.sleep(0.2)
+                self.assertEqual(len(requested), depth)
+                self.assertEqual(accounts.next().account_code, 'page-2')
+                time.sleep(0.2)
+                self.assertEqual(len(requested), depth + 1)
+                accounts.close()
+
+    def test_page_stream(self):
+        account_code = 'pages-%s-%%d' % self.test_id
+        with self.mock_request('pages/next-list.xml'):
+            url = urljoin(recurly.BASE_URI, 'accounts?cursor=1304958672&per_page=4')
+            next_accounts = list(Page.stream_for_url(url))
+
+        self.assertTrue(isinstance(next_accounts[0], Account))
+        self.assertEqual(len(next_accounts), 3)
+        self.assertEqual(next_accounts[0].account_code, account_code % 3)
+        self.assertEqual(next_accounts[2].account_code, account_code % 1)
+
     def test_plan(self):
         plan_code = 'plan%s' % self.test_id
         with self.mock_request('plan/does-not-exist.xml'):
@@ -0,0 +1,133 @@
+import errno
+import httplib
+import socket
+import unittest
+
+import mock
+
+import recurly
+import recurly.errors
+from recurly.retry import RetryPolicy, error_reason
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_should_retry(self):
+        policy = RetryPolicy(max_attempts=3)
+        self.assertTrue(policy.should_retry('GET', 1, status=503))
+        self.assertTrue(policy.should_retry('HEAD', 2, error=socket.error()))
+        self.assertFalse(policy.should_retry('DELETE', 1, status=503))
+        self.assertFalse(policy.should_retry('DELETE', 1, error=socket.timeout()))
+        self.assertFalse(policy.should_retry('GET', 1, status=404))
+        self.assertFalse(policy.should_retry('GET', 1, error=ValueError()))
+        self.assertFalse(policy.should_retry('POST', 1, status=503))
+        self.assertEqual(policy.exhausted, 0)
+        self.assertFalse(policy.should_retry('GET', 3, status=503))
+        self.assertEqual(policy.exhausted, 1)
+
+        # Nothing was sent when the connection couldn't be opened.
+        unsent = socket.error('refused')
+        unsent.request_sent = False
+        self.assertTrue(policy.should_retry('POST', 1, error=unsent))
+
+        policy = RetryPolicy(methods=('GET', 'POST'))
+        self.assertTrue(policy.should_retry('POST', 1, status=502))
+
+    def test_error_reason(self):
+        self.assertEqual(error_reason(socket.error(errno.ECONNRESET, 'reset')),
+            'socket.error ECONNRESET')
+        self.assertEqual(error_reason(socket.timeout('timed out')), 'socket.timeout')
+        self.assertEqual(error_reason(httplib.BadStatusLine('')), 'httplib.BadStatusLine')
+        self.assertEqual(error_reason(recurly.errors.DeadlineExceededError('GET /')),
+            'recurly.errors.DeadlineExceededError')
+
+    def test_backoff(self):
+        policy = RetryPolicy(backoff_factor=1, max_backoff=10, jitter=False)
+        self.assertEqual([policy.backoff(n) for n in range(1, 6)], [1, 2, 4, 8, 10])
+        self.assertEqual(policy.backoff(1, retry_after='5'), 5)
+
+        policy = RetryPolicy(backoff_factor=1, max_backoff=10)
+        for n in range(1, 6):
+            self.assertTrue(0 <= policy.backoff(n) <= min(10, 2 ** (n - 1)))
+
+
+class TestRetryRequests(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = recurly.RETRY_POLICY, recurly.CONNECTION_POOL
+        recurly.CONNECTION_POOL = None
+        recurly.RETRY_POLICY = RetryPolicy(max_attempts=3)
+
+    def tearDown(self):
+        recurly.RETRY_POLICY, recurly.CONNECTION_POOL = self.settings
+
+    def response(self, status):
+        resp = mock.Mock()
+        resp.status = status
+        resp.getheader.return_value = None
+        resp.getheaders.return_value = []
+        return resp
+
+    def test_retry_status(self):
+        responses = [self.response(503), self.response(502), self.response(200)]
+        with mock.patch.object(httplib.HTTPConnection, 'request') as request:
+            with mock.patch.object(httplib.HTTPConnection, 'getresponse', side_effect=responses):
+                with mock.patch('time.sleep') as sleep:
+                    resp = recurly.Resource.http_request('https://api.recurly.com/v2/accounts')
+        self.assertEqual(resp.status, 200)
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertTrue(responses[0].read.called)
+        self.assertEqual(recurly.RETRY_POLICY.retries, 2)
+        self.assertEqual(recurly.RETRY_POLICY.retries_by_reason, {502: 1, 503: 1})
+
+    def test_retry_error(self):
+        errors = [socket.error('reset'), socket.error('reset'), socket.error('reset')]
+        with mock.patch.object(httplib.HTTPConnection, 'request'):
+            with mock.patch.object(httplib.HTTPConnection, 'getresponse', side_effect=errors):
+                with mock.patch('time.sleep'):
+                    self.assertRaises(socket.error, recurly.Resource.http_request,
+                        'https://api.recurly.com/v2/accounts/abc')
+        self.assertEqual(recurly.RETRY_POLICY.retries, 2)
+        self.assertEqual(recurly.RETRY_POLICY.exhausted, 1)
+
+    def test_no_retry_after_written(self):
+        # The server may have refunded already when the response times out.
+        with mock.patch.object(httplib.HTTPConnection, 'request') as request:
+            with mock.patch.object(httplib.HTTPConnection, 'getresponse',
+                                   side_effect=socket.timeout('timed out')):
+                self.assertRaises(socket.timeout, recurly.Resource.http_request,
+                    'https://api.recurly.com/v2/transactions/abc?amount_in_cents=700',
+                    'DELETE')
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(recurly.RETRY_POLICY.retries, 0)
+
+    def test_retry_unsent(self):
+        # A DELETE is retried when its connection couldn't be opened.
+        errors = [socket.error('refused')]
+
+        def connect(connection):
+            if errors:
+                raise errors.pop()
+            connection.sock = mock.Mock()
+
+        with mock.patch.object(httplib.HTTPConnection, 'connect', connect):
+            with mock.patch.object(httplib.HTTPConnection, 'getresponse',
+                                   return_value=self.response(204)):
+                with mock.patch('time.sleep'):
+                    resp = recurly.Resource.http_request(
+                        'http://api.recurly.com/v2/accounts/abc', 'DELETE')
+        self.assertEqual(resp.status, 204)
+        self.assertEqual(recurly.RETRY_POLICY.retries_by_reason, {'socket.error': 1})
+
+    def test_no_retry_post(self):
+        with mock.patch.object(httplib.HTTPConnection, 'request') as request:
+            with mock.patch.object(httplib.HTTPConnection, 'getresponse', return_value=self.response(503)):
+                resp = recurly.Resource.http_request('https://api.recurly.com/v2/accounts', 'POST')
+        self.assertEqual(resp.status, 503)
+        self.assertEqual(request.call_count, 1)
+        self.assertEqual(recurly.RETRY_POLICY.retries, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import recurly
+from recurly.errors import DeadlineExceededError, NotFoundError
+from recurly.singleflight import SingleFlight
+
+from recurlytests import StubServerTest
+
+
+class TestSingleFlight(StubServerTest):
+
+    server_options = {'fixtures': False, 'latency': 0.2}
+    settings = ('SINGLE_FLIGHT',)
+
+    def setUp(self):
+        super(TestSingleFlight, self).setUp()
+        self.server.add_collection('accounts', 10)
+        recurly.SINGLE_FLIGHT = SingleFlight()
+
+    def get_concurrently(self, account_code, count):
+        results = [None] * count
+        start = threading.Event()
+
+        def get(index):
+            start.wait()
+            try:
+                results[index] = recurly.Account.get(account_code)
+            except Exception, exc:
+                results[index] = exc
+
+        threads = [threading.Thread(target=get, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_coalesced(self):
+        accounts = self.get_concurrently('account1', 8)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual((recurly.SINGLE_FLIGHT.calls, recurly.SINGLE_FLIGHT.coalesced), (1, 7))
+        self.assertEqual(set(account.account_code for account in accounts), set(['account1']))
+        self.assertEqual(len(set(id(account) for account in accounts)), 8)
+
+        accounts[0].email = 'changed@example.com'
+        self.assertEqual(accounts[1].email, 'user1@example.com')
+
+        # Requests made one after another are not coalesced.
+        recurly.Account.get('account1')
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_errors(self):
+        errors = self.get_concurrently('account20', 4)
+        self.assertEqual(len(self.server.requests), 1)
+        for error in errors:
+            self.assertTrue(isinstance(error, NotFoundError))
+
+    def test_deadline(self):
+        self.server.latency = 1
+        leader = threading.Thread(target=recurly.Account.get, args=('account1',))
+        leader.start()
+        while not self.server.requests:
+            time.sleep(0.01)
+
+        started = time.time()
+        with recurly.deadline(0.3):
+            self.assertRaises(DeadlineExceededError, recurly.Account.get, 'account1')
+        self.assertTrue(time.time() - started < 0.6)
+        self.assertEqual(recurly.SINGLE_FLIGHT.coalesced, 1)
+        leader.join()
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_leader_deadline(self):
+        errors = list()
+
+        def lead():
+            with recurly.deadline(0.1):
+                try:
+                    recurly.Account.get('account1')
+                except DeadlineExceededError, exc:
+                    errors.append(exc)
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        while not self.server.requests:
+            time.sleep(0.01)
+
+        # The leader's deadline isn't this caller's, so it asks again.
+        self.assertEqual(recurly.Account.get('account1').account_code, 'account1')
+        leader.join()
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(recurly.SINGLE_FLIGHT.coalesced, 1)
+        self.assertEqual(len(self.server.requests), 2)
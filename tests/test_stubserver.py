@@ -0,0 +1,70 @@
+import os
+
+import recurly
+from recurly.errors import InternalServerError, NotFoundError, ServiceUnavailableError
+from recurly.retry import RetryPolicy
+
+from recurlytests import StubServerTest
+from stubserver import FIXTURES_DIR, Fixture
+
+
+class TestStubServer(StubServerTest):
+
+    def test_fixtures(self):
+        self.server.use_fixture('account/exists.xml')
+        account = recurly.Account.get('testmock')
+        self.assertEqual(account.account_code, 'testmock')
+        self.assertTrue(account._url.startswith(self.server.base_uri))
+
+        self.server.use_fixture('account/does-not-exist.xml')
+        self.assertRaises(NotFoundError, recurly.Account.get, 'testmock')
+
+    def test_all_fixtures_load(self):
+        for dirpath, dirnames, filenames in os.walk(FIXTURES_DIR):
+            for filename in filenames:
+                if filename.endswith('.xml'):
+                    Fixture(os.path.relpath(os.path.join(dirpath, filename), FIXTURES_DIR))
+
+    def test_bodiless_fixture(self):
+        self.server.use_fixture('account/exists.xml')
+        self.server.use_fixture('account/deleted.xml')
+        account = recurly.Account.get('testmock')
+        account.delete()
+        method, path = self.server.requests[-1][:2]
+        self.assertEqual(method, 'DELETE')
+        self.assertTrue(path.endswith('/v2/accounts/testmock'))
+        # The connection is still usable after the bodiless response.
+        self.assertEqual(recurly.Account.get('testmock').account_code, 'testmock')
+        self.assertEqual(self.server.connections, 1)
+
+    def test_collection(self):
+        self.server.add_collection('accounts', 250)
+        page = recurly.Account.all(per_page=100)
+        self.assertEqual(len(page), 250)
+        codes = [account.account_code for account in page]
+        self.assertEqual(codes, ['account%d' % index for index in range(250)])
+        self.assertEqual(len(self.server.requests), 3)
+        # All the pages are requested over one persistent connection.
+        self.assertEqual(self.server.connections, 1)
+
+        self.assertEqual(recurly.Account.get('account7').username, 'user7')
+        self.assertRaises(NotFoundError, recurly.Account.get, 'account250')
+
+    def test_injected_errors(self):
+        self.server.add_collection('accounts', 10)
+        self.server.fail_next(503)
+        self.assertRaises(ServiceUnavailableError, recurly.Account.get, 'account1')
+
+        recurly.RETRY_POLICY = RetryPolicy(backoff_factor=0)
+        self.server.fail_next(503)
+        self.server.fail_next(429, headers=[('Retry-After', '0')])
+        self.assertEqual(recurly.Account.get('account1').account_code, 'account1')
+        self.assertEqual(recurly.RETRY_POLICY.retries_by_reason, {503: 1, 429: 1})
+
+    def test_error_rates(self):
+        self.server.add_collection('accounts', 10)
+        self.server.unavailable_rate = 1
+        self.assertRaises(ServiceUnavailableError, recurly.Account.get, 'account1')
+        self.server.unavailable_rate = 0
+        self.server.error_rate = 1
+        self.assertRaises(InternalServerError, recurly.Account.get, 'account1')
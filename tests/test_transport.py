@@ -0,0 +1,68 @@
+import unittest
+
+import recurly
+from recurly.errors import NotFoundError, ServiceUnavailableError
+from recurly.transport import HTTPLibTransport, Urllib3Transport
+
+from recurlytests import StubServerTest
+from stubserver import StubTransport
+
+try:
+    import urllib3
+except ImportError:
+    urllib3 = None
+
+
+class TestTransport(StubServerTest):
+
+    server_options = {'fixtures': False}
+    start_server = False
+    settings = ('TRANSPORT',)
+
+    def setUp(self):
+        super(TestTransport, self).setUp()
+        self.server.add_collection('accounts', 12)
+
+    def tearDown(self):
+        recurly.TRANSPORT.clear()
+        super(TestTransport, self).tearDown()
+
+    def exercise(self):
+        accounts = recurly.Account.all(per_page=5)
+        self.assertEqual([account.account_code for account in accounts],
+            ['account%d' % index for index in range(12)])
+        self.assertEqual(recurly.Account.get('account3').email, 'user3@example.com')
+        self.assertRaises(NotFoundError, recurly.Account.get, 'account12')
+        self.server.fail_next(503)
+        self.assertRaises(ServiceUnavailableError, recurly.Account.get, 'account3')
+
+        method, path, headers, body = self.server.requests[0]
+        self.assertEqual(method, 'GET')
+        self.assertTrue(path.endswith('/v2/accounts?per_page=5'))
+        self.assertEqual(headers['accept'], 'application/xml')
+        self.assertEqual(len(self.server.requests), 6)
+
+    def test_stub_transport(self):
+        recurly.TRANSPORT = StubTransport(self.server)
+        self.exercise()
+
+    def test_httplib_transport(self):
+        recurly.TRANSPORT = HTTPLibTransport()
+        self.server.start()
+        self.exercise()
+        self.assertEqual(recurly.CONNECTION_POOL.misses, 1)
+
+    @unittest.skipIf(urllib3 is None, "urllib3 is not installed")
+    def test_urllib3_transport(self):
+        recurly.TRANSPORT = Urllib3Transport()
+        self.server.start()
+        self.exercise()
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(recurly.CONNECTION_POOL.misses, 0)
+
+    def test_client_transport(self):
+        client = recurly.Client('apikey', base_uri=self.server.base_uri,
+            retry_policy=None, transport=StubTransport(self.server))
+        with client:
+            self.assertEqual(recurly.Account.get('account3').account_code, 'account3')
+        self.assertEqual(len(self.server.requests), 1)
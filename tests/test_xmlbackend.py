@@ -0,0 +1,50 @@
+import unittest
+
+import recurly
+from recurly import xmlbackend
+from recurlytests import xml
+
+
+class TestXmlBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.xml_backend = recurly.XML_BACKEND
+
+    def tearDown(self):
+        recurly.XML_BACKEND = self.xml_backend
+
+    def available_backends(self):
+        for name in xmlbackend.BACKENDS:
+            recurly.XML_BACKEND = name
+            try:
+                xmlbackend.backend()
+            except ImportError:
+                continue
+            yield name
+
+    def test_automatic(self):
+        recurly.XML_BACKEND = None
+        self.assertTrue(xmlbackend.backend_name() in xmlbackend.AUTOMATIC_BACKENDS)
+
+    def test_unknown(self):
+        recurly.XML_BACKEND = 'expat'
+        self.assertRaises(ValueError, xmlbackend.backend)
+
+    def test_backends(self):
+        for name in self.available_backends():
+            self.assertEqual(xmlbackend.backend_name(), name)
+
+            account = recurly.Account.from_element(
+                '<account><username>importantbreakfast</username>'
+                '<created_at type="datetime">2011-10-25T12:00:00Z</created_at></account>')
+            self.assertEqual(account.username, 'importantbreakfast')
+            self.assertEqual(account.created_at.year, 2011)
+
+            account = recurly.Account()
+            account.username = 'importantbreakfast'
+            self.assertEqual(xmlbackend.tostring(account.to_element()),
+                xml('<account><username>importantbreakfast</username></account>'))
+
+
+if __name__ == '__main__':
+    unittest.main()